@@ -1,39 +1,31 @@
 from flask import (
-    Flask, render_template, request, jsonify, send_file,
-    redirect, url_for, session, flash
+    Flask, render_template, request, jsonify,
+    redirect, url_for, session, flash, Response, stream_with_context
 )
 
 import csv
 from datetime import datetime, timedelta
 import os
+import threading
+import time
 import traceback
-import importlib
-import pandas as pd
+import uuid
 
 # BOT LOGIC (Milestone 2)
 import milestone_two as bot
-
-# DB FUNCTIONS
-from db import (
-    get_db,
-    get_user_by_account,
-    verify_user_login,
-    verify_admin_login,
-    get_balance,
-    update_balance,
-    transfer_funds,
-    save_chat,
-    get_transactions,
-    get_total_queries,
-    get_total_intents,
-    get_recent_chats,
-    get_all_faqs,
-    add_faq,
-    delete_faq,
-    get_frequent_questions,      # auto FAQ from chat_logs
-    create_db,
-    ensure_columns,
-)
+import chat_export
+import evaluation
+import faq_clusters
+import model_store
+import retrain
+import session_store
+import training_data
+import response_cache
+import inference as inference_mod
+from inference import InferenceResult
+
+# STORAGE (sqlite or postgres, see storage.py)
+from storage import repo
 
 # ---------------- FLASK CONFIG ----------------
 app = Flask(__name__, static_folder="static", template_folder="templates")
@@ -43,24 +35,81 @@ BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 TRAINING_FILE = os.path.join(BASE_DIR, "bankbot_final_expanded1.csv")
 APP_TRAINED_AT = datetime.now()
 
+# BANKBOT_BATCHING=1 puts the micro-batching layer in front of the classifier
+if inference_mod.BATCHING_ENABLED:
+    inference_mod.enable_batching()
+
+
+# ---------------- CONVERSATION STATE (per session) ----------------
+state_store = session_store.create_store(bot.new_state)
+
+# replies to idle-state messages, keyed by normalized message + model version
+reply_cache = response_cache.ResponseCache()
+
+
+def install_model(artifact):
+    bot.install_model(artifact)
+    reply_cache.clear()
+    model_store.publish(artifact)       # the other workers pick it up from here
+
+
+# A retrain runs in one worker process; the others notice the version it
+# published (model_store.publish) within MODEL_SYNC_INTERVAL seconds, load
+# it in the background and drop their cached replies.
+MODEL_SYNC_INTERVAL = float(os.environ.get("BANKBOT_MODEL_SYNC_INTERVAL", 5))
+_model_sync = {"checked": 0.0, "running": False}
+_model_sync_lock = threading.Lock()
+
+
+def sync_published_model():
+    try:
+        live = model_store.published()
+        if live and live["version"] > (bot.active["version"] or 0):
+            artifact = model_store.load_published(live)
+            if artifact is not None and artifact["version"] > (bot.active["version"] or 0):
+                bot.install_model(artifact)
+                reply_cache.clear()
+                print(f"ℹ️ Switched to published model v{artifact['version']}.")
+    except Exception as e:
+        print("MODEL SYNC ERROR:", e)
+    finally:
+        _model_sync["running"] = False
+
+
+# The model loads in the background once the server takes its first request;
+# until it is ready /get_response answers from the rules alone.
+@app.before_request
+def start_model_load():
+    if bot.model_status["state"] in ("not_loaded", "failed"):
+        bot.load_model_in_background()
+    elif bot.model_status["state"] == "ready":
+        now = time.monotonic()
+        with _model_sync_lock:
+            if _model_sync["running"] or now - _model_sync["checked"] < MODEL_SYNC_INTERVAL:
+                return
+            _model_sync.update(checked=now, running=True)
+        threading.Thread(target=sync_published_model, name="model-sync", daemon=True).start()
+
+
+def chat_key():
+    # one conversation per browser login; account is the fallback key
+    return session.get("sid") or session.get("account")
+
 
 # ---------------- RESET BOT CONTEXT ----------------
 def reset_all_bot_context():
+    key = chat_key()
+    if not key:
+        return
     try:
-        bot.memory.clear()
-    except Exception:
-        pass
+        state_store.delete(key)
+    except Exception as e:
+        print("SESSION RESET ERROR:", e)
 
 
 # ---------------- LOGIN CHECK (USER) ----------------
 def require_login():
-    if not session.get("account"):
-        return False
-    try:
-        bot.memory["current_user_account"] = session["account"]
-    except Exception:
-        pass
-    return True
+    return bool(session.get("account"))
 
 
 # ---------------- HOME ----------------
@@ -77,13 +126,14 @@ def login():
         password = request.form.get("password", "").strip()
 
         try:
-            user = verify_user_login(email, password)
+            user = repo.verify_user_login(email, password)
         except Exception:
             traceback.print_exc()
             user = None
 
         if user:
             session["account"] = user["account_number"]
+            session["sid"] = uuid.uuid4().hex
             session["email"] = user["email"]
             session["name"] = user["name"]
             session["balance"] = user["balance"]
@@ -102,8 +152,9 @@ def dashboard():
     if not require_login():
         return redirect(url_for("login"))
 
-    user = get_user_by_account(session["account"])
-    txns = get_transactions(session["account"])
+    user = repo.get_user_by_account(session["account"])
+    # latest page only; "Older" links carry the keyset cursor
+    txns, older = repo.get_transaction_page(session["account"], request.args.get("before", type=int))
 
     return render_template(
         "dashboard.html",
@@ -113,6 +164,7 @@ def dashboard():
         email=user["email"],
         phone=user["phone"],
         transactions=txns,
+        older=older,
     )
 
 
@@ -143,45 +195,43 @@ def get_response():
     if not msg:
         return jsonify({"response": "Please type something."})
 
-    # ---- Step 1: Rule-based (Milestone 2) ----
+    # one classifier pass per message, shared by the rules and the override
+    inference = InferenceResult(msg, bot.active)
+    cache_text = bot.normalize_text(msg)
+    cached, cacheable = None, False
+
+    # ---- Step 1: Rule-based (Milestone 2), or a cached idle-state reply ----
     try:
-        result = bot.handle_user_input(msg)
-
-        if isinstance(result, (tuple, list)):
-            if len(result) == 3:
-                intent, entities, reply = result
-                confidence = 0.70
-            elif len(result) == 4:
-                intent, entities, reply, confidence = result
+        with state_store.session(chat_key()) as state:
+            state["current_user_account"] = session["account"]
+            idle = bot.is_idle(state)
+            cached = reply_cache.get(cache_text, inference.version) if idle else None
+            if cached:
+                intent, entities, reply, confidence = cached
             else:
-                intent, entities, reply, confidence = (
-                    "unknown",
-                    {},
-                    "Unexpected bot output.",
-                    0.50,
-                )
-        else:
-            intent, entities, reply, confidence = "unknown", {}, str(result), 0.50
+                intent, entities, reply, confidence = bot.handle_user_input(msg, state, inference)
+                # only turns that neither read nor started a flow are reusable
+                cacheable = idle and bot.is_idle(state)
     except Exception as e:
         print("BOT ERROR:", e)
         intent, entities, reply, confidence = "error", {}, "Server error.", 0.0
 
     # ---- Step 2: ML override when rule-based is confused ----
     try:
-        if hasattr(bot, "model") and bot.model is not None:
-            baseline_intent = intent
-
-            if baseline_intent in ("unknown", "general_banking_info", "out_of_scope"):
-                ml_pred = bot.model.predict([msg])[0]
-                ml_prob = float(max(bot.model.predict_proba([msg])[0]))
-                intent = ml_pred
-                confidence = ml_prob
+        if not cached and inference.available and intent in ("unknown", "general_banking_info", "out_of_scope"):
+            inference.run()
+            if inference.proba is not None:
+                intent = inference.intent
+                confidence = inference.confidence
     except Exception as e:
         print("ML ERROR:", e)
 
-    # ---- Step 3: Save chat ----
+    if cacheable:
+        reply_cache.put(cache_text, inference.version, intent, entities, reply, confidence)
+
+    # ---- Step 3: Save chat (queued; written in batches off the request path) ----
     try:
-        save_chat(session["account"], msg, reply, intent, float(confidence))
+        repo.save_chat(session["account"], msg, reply, intent, float(confidence))
     except Exception as e:
         print("DB SAVE ERROR:", e)
 
@@ -201,19 +251,7 @@ def chat_logs():
     if not require_login():
         return redirect(url_for("login"))
 
-    conn = get_db()
-    c = conn.cursor()
-    c.execute(
-        """
-        SELECT user_message, bot_response, timestamp
-        FROM chat_logs
-        WHERE account=?
-        ORDER BY id DESC
-    """,
-        (session["account"],),
-    )
-    rows = c.fetchall()
-    conn.close()
+    rows = repo.get_chat_logs(session["account"])
 
     formatted = []
     for r in rows:
@@ -230,45 +268,30 @@ def chat_logs():
 
 
 # ---------------- EXPORT MESSAGE LOGS ----------------
+# Streamed in batches (see chat_export.py): ?format=csv (default), csv.gz or
+# parquet, plus the chat-log page filters (intent, confidence, from/to IST
+# days; account for admins).
 @app.route("/export_excel")
 def export_excel():
-    conn = get_db()
-    c = conn.cursor()
-
     if session.get("admin"):
-        filename = "all_chat_logs.csv"
-        filepath = os.path.join(BASE_DIR, filename)
-        c.execute(
-            """
-            SELECT account, user_message, bot_response, intent, confidence, timestamp
-            FROM chat_logs
-            ORDER BY id
-        """
-        )
+        name = "all_chat_logs"
+        filters = chat_log_filters()
+        columns = chat_export.ADMIN_COLUMNS
+    elif require_login():
+        name = f"{session['account']}_chat_log"
+        filters = dict(chat_log_filters(), account=session["account"])
+        columns = chat_export.USER_COLUMNS
     else:
-        filename = f"{session['account']}_chat_log.csv"
-        filepath = os.path.join(BASE_DIR, filename)
-        c.execute(
-            """
-            SELECT user_message, bot_response, intent, confidence, timestamp
-            FROM chat_logs
-            WHERE account=?
-            ORDER BY id
-        """,
-            (session["account"],),
-        )
-
-    rows = c.fetchall()
-    conn.close()
-
-    with open(filepath, "w", newline="", encoding="utf-8") as f:
-        writer = csv.writer(f)
-        if rows:
-            writer.writerow(rows[0].keys())
-        for r in rows:
-            writer.writerow(list(r))
+        return redirect(url_for("login"))
 
-    return send_file(filepath, as_attachment=True)
+    fmt = request.args.get("format", "csv")
+    try:
+        chunks = chat_export.stream(fmt, columns.split(", "), repo.iter_chat_logs(filters, columns))
+    except (ValueError, RuntimeError) as e:
+        return jsonify({"error": str(e)}), 400
+    mimetype, extension = chat_export.FORMATS[fmt]
+    return Response(stream_with_context(chunks), mimetype=mimetype,
+                    headers={"Content-Disposition": f"attachment; filename={name}{extension}"})
 
 
 # ---------------- ADMIN LOGIN ----------------
@@ -278,7 +301,7 @@ def admin_login():
         email = request.form.get("username", "").strip()
         password = request.form.get("password", "").strip()
 
-        admin = verify_admin_login(email, password)
+        admin = repo.verify_admin_login(email, password)
 
         if admin:
             session["admin"] = True
@@ -306,27 +329,17 @@ def admin_dashboard():
         return redirect(url_for("admin_login"))
 
     # ---------- DATASET STATS & TRAINING ACCURACY ----------
+    # stored with the model version at training time; nothing is predicted here
     total_queries = 0
     total_intents = 0
     accuracy = "N/A"
-
-    try:
-        # Always read from CSV so stats update without restart
-        if os.path.exists(TRAINING_FILE):
-            df = pd.read_csv(TRAINING_FILE, encoding="latin1")
-
-            total_queries = len(df)
-            total_intents = df["intent"].astype(str).nunique()
-
-            # If model loaded, compute training accuracy
-            if hasattr(bot, "model") and bot.model is not None:
-                X = df["text"].astype(str)
-                y = df["intent"].astype(str)
-                preds = bot.model.predict(X)
-                acc_value = (preds == y).mean() * 100.0
-                accuracy = f"{acc_value:.1f}%"
-    except Exception as e:
-        print("DASHBOARD DATASET / ACCURACY ERROR:", e)
+    metrics = model_store.load_metrics(bot.active["artifact"] or None)
+    if metrics:
+        summary = evaluation.summarize(metrics)
+        total_queries, total_intents = summary["rows"], summary["intents"]
+        if summary["accuracy"] is not None:
+            accuracy = f"{summary['accuracy'] * 100.0:.1f}%"
+    evaluation_pending = metrics is None or evaluation.pending(metrics, TRAINING_FILE)
 
     # ---------- LAST RETRAINED TIME ----------
     lr_path = os.path.join(BASE_DIR, "last_retrained.txt")
@@ -346,7 +359,7 @@ def admin_dashboard():
         last_retrained = "Not retrained yet"
 
     # ---------- RECENT USER QUERIES TABLE ----------
-    recent = get_recent_chats(limit=5)
+    recent = repo.get_recent_chats(limit=5)
     formatted = []
     for r in recent:
         conf = r["confidence"]
@@ -373,40 +386,168 @@ def admin_dashboard():
         total_queries=total_queries,
         total_intents=total_intents,
         accuracy=accuracy,
+        evaluation_pending=evaluation_pending,
         last_retrained=last_retrained,
         recent_queries=formatted,
         chatlogs_url=url_for("admin_chatlogs"),
     )
 
 
+# ---------------- ADMIN: MODEL EVALUATION ----------------
+def evaluate_active_model():
+    """Stored metrics of the live model, first evaluating rows added since (if any)."""
+    artifact = bot.active["artifact"]
+    metrics = model_store.load_metrics(artifact)
+    if metrics is None:
+        metrics = evaluation.evaluate(artifact["pipeline"], TRAINING_FILE, artifact["version"])
+    else:
+        metrics = evaluation.update(artifact["pipeline"], TRAINING_FILE, metrics)
+    model_store.save_metrics(artifact, metrics)
+    return metrics
+
+
+@app.route("/admin_evaluate", methods=["POST"])
+def admin_evaluate():
+    if not session.get("admin"):
+        return redirect(url_for("admin_login"))
+
+    # the dashboard shows the new numbers; until the model is loaded there is nothing to evaluate
+    if bot.active["artifact"] is not None:
+        try:
+            evaluate_active_model()
+        except Exception as e:
+            print("EVALUATION ERROR:", e)
+    return redirect(url_for("admin_dashboard"))
+
+
+@app.route("/admin_api/evaluation")
+def admin_api_evaluation():
+    if not session.get("admin"):
+        return jsonify({"error": "unauthorized"}), 401
+
+    metrics = model_store.load_metrics(bot.active["artifact"] or None)
+    if metrics is None:
+        return jsonify({"error": "no stored evaluation for this model"}), 404
+    return jsonify(dict(evaluation.summarize(metrics), pending=evaluation.pending(metrics, TRAINING_FILE)))
+
+
+# ---------------- ADMIN: CHAT LOG PAGES ----------------
+# /admin_queries, /admin_chatlogs and /admin_api/chat_logs show one keyset
+# page of the chat log at a time, filtered in the database. Dates in the
+# filters are IST days, like the timestamps shown; the logs are stored in UTC.
+IST_OFFSET = timedelta(hours=5, minutes=30)
+CHAT_LOG_FILTER_ARGS = ("account", "intent", "min_confidence", "max_confidence", "from", "to")
+MAX_CHAT_PAGE_SIZE = 500
+
+
+def to_ist(t):
+    try:
+        dt = datetime.strptime(t, "%Y-%m-%d %H:%M:%S")
+        return (dt + IST_OFFSET).strftime("%d %b %Y - %I:%M %p")
+    except Exception:
+        return t
+
+
+def ist_day_start(day, plus_days=0):
+    """UTC timestamp at which IST date `day` (YYYY-MM-DD) + plus_days begins."""
+    try:
+        dt = datetime.strptime(day or "", "%Y-%m-%d")
+    except ValueError:
+        return None
+    return (dt + timedelta(days=plus_days) - IST_OFFSET).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def chat_log_filters():
+    """repo chat-log filters from this request's query string."""
+    args = request.args
+    return {
+        "account": args.get("account", "").strip(),
+        "intent": args.get("intent", "").strip(),
+        "min_confidence": args.get("min_confidence", type=float),
+        "max_confidence": args.get("max_confidence", type=float),
+        "since": ist_day_start(args.get("from")),
+        "until": ist_day_start(args.get("to"), plus_days=1),      # the whole "to" day
+    }
+
+
+def chat_log_page():
+    """(rows, older cursor, filter args to carry into page links) for this request."""
+    args = request.args
+    limit = args.get("limit", type=int)
+    page = {"limit": min(max(limit, 1), MAX_CHAT_PAGE_SIZE)} if limit else {}
+    rows, older = repo.get_chat_log_page(chat_log_filters(), args.get("before", type=int), **page)
+    kept = {name: args[name] for name in CHAT_LOG_FILTER_ARGS if args.get(name)}
+    return rows, older, kept
+
+
 # ---------------- ADMIN: QUERIES ----------------
 @app.route("/admin_queries")
 def admin_queries():
     if not session.get("admin"):
         return redirect(url_for("admin_login"))
 
-    conn = get_db()
-    c = conn.cursor()
-    c.execute(
-        """
-        SELECT account, user_message, bot_response, intent, confidence, timestamp
-        FROM chat_logs
-        ORDER BY id DESC
-    """
-    )
-    rows = c.fetchall()
-    conn.close()
+    rows, older, filters = chat_log_page()
+
+    return render_template("admin_queries.html", queries=rows, older=older, filters=filters)
+
+
+@app.route("/admin_api/chat_logs")
+def admin_api_chat_logs():
+    if not session.get("admin"):
+        return jsonify({"error": "unauthorized"}), 401
+
+    rows, older, filters = chat_log_page()
+    return jsonify({
+        "rows": [
+            {"id": r["id"], "account": r["account"], "user_message": r["user_message"],
+             "bot_response": r["bot_response"], "intent": r["intent"],
+             "confidence": r["confidence"], "timestamp": r["timestamp"]}
+            for r in rows
+        ],
+        "next_before": older,
+        "filters": filters,
+    })
+
+
+# ---------------- ADMIN: ANALYTICS ----------------
+@app.route("/admin_api/analytics")
+def admin_api_analytics():
+    if not session.get("admin"):
+        return jsonify({"error": "unauthorized"}), 401
 
-    return render_template("admin_queries.html", queries=rows)
+    # read from the rollup tables; months=0 covers all history
+    months = request.args.get("months", type=int)
+    window = {"months": max(months, 0)} if months is not None else {}
+    return jsonify(dict(repo.get_chat_analytics(**window), months=months,
+                        total_queries=repo.get_total_queries(),
+                        total_intents=repo.get_total_intents(**window)))
 
 
 # ---------------- ADMIN: AUTO FAQ (from chat logs) ----------------
+def frequent_questions():
+    """
+    Top auto-FAQ clusters saved so far; the chats logged since the last
+    refresh are clustered in the background and show up on a later view.
+    """
+    artifact = bot.active["artifact"]
+    if artifact is not None:
+        try:
+            faq_clusters.refresh_in_background(repo, artifact)
+            clusters = faq_clusters.top(repo)
+            if clusters:
+                return clusters
+        except Exception as e:
+            print("FAQ CLUSTER ERROR:", e)
+    # until the model is loaded or the first clusters are saved: exact-message counts
+    return repo.get_frequent_questions()
+
+
 @app.route("/admin_faq")
 def admin_faq():
     if not session.get("admin"):
         return redirect(url_for("admin_login"))
 
-    faqs = get_frequent_questions()
+    faqs = frequent_questions()
     return render_template("admin_faq.html", faqs=faqs)
 
 
@@ -432,6 +573,7 @@ def admin_training():
 
         if text and intent and response:
             append_training_sample(text, intent, response)
+            reply_cache.clear()
             flash("✅ Training example added to dataset.", "success")
         else:
             flash("⚠️ Please fill all fields (text, intent, response).", "error")
@@ -439,83 +581,116 @@ def admin_training():
         return redirect(url_for("admin_training"))
 
     # For UI: show frequent questions
-    faqs = get_frequent_questions()
+    faqs = frequent_questions()
 
     # All existing intents from current ML dataset (so admin can reuse)
     try:
-        intent_values = sorted(set(str(i) for i in bot.df["intent"].unique()))
+        intent_values = sorted(bot.active["responses"]["by_intent"])
     except Exception:
         intent_values = []
 
-    # Load full training dataset from CSV to display
-    training_data = []
+    # dataset rows are fetched page by page from /admin_api/training_data
     try:
-        if os.path.exists(TRAINING_FILE):
-            df_view = pd.read_csv(TRAINING_FILE, encoding="latin1")
-            training_data = df_view.to_dict(orient="records")
+        dataset = training_data.counts(TRAINING_FILE)
     except Exception as e:
         print("TRAINING DATA READ ERROR:", e)
+        dataset = {"total": 0, "intents": {}}
 
     return render_template(
         "admin_training.html",
         faqs=faqs,
         intents=intent_values,
-        training_data=training_data,
+        dataset=dataset,
+        page_size=training_data.TRAINING_PAGE_SIZE,
     )
 
 
+@app.route("/admin_api/training_data")
+def admin_api_training_data():
+    if not session.get("admin"):
+        return jsonify({"error": "unauthorized"}), 401
+
+    args = request.args
+    limit = args.get("limit", type=int) or training_data.TRAINING_PAGE_SIZE
+    try:
+        result = training_data.page(
+            TRAINING_FILE,
+            query=args.get("q", ""),
+            intent=args.get("intent", "").strip(),
+            offset=max(args.get("offset", default=0, type=int), 0),
+            limit=min(max(limit, 1), training_data.MAX_TRAINING_PAGE_SIZE),
+        )
+    except Exception as e:
+        print("TRAINING DATA READ ERROR:", e)
+        return jsonify({"error": "training data unavailable"}), 500
+    if args.get("counts"):
+        result["intents"] = training_data.counts(TRAINING_FILE)["intents"]
+    return jsonify(result)
+
+
 # ---------------- ADMIN: RETRAIN MODEL ----------------
-# ---------------- ADMIN: RETRAIN MODEL ----------------
+def record_retrain_time(_artifact=None):
+    lr_path = os.path.join(BASE_DIR, "last_retrained.txt")
+    with open(lr_path, "w", encoding="utf-8") as f:
+        f.write(datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
+
+
 @app.route("/admin_retrain", methods=["POST"])
 def admin_retrain():
     if not session.get("admin"):
         return redirect(url_for("admin_login"))
 
+    # Fit runs in a background process; live chats keep the old model
+    # (and their conversation state) until the new one is swapped in.
     try:
-        global bot
-        bot = importlib.reload(bot)
-        reset_all_bot_context()
-
-        # Save retrain time to file
-        lr_path = os.path.join(BASE_DIR, "last_retrained.txt")
-        with open(lr_path, "w", encoding="utf-8") as f:
-            f.write(datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
-
-        flash("✅ Model retrained from latest training data.", "success")
+        job = retrain.start_job(TRAINING_FILE, install_model, on_success=record_retrain_time)
+        flash(f"🔁 Retraining started (job #{job['id']}). The new model goes live when it finishes.", "success")
     except Exception as e:
         print("RETRAIN ERROR:", e)
-        flash("❌ Failed to retrain model. Check server logs.", "error")
+        flash("❌ Failed to start retraining. Check server logs.", "error")
 
     return redirect(url_for("admin_dashboard"))
 
 
+@app.route("/admin_retrain_status")
+def admin_retrain_status():
+    if not session.get("admin"):
+        return jsonify({"error": "unauthorized"}), 401
+
+    job_id = request.args.get("job", type=int)
+    job = retrain.get_job(job_id)
+    if job is None:
+        return jsonify({"status": "idle", "model_version": bot.active["version"]})
+    job["model_version"] = bot.active["version"]
+    return jsonify(job)
+
+
+# ---------------- ADMIN: RUNTIME METRICS ----------------
+@app.route("/admin_metrics")
+def admin_metrics():
+    if not session.get("admin"):
+        return jsonify({"error": "unauthorized"}), 401
+
+    return jsonify({
+        "model_version": bot.active["version"],
+        "model_status": dict(bot.model_status),
+        "inference_batching": inference_mod.batching_stats(),
+        "response_cache": reply_cache.stats(),
+        "storage": repo.stats(),
+    })
+
+
 # ---------------- ADMIN CHAT LOGS ----------------
 @app.route("/admin_chatlogs")
 def admin_chatlogs():
     if not session.get("admin"):
         return redirect(url_for("admin_login"))
     
-    conn = get_db()
-    c = conn.cursor()
-    c.execute("""
-        SELECT user_message, bot_response, timestamp
-        FROM chat_logs
-        ORDER BY id DESC
-    """)
-    rows = c.fetchall()
-    conn.close()
+    rows, older, filters = chat_log_page()
+    formatted = [(r["user_message"], r["bot_response"], to_ist(r["timestamp"])) for r in rows]
 
-    formatted = []
-    for r in rows:
-        t = r["timestamp"]
-        try:
-            dt = datetime.strptime(t, "%Y-%m-%d %H:%M:%S")
-            t = (dt + timedelta(hours=5, minutes=30)).strftime("%d %b %Y - %I:%M %p")
-        except Exception:
-            pass
-        formatted.append((r["user_message"], r["bot_response"], t))
-
-    return render_template("chat_logs.html", logs=formatted, account="ADMIN")
+    return render_template("chat_logs.html", logs=formatted, account="ADMIN",
+                           older=older, filters=filters)
 
 
 # ---------------- LOGOUT ----------------
@@ -534,6 +709,15 @@ def not_found(_):
 
 # ---------------- RUN SERVER ----------------
 if __name__ == "__main__":
-    create_db()
-    ensure_columns()
+    import argparse
+
+    parser = argparse.ArgumentParser(description="CAASHMORA Bank chatbot server")
+    parser.add_argument("--preload", action="store_true",
+                        default=os.environ.get("BANKBOT_PRELOAD", "0") == "1",
+                        help="load the model before serving instead of in the background")
+    args = parser.parse_args()
+
+    repo.init_schema()
+    if args.preload:
+        bot.load_model()
     app.run(debug=True, port=5000)
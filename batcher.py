@@ -0,0 +1,107 @@
+import queue
+import threading
+import time
+
+# Micro-batching for the intent classifier: concurrent requests park their
+# InferenceResult here for a few milliseconds and one worker thread runs a
+# single transform + predict_proba over the whole batch.
+
+
+class MicroBatcher:
+
+    def __init__(self, max_batch=32, max_wait_ms=5.0):
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue = queue.Queue()
+        self._stats_lock = threading.Lock()
+        self._batches = 0
+        self._items = 0
+        self._largest = 0
+        self._wait_total = 0.0
+        self._cancelled = 0
+        self._worker = threading.Thread(target=self._loop, name="inference-batcher", daemon=True)
+        self._worker.start()
+
+    # ---------------- CALLER SIDE ----------------
+    def submit(self, result, timeout=2.0):
+        """
+        Queue one InferenceResult and block until the batch containing it ran.
+        False after `timeout` if the worker has not picked it up: the item is
+        cancelled, the worker will not touch `result`, and the caller runs
+        the model itself.
+        """
+        done = threading.Event()
+        claim = threading.Lock()        # held by whichever side owns `result`
+        self._queue.put((result, done, time.monotonic(), claim))
+        if done.wait(timeout):
+            return True
+        if claim.acquire(blocking=False):
+            with self._stats_lock:
+                self._cancelled += 1
+            return False
+        done.wait()                     # the worker has it; its batch is running
+        return True
+
+    # ---------------- WORKER ----------------
+    def _loop(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._run(batch)
+
+    def _run(self, batch):
+        started = time.monotonic()
+        # a retrain can swap models mid-batch: group by the snapshot each caller saw
+        groups = {}
+        for item in batch:
+            if not item[3].acquire(blocking=False):
+                continue                # the caller timed out and computed it itself
+            groups.setdefault(id(item[0].current["model"]), []).append(item)
+
+        for items in groups.values():
+            model = items[0][0].current["model"]
+            try:
+                features = model[:-1].transform([r.text for r, _, _, _ in items])
+                proba = model[-1].predict_proba(features)
+                classes = model[-1].classes_
+                for i, (r, _, _, _) in enumerate(items):
+                    r.features = features[i]
+                    r.proba = proba[i]
+                    r._fill_from_proba(classes)
+            except Exception as e:
+                print("BATCH INFERENCE ERROR:", e)
+            for _, done, _, _ in items:
+                done.set()
+
+        # cancelled items never ran: they count only under "cancelled"
+        ran = [item for items in groups.values() for item in items]
+        if not ran:
+            return
+        with self._stats_lock:
+            self._batches += 1
+            self._items += len(ran)
+            self._largest = max(self._largest, len(ran))
+            self._wait_total += sum(started - queued for _, _, queued, _ in ran)
+
+    # ---------------- METRICS ----------------
+    def stats(self):
+        with self._stats_lock:
+            batches, items = self._batches, self._items
+            return {
+                "queue_depth": self._queue.qsize(),
+                "batches": batches,
+                "items": items,
+                "avg_batch_size": round(items / batches, 2) if batches else 0.0,
+                "max_batch_size": self._largest,
+                "avg_wait_ms": round(self._wait_total / items * 1000.0, 3) if items else 0.0,
+                "cancelled": self._cancelled,
+                "config": {"max_batch": self.max_batch, "max_wait_ms": self.max_wait * 1000.0},
+            }
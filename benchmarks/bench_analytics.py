@@ -0,0 +1,93 @@
+"""
+Admin analytics: scanning the chat logs (what get_frequent_questions and
+get_total_intents used to do on every /admin_faq, /admin_training and
+dashboard view) vs reading the rollup tables, as the log grows, plus what
+keeping the rollups costs each chat-log batch. Runs on throwaway databases.
+
+    python benchmarks/bench_analytics.py [rows ...]
+"""
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import db  # noqa: E402
+
+BATCH = 500
+
+
+def rows(start, count, now):
+    return [(f"ACCT{n % 500:03d}", f"question {n % 300}", "reply",
+             f"intent_{n % 40}", (n % 100) / 100, now)
+            for n in range(start, start + count)]
+
+
+def scans():
+    # the old queries: every logged row, every view
+    conn = db.get_db()
+    conn.execute("""
+        SELECT user_message, bot_response, COUNT(*) AS freq
+        FROM chat_logs
+        WHERE TRIM(user_message) <> ''
+        GROUP BY user_message, bot_response
+        ORDER BY freq DESC
+    """).fetchall()
+    conn.execute("SELECT COUNT(DISTINCT intent) FROM chat_logs WHERE intent <> ''").fetchone()
+    conn.close()
+
+
+def rollups():
+    db.get_frequent_questions(0)
+    db.get_total_intents(0)
+    db.get_chat_analytics(0)
+
+
+def timed(fn, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def batch_cost(now, start):
+    # one ChatLogWriter batch with and without the rollup upserts
+    apply_rollups = db.apply_rollups
+    without, with_rollups = float("inf"), float("inf")
+    for _ in range(5):
+        db.apply_rollups = lambda *args, **kwargs: None
+        try:
+            without = min(without, timed(lambda: db.insert_chats(rows(start, BATCH, now)), 1))
+        finally:
+            db.apply_rollups = apply_rollups
+        with_rollups = min(with_rollups, timed(lambda: db.insert_chats(rows(start, BATCH, now)), 1))
+    return without, with_rollups
+
+
+def main():
+    sizes = [int(n) for n in sys.argv[1:]] or [10000, 100000, 300000]
+    for total in sizes:
+        tmp = tempfile.mkdtemp()
+        try:
+            db.DB_PATH = os.path.join(tmp, "bank.db")
+            db.create_db()
+            db.migrate()
+            now = db.utc_timestamp()
+            for start in range(0, total, 10000):
+                db.insert_chats(rows(start, min(10000, total - start), now))
+            before, after = timed(scans), timed(rollups)
+            without, with_rollups = batch_cost(now, total)
+            print(f"{total:8d} rows   analytics  scan: {before:8.1f} ms   rollups: {after:6.2f} ms"
+                  f"  ({before / after:.0f}x)   {BATCH}-row batch: {without:5.1f} -> {with_rollups:5.1f} ms")
+        finally:
+            db._pool.clear()
+            shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
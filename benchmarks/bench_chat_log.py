@@ -0,0 +1,79 @@
+"""
+save_chat written inline vs through the async batched chat-log writer, on a
+temp copy of bank.db. Reports the latency a request sees per save_chat and
+the end-to-end rate until every row is on disk.
+
+    python benchmarks/bench_chat_log.py [rows_per_thread] [threads]
+"""
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import db  # noqa: E402
+from chat_log_writer import ChatLogWriter  # noqa: E402
+
+
+def run(rows, threads):
+    latencies = []
+    lock = threading.Lock()
+
+    def user(n):
+        local = []
+        for i in range(rows):
+            start = time.perf_counter()
+            db.save_chat(f"BENCH{n:03d}", f"message {i}", "reply", "balance", 1.0)
+            local.append(time.perf_counter() - start)
+        with lock:
+            latencies.extend(local)
+
+    before = db.get_total_queries()
+    start = time.perf_counter()
+    workers = [threading.Thread(target=user, args=(n,)) for n in range(threads)]
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+    if db.chat_log is not None:
+        db.chat_log.flush()
+    elapsed = time.perf_counter() - start
+    assert db.get_total_queries() - before == rows * threads, "rows lost"
+
+    latencies.sort()
+    p50 = latencies[len(latencies) // 2] * 1e6
+    p99 = latencies[int(len(latencies) * 0.99)] * 1e6
+    return p50, p99, rows * threads / elapsed
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    threads = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+    tmp = tempfile.mkdtemp()
+    try:
+        db.DB_PATH = os.path.join(tmp, "bank.db")
+        shutil.copy(os.path.join(ROOT, "bank.db"), db.DB_PATH)
+        db.create_db()
+        db.migrate()
+
+        print(f"threads: {threads}  rows/thread: {rows}")
+        db.chat_log = None
+        sync = run(rows, threads)
+        db.chat_log = ChatLogWriter(db.insert_chats)
+        batched = run(rows, threads)
+        for name, (p50, p99, rate) in (("inline save_chat", sync), ("async batched", batched)):
+            print(f"{name:18s} p50 {p50:8.1f} us   p99 {p99:8.1f} us   {rate:8.0f} rows/s to disk")
+        print(f"speedup: {batched[2] / sync[2]:.1f}x rows/s, {sync[0] / batched[0]:.0f}x p50 latency")
+        print("writer:", db.chat_log.stats())
+        db.chat_log.close()
+    finally:
+        db._pool.clear()
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+Admin chat-log views: the whole log (what /admin_chatlogs used to load and
+format) vs one keyset page, with and without filters, as the log grows.
+Runs on throwaway databases.
+
+    python benchmarks/bench_chat_pages.py [rows ...]
+"""
+import os
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import db  # noqa: E402
+
+
+def fill(total):
+    now = db.utc_timestamp()
+    for start in range(0, total, 10000):
+        db.insert_chats([(f"ACCT{n % 500:03d}", f"question {n % 300}", "reply",
+                          f"intent_{n % 40}", (n % 100) / 100, now)
+                         for n in range(start, min(start + 10000, total))])
+
+
+def full_log():
+    # the old /admin_chatlogs: every row, each timestamp reformatted
+    for r in db.get_chat_logs():
+        dt = datetime.strptime(r["timestamp"], "%Y-%m-%d %H:%M:%S")
+        (dt + timedelta(hours=5, minutes=30)).strftime("%d %b %Y - %I:%M %p")
+
+
+def timed(fn, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main():
+    sizes = [int(n) for n in sys.argv[1:]] or [10000, 100000, 300000]
+    pages = {
+        "page": {},
+        "page, account": {"account": "ACCT007"},
+        "page, intent+conf": {"intent": "intent_3", "min_confidence": 0.5},
+    }
+    for total in sizes:
+        tmp = tempfile.mkdtemp()
+        try:
+            db.DB_PATH = os.path.join(tmp, "bank.db")
+            db.create_db()
+            db.migrate()
+            fill(total)
+            line = f"{total:8d} rows  full log: {timed(full_log):9.1f} ms"
+            for name, filters in pages.items():
+                line += f"   {name}: {timed(lambda: db.get_chat_log_page(filters)):6.2f} ms"
+            print(line)
+        finally:
+            db._pool.clear()
+            shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Connection setup per query vs the db.py connection pool, on a copy of
+bank.db (the real database is never touched).
+
+    python benchmarks/bench_db.py [turns]
+"""
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import db  # noqa: E402
+
+
+def connect_per_call():
+    # what get_db() did before the pool
+    conn = sqlite3.connect(db.DB_PATH)
+    conn.row_factory = sqlite3.Row
+    return conn
+
+
+def chat_turn(account):
+    # the db work behind one balance check + transfer turn in /get_response
+    db.get_user_by_account(account)
+    db.get_balance(account)
+    db.get_user_by_account(account)
+    db.record_transaction(account, account, "Bench", 1, "UPI", "SUCCESS")
+    db.save_chat(account, "check balance", "Your balance is ...", "balance", 1.0)
+
+
+def read_turn(account):
+    db.get_user_by_account(account)
+    db.get_balance(account)
+    db.get_recent_chats(10)
+
+
+def bench(fn, account, turns):
+    start = time.perf_counter()
+    for _ in range(turns):
+        fn(account)
+    return (time.perf_counter() - start) / turns * 1e6
+
+
+def main():
+    turns = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    tmp = tempfile.mkdtemp()
+    try:
+        db.DB_PATH = os.path.join(tmp, "bank.db")
+        shutil.copy(os.path.join(ROOT, "bank.db"), db.DB_PATH)
+        db.create_db()
+        db.migrate()
+        conn = db.get_db()
+        row = conn.execute("SELECT account_number FROM users LIMIT 1").fetchone()
+        conn.close()
+        account = row[0] if row else "0000000000"
+
+        pooled_get_db = db.get_db
+        print(f"turns: {turns}")
+        for name, fn in (("read turn (3 queries)", read_turn),
+                         ("write turn (5 queries)", chat_turn)):
+            db.get_db = connect_per_call
+            before = bench(fn, account, turns)
+            db.get_db = pooled_get_db
+            after = bench(fn, account, turns)
+            print(f"{name:24s} connect per query: {before:9.1f} us   "
+                  f"pooled: {after:9.1f} us  ({before / after:.1f}x)")
+        print("pool:", db.pool_stats())
+        db.flush_chats()
+    finally:
+        db._pool.clear()
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+"""
+Per-turn cost of the rule/dialog engine on scripted flow conversations
+(the classifier fallback is never reached by these messages).
+
+    python benchmarks/bench_dialog.py [rounds]
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import milestone_two as bot  # noqa: E402
+
+CONVERSATIONS = [
+    ["loan", "1", "1", "1", "40", "50000", "2", "5", "780", "2500000", "not now"],
+    ["loan", "2", "2", "1", "18", "30000", "1", "720", "india", "500000", "not now"],
+    ["loan", "3", "5", "1", "2", "3", "720", "1200000", "apply", "Ravi Kumar",
+     "Ravi Traders", "33AAAAA1234A1Z5", "what documents", "done"],
+    ["loan", "2", "4", "1", "30", "40000", "2", "5", "720", "apply", "Ravi Kumar", "skip", "done"],
+    ["card", "2", "1", "1111"], ["card", "1", "5", "4321"],
+    ["atm", "2", "1234"],
+    ["open an account", "Ravi Kumar", "30", "1", "12 Main Street Chennai", "123412341234", "confirm"],
+]
+
+
+def main():
+    rounds = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    turns = sum(len(c) for c in CONVERSATIONS) * rounds
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for conversation in CONVERSATIONS:
+            memory = bot.new_state()
+            for msg in conversation:
+                bot.handle_user_input(msg, memory)
+    elapsed = time.perf_counter() - start
+    print(f"{turns} turns: {elapsed / turns * 1e6:.1f} us/turn")
+
+
+if __name__ == "__main__":
+    main()
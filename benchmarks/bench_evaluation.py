@@ -0,0 +1,74 @@
+"""
+Admin dashboard accuracy: re-predicting the whole training CSV on every
+load (the old /admin_dashboard) vs reading the metrics stored with the
+model version, and the on-demand update after rows are appended. Works on
+a temp copy of the CSV and a temp model store.
+
+    python benchmarks/bench_evaluation.py [training.csv] [appended_rows]
+"""
+import csv
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import model_store  # noqa: E402
+
+
+def timed(fn, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000, result
+
+
+def main():
+    source = sys.argv[1] if len(sys.argv) > 1 else os.path.join(ROOT, "bankbot_final_expanded1.csv")
+    appended = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    tmp = tempfile.mkdtemp()
+    try:
+        model_store.MODEL_DIR = os.path.join(tmp, "models")
+        data_file = os.path.join(tmp, "training.csv")
+        shutil.copy(source, data_file)
+
+        import pandas as pd
+        import evaluation
+        import trainer
+        artifact = trainer.build_artifact(data_file)
+        model = artifact["pipeline"]
+
+        def old_dashboard():
+            df = pd.read_csv(data_file, encoding="latin1")
+            return (model.predict(df["text"].astype(str)) == df["intent"].astype(str)).mean()
+
+        def stored():
+            return evaluation.summarize(model_store.load_metrics(artifact))["accuracy"]
+
+        before, old_acc = timed(old_dashboard)
+        after, new_acc = timed(stored)
+        print(f"dashboard accuracy   re-predict CSV: {before:8.1f} ms   stored metrics: {after:6.2f} ms"
+              f"  ({before / after:.0f}x)   accuracy {old_acc:.4f} / {new_acc:.4f}")
+
+        sample = pd.read_csv(data_file, encoding="latin1").sample(appended, random_state=0)
+        with open(data_file, "a", newline="", encoding="utf-8") as f:
+            csv.writer(f).writerows(sample[["text", "intent", "response"]].astype(str).values.tolist())
+        metrics = model_store.load_metrics(artifact)
+        full, _ = timed(lambda: evaluation.evaluate(model, data_file))
+        incremental, updated = timed(lambda: evaluation.update(model, data_file, metrics))
+        same = evaluation.summarize(updated) == evaluation.summarize(
+            dict(evaluation.evaluate(model, data_file), model_version=updated["model_version"],
+                 evaluated_at=updated["evaluated_at"], incremental_updates=1))
+        print(f"after {appended} new rows   full evaluation: {full:8.1f} ms   incremental: {incremental:6.1f} ms"
+              f"   same result: {same}")
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Chat log export: the old /export_excel (every row fetched, then written to
+a CSV file) vs the streamed export, by time, time to the first byte and
+peak Python memory, as the log grows. Runs on throwaway databases.
+
+    python benchmarks/bench_export.py [rows ...]
+"""
+import csv
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import chat_export  # noqa: E402
+import db  # noqa: E402
+
+
+def fill(total):
+    now = db.utc_timestamp()
+    for start in range(0, total, 10000):
+        db.insert_chats([(f"ACCT{n % 500:03d}", f"question {n % 300} about my account", "a reply " * 8,
+                          f"intent_{n % 40}", (n % 100) / 100, now)
+                         for n in range(start, min(start + 10000, total))])
+
+
+def old_export(path):
+    rows = db.get_chat_logs(oldest_first=True)
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        if rows:
+            writer.writerow(rows[0].keys())
+        for r in rows:
+            writer.writerow(list(r))
+    return os.path.getsize(path)
+
+
+def streamed(fmt):
+    def run():
+        first, size = None, 0
+        for chunk in chat_export.stream(fmt, chat_export.ADMIN_COLUMNS.split(", "),
+                                        db.iter_chat_logs(columns=chat_export.ADMIN_COLUMNS)):
+            if first is None:
+                first = time.perf_counter()
+            size += len(chunk)
+        return first, size
+    return run
+
+
+def measure(fn):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    first, size = result if isinstance(result, tuple) else (None, result)
+    ttfb = (first - start) * 1000 if first else elapsed * 1000
+    return elapsed * 1000, ttfb, peak / 2 ** 20, size / 2 ** 20
+
+
+def main():
+    sizes = [int(n) for n in sys.argv[1:]] or [10000, 100000, 300000]
+    for total in sizes:
+        tmp = tempfile.mkdtemp()
+        try:
+            db.DB_PATH = os.path.join(tmp, "bank.db")
+            db.create_db()
+            db.migrate()
+            fill(total)
+            runs = [("old csv file", lambda: old_export(os.path.join(tmp, "all_chat_logs.csv"))),
+                    ("streamed csv", streamed("csv")),
+                    ("streamed csv.gz", streamed("csv.gz"))]
+            for name, fn in runs:
+                ms, ttfb, peak, mb = measure(fn)
+                print(f"{total:8d} rows   {name:16s} {ms:8.1f} ms   first byte {ttfb:8.1f} ms   "
+                      f"peak memory {peak:7.1f} MiB   output {mb:6.1f} MiB")
+        finally:
+            db._pool.clear()
+            shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
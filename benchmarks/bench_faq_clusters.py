@@ -0,0 +1,104 @@
+"""
+Auto-FAQ: exact-message GROUP BY over the whole log (the old
+get_frequent_questions) vs clustering. Reports how many groups each finds
+in a log of paraphrased questions, the one-off cost of clustering the
+history, and what a refresh costs after new chats arrive. Runs on
+throwaway databases with a model trained from the CSV.
+
+    python benchmarks/bench_faq_clusters.py [training.csv] [rows ...]
+"""
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import db  # noqa: E402
+import faq_clusters  # noqa: E402
+import storage  # noqa: E402
+
+QUESTIONS = [
+    ["balance", "check my balance", "what is my account balance", "show balance please"],
+    ["transfer money", "send money to a friend", "transfer {n} to {acct}", "pay {n} rupees"],
+    ["block my card", "my card is lost", "block debit card", "card stolen please block"],
+    ["loan interest rate", "what is the interest rate for home loan", "home loan interest"],
+    ["hi", "hello", "hey"],
+]
+NEW_CHATS = 1000
+
+
+def message(rng):
+    text = rng.choice(rng.choice(QUESTIONS)).format(n=rng.randint(1, 9999), acct=rng.randint(10 ** 9, 10 ** 10))
+    text = rng.choice([str.lower, str.upper, str.capitalize])(text)
+    return text + rng.choice(["", "?", "!", " ", "..."])
+
+
+def fill(total, rng, now):
+    for start in range(0, total, 10000):
+        db.insert_chats([(f"ACCT{n % 500:03d}", message(rng), "reply", "intent", 0.5, now)
+                         for n in range(start, min(start + 10000, total))])
+
+
+def exact_groups():
+    conn = db.get_db()
+    rows = conn.execute("""
+        SELECT user_message, bot_response, COUNT(*) AS freq
+        FROM chat_logs
+        WHERE TRIM(user_message) <> ''
+        GROUP BY user_message, bot_response
+        ORDER BY freq DESC
+    """).fetchall()
+    conn.close()
+    return rows
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return (time.perf_counter() - start) * 1000, result
+
+
+def main():
+    args = sys.argv[1:]
+    source = args.pop(0) if args and not args[0].isdigit() else os.path.join(ROOT, "bankbot_final_expanded1.csv")
+    sizes = [int(n) for n in args] or [10000, 100000, 300000]
+
+    import model_store
+    import trainer
+    tmp = tempfile.mkdtemp()
+    try:
+        model_store.MODEL_DIR = os.path.join(tmp, "models")
+        artifact = trainer.build_artifact(source)
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    rng = random.Random(0)
+    for total in sizes:
+        tmp = tempfile.mkdtemp()
+        try:
+            db.DB_PATH = os.path.join(tmp, "bank.db")
+            db.create_db()
+            db.migrate()
+            repo = storage.SQLiteRepository()
+            now = db.utc_timestamp()
+            fill(total, rng, now)
+
+            scan, groups = timed(exact_groups)
+            first, _ = timed(lambda: faq_clusters.refresh(repo, artifact))
+            fill(NEW_CHATS, rng, now)
+            incremental, _ = timed(lambda: faq_clusters.refresh(repo, artifact))
+            read, clusters = timed(lambda: faq_clusters.top(repo, limit=10 ** 6))
+            print(f"{total:8d} rows   exact GROUP BY: {scan:7.1f} ms, {len(groups):6d} groups   "
+                  f"clusters: {len(clusters):3d}   history: {first:8.1f} ms   "
+                  f"+{NEW_CHATS} chats: {incremental:6.1f} ms   top: {read:5.2f} ms")
+        finally:
+            db._pool.clear()
+            shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
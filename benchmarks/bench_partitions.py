@@ -0,0 +1,106 @@
+"""
+Admin analytics latency as chat history grows: one flat chat_logs table
+vs the monthly partitions in db.py, on throwaway databases. Every month
+gets the same number of rows; retention is off so nothing is archived.
+
+    python benchmarks/bench_partitions.py [rows_per_month] [months ...]
+"""
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import db  # noqa: E402
+
+QUESTIONS = [f"question {n}" for n in range(300)]
+
+# the analytics queries as they were before partitioning
+FLAT_QUERIES = {
+    "frequent questions": """
+        SELECT user_message, bot_response, COUNT(*) AS freq
+        FROM flat_chat_logs
+        WHERE TRIM(user_message) <> ''
+        GROUP BY user_message, bot_response
+        ORDER BY freq DESC
+    """,
+    "total intents": """
+        SELECT COUNT(DISTINCT intent)
+        FROM flat_chat_logs
+        WHERE intent IS NOT NULL AND intent <> ''
+    """,
+    "recent chats": "SELECT * FROM flat_chat_logs ORDER BY id DESC LIMIT 10",
+}
+
+PARTITIONED = {
+    "frequent questions": db.get_frequent_questions,
+    "total intents": db.get_total_intents,
+    "recent chats": db.get_recent_chats,
+}
+
+
+def fill(months, rows_per_month):
+    now = db.month_of(db.utc_timestamp())
+    for age in range(months - 1, -1, -1):
+        month = db.shift_month(now, -age)
+        rows = [(f"ACCT{n % 50:03d}", QUESTIONS[n % len(QUESTIONS)], "reply",
+                 f"intent_{n % 40}", 0.9, f"{month}-{n % 28 + 1:02d} 12:00:00")
+                for n in range(rows_per_month)]
+        db.insert_chats(rows)
+    conn = db.get_db()
+    conn.execute("""
+        CREATE TABLE flat_chat_logs (
+            id INTEGER PRIMARY KEY, account TEXT, user_message TEXT, bot_response TEXT,
+            intent TEXT, confidence REAL, timestamp DATETIME
+        )
+    """)
+    conn.execute(f"INSERT INTO flat_chat_logs SELECT id, {db.CHAT_LOG_COLUMNS} FROM chat_logs")
+    conn.execute("CREATE INDEX idx_flat_message ON flat_chat_logs (user_message, bot_response)")
+    conn.commit()
+    conn.close()
+
+
+def timed(fn, repeat=5):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def flat(sql):
+    def run():
+        conn = db.get_db()
+        conn.execute(sql).fetchall()
+        conn.close()
+    return run
+
+
+def main():
+    rows_per_month = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    sizes = [int(n) for n in sys.argv[2:]] or [3, 12, 36]
+    db.CHAT_LOG_RETENTION_MONTHS = 0
+    print(f"rows/month: {rows_per_month}  analytics window: {db.ANALYTICS_MONTHS} months")
+    for months in sizes:
+        tmp = tempfile.mkdtemp()
+        try:
+            db.DB_PATH = os.path.join(tmp, "bank.db")
+            db.create_db()
+            db.migrate()
+            fill(months, rows_per_month)
+            for name, fn in PARTITIONED.items():
+                before = timed(flat(FLAT_QUERIES[name]))
+                after = timed(fn)
+                print(f"{months:3d} months  {name:18s} flat: {before:8.2f} ms   "
+                      f"partitioned: {after:8.2f} ms  ({before / after:.1f}x)")
+        finally:
+            db._pool.clear()
+            shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""
+Keyword routing: the old one-re.search-per-rule cascade vs RuleRouter.
+
+    python benchmarks/bench_router.py [rounds]
+"""
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from milestone_two import KEYWORD_RULES, TEXT_RULES, normalize_text  # noqa: E402
+
+MESSAGES = [
+    "hi", "check balance", "i want to transfer 500 to ravi",
+    "block my debit card", "credit card bill payment", "nearest atm please",
+    "what documents are required for a home loan", "emi for 500000 over 5 years",
+    "what is cibil score", "open an account", "how do i reset my net banking password",
+    "my card was stolen yesterday and i need help", "1", "yes",
+]
+
+
+def sequential(text):
+    return [name for name, pattern in KEYWORD_RULES if re.search(pattern, text)]
+
+
+def bench(fn, texts, rounds):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for t in texts:
+            fn(t)
+    return (time.perf_counter() - start) / (rounds * len(texts)) * 1e6
+
+
+def main():
+    rounds = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    texts = [normalize_text(m) for m in MESSAGES]
+    for t in texts:
+        assert sequential(t) == TEXT_RULES.all(t), t
+
+    before = bench(sequential, texts, rounds)
+    after = bench(TEXT_RULES.all, texts, rounds)
+    print(f"rules: {len(KEYWORD_RULES)}  messages: {len(texts)}  rounds: {rounds}")
+    print(f"sequential re.search : {before:8.2f} us/message")
+    print(f"RuleRouter.all       : {after:8.2f} us/message  ({before / after:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
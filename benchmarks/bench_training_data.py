@@ -0,0 +1,87 @@
+"""
+/admin_training dataset view: the old page (pandas reads the whole CSV and
+every row is rendered into the table) vs the new one (counts only, rows
+fetched a page at a time from /admin_api/training_data), with the training
+CSV repeated up to each size. Works on temp copies of the CSV.
+
+    python benchmarks/bench_training_data.py [training.csv] [rows ...]
+"""
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import training_data  # noqa: E402
+
+OLD_TABLE = """
+{% for row in training_data %}
+<tr><td>{{ loop.index }}</td><td>{{ row["text"] }}</td><td>{{ row["intent"] }}</td><td>{{ row["response"] }}</td></tr>
+{% endfor %}
+"""
+
+
+def grow(source, target, rows):
+    with open(source, encoding="latin1") as f:
+        header, *lines = f.read().splitlines()
+    with open(target, "w", encoding="latin1") as f:
+        f.write(header + "\n")
+        for n in range(rows):
+            f.write(lines[n % len(lines)] + "\n")
+
+
+def timed(fn, repeat=3):
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000, result
+
+
+def main():
+    args = sys.argv[1:]
+    source = args.pop(0) if args and not args[0].isdigit() else os.path.join(ROOT, "bankbot_final_expanded1.csv")
+    sizes = [int(n) for n in args] or [1250, 30000, 100000]
+
+    import pandas as pd
+    from jinja2 import Template
+    old_table = Template(OLD_TABLE)
+
+    tmp = tempfile.mkdtemp()
+    try:
+        for rows in sizes:
+            data_file = os.path.join(tmp, f"training_{rows}.csv")
+            grow(source, data_file, rows)
+
+            def old_page():
+                records = pd.read_csv(data_file, encoding="latin1").to_dict(orient="records")
+                return len(old_table.render(training_data=records))
+
+            def new_page():
+                return len(json.dumps(training_data.counts(data_file)))
+
+            def first_rows():
+                return len(json.dumps(training_data.page(data_file)))
+
+            def search():
+                return len(json.dumps(training_data.page(data_file, query="balance", offset=200)))
+
+            training_data.counts(data_file)         # parsed once per version of the file
+            before, old_size = timed(old_page)
+            after, _ = timed(new_page)
+            page, page_size = timed(first_rows)
+            searched, _ = timed(search)
+            print(f"{rows:7d} rows   old page: {before:8.1f} ms, {old_size / 2 ** 20:5.1f} MiB   "
+                  f"new page: {after:5.2f} ms   first {training_data.TRAINING_PAGE_SIZE} rows: {page:5.2f} ms, "
+                  f"{page_size / 1024:4.1f} KiB   search page: {searched:5.1f} ms")
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
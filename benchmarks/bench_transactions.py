@@ -0,0 +1,102 @@
+"""
+Dashboard transaction history: the old per-row sender lookup (N+1) vs the
+JOIN + keyset page, on temp copies of bank.db with growing history.
+
+    python benchmarks/bench_transactions.py [sizes...]
+"""
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import db  # noqa: E402
+
+ACCOUNT = "9000000001"
+
+
+def old_get_transactions(account):
+    # the pre-JOIN implementation: one query, then one user lookup per received row
+    conn = db.get_db()
+    rows = conn.execute("""
+        SELECT timestamp, sender_account, receiver_account, receiver_name,
+               amount, mode, status
+        FROM transactions
+        WHERE sender_account=? OR receiver_account=?
+        ORDER BY id DESC
+    """, (account, account)).fetchall()
+    conn.close()
+    formatted = []
+    for t in rows:
+        if t["sender_account"] == account:
+            txn_type = f"Sent to {t['receiver_name']}"
+        else:
+            sender = db.get_user_by_account(t["sender_account"])
+            txn_type = f"Received from {sender['name'] if sender else 'Unknown'}"
+        formatted.append({"date": t["timestamp"], "type": txn_type, "amount": t["amount"],
+                          "mode": t["mode"], "status": t["status"]})
+    return formatted
+
+
+def populate(size):
+    conn = db.get_db()
+    senders = [f"80000{i:05d}" for i in range(50)]
+    conn.executemany("INSERT OR IGNORE INTO users (account_number, password, name, email, balance) "
+                     "VALUES (?, 'x', ?, ?, 0)",
+                     [(a, f"Sender {i}", f"s{i}@bench") for i, a in enumerate(senders)])
+    rng = random.Random(size)
+    rows = []
+    for i in range(size):
+        if rng.random() < 0.7:      # mostly incoming, some from unknown accounts
+            sender = rng.choice(senders) if rng.random() < 0.95 else "7000000000"
+            rows.append((sender, ACCOUNT, "Bench", rng.randint(1, 5000), "UPI", "Success"))
+        else:
+            rows.append((ACCOUNT, rng.choice(senders), "Payee", rng.randint(1, 5000), "UPI", "Success"))
+        # unrelated traffic interleaved, so the account's rows are sparse
+        rows.append((rng.choice(senders), rng.choice(senders), "Other", 1, "UPI", "Success"))
+    conn.executemany("INSERT INTO transactions (sender_account, receiver_account, receiver_name, "
+                     "amount, mode, status) VALUES (?, ?, ?, ?, ?, ?)", rows)
+    conn.commit()
+    conn.close()
+
+
+def timed(fn, rounds):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        fn()
+    return (time.perf_counter() - start) / rounds * 1000
+
+
+def main():
+    sizes = [int(a) for a in sys.argv[1:]] or [100, 1000, 10000]
+    print(f"{'history':>8s} {'N+1 (all rows)':>16s} {'JOIN (all rows)':>16s} {'latest page':>12s}")
+    for size in sizes:
+        tmp = tempfile.mkdtemp()
+        try:
+            db.DB_PATH = os.path.join(tmp, "bank.db")
+            shutil.copy(os.path.join(ROOT, "bank.db"), db.DB_PATH)
+            db.create_db()
+            db.migrate()
+            populate(size)
+
+            new = [{k: v for k, v in t.items() if k != "id"} for t in db.get_transactions(ACCOUNT)]
+            assert new == old_get_transactions(ACCOUNT)
+            page, _ = db.get_transaction_page(ACCOUNT)
+            assert [t["id"] for t in page] == [t["id"] for t in db.get_transactions(ACCOUNT)][:db.TXN_PAGE_SIZE]
+
+            rounds = max(3, 2000 // size)
+            old_ms = timed(lambda: old_get_transactions(ACCOUNT), rounds)
+            join_ms = timed(lambda: db.get_transactions(ACCOUNT), rounds)
+            page_ms = timed(lambda: db.get_transaction_page(ACCOUNT), 200)
+            print(f"{size:8d} {old_ms:13.2f} ms {join_ms:13.2f} ms {page_ms:9.3f} ms")
+        finally:
+            db._pool.clear()
+            shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
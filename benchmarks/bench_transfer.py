@@ -0,0 +1,92 @@
+"""
+Transfers per second: the old read-then-update sequence (balance read, two
+update_balance calls and record_transaction, each its own commit) vs
+db.transfer (one transaction), on a temp copy of bank.db.
+
+    python benchmarks/bench_transfer.py [transfers] [threads]
+"""
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import db  # noqa: E402
+
+A, B = "9600000001", "9600000002"
+
+
+def old_transfer(sender, receiver, amount):
+    balance = db.get_balance(sender)
+    if balance is None or balance < amount:
+        return False
+    db.update_balance(sender, balance - amount)
+    receiver_user = db.get_user_by_account(receiver)
+    db.update_balance(receiver, receiver_user["balance"] + amount)
+    db.record_transaction(sender, receiver, "Bench", amount, "UPI", "Success")
+    return True
+
+
+def new_transfer(sender, receiver, amount):
+    return db.transfer(sender, receiver, amount, "Bench", "UPI")[0]
+
+
+def run(fn, transfers, threads):
+    def user(n):
+        for i in range(transfers):
+            if (i + n) % 2:
+                fn(A, B, 1)
+            else:
+                fn(B, A, 1)
+
+    workers = [threading.Thread(target=user, args=(n,)) for n in range(threads)]
+    start = time.perf_counter()
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+    return transfers * threads / (time.perf_counter() - start)
+
+
+def total():
+    conn = db.get_db()
+    value = conn.execute("SELECT SUM(balance) FROM users WHERE account_number IN (?, ?)", (A, B)).fetchone()[0]
+    conn.close()
+    return value
+
+
+def main():
+    transfers = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    threads = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    tmp = tempfile.mkdtemp()
+    try:
+        db.DB_PATH = os.path.join(tmp, "bank.db")
+        shutil.copy(os.path.join(ROOT, "bank.db"), db.DB_PATH)
+        db.create_db()
+        db.migrate()
+        conn = db.get_db()
+        conn.executemany("INSERT INTO users (account_number, password, name, email, balance) "
+                         "VALUES (?, 'x', ?, ?, 1000000)", [(A, "Bench A", "a@bench"), (B, "Bench B", "b@bench")])
+        conn.commit()
+        conn.close()
+
+        for n in (1, threads):
+            before = total()
+            old = run(old_transfer, transfers, n)
+            old_drift = total() - before
+            before = total()
+            new = run(new_transfer, transfers, n)
+            new_drift = total() - before
+            print(f"threads {n}: old {old:8.0f} transfers/s (money drift {old_drift:+d})   "
+                  f"transfer() {new:8.0f} transfers/s (drift {new_drift:+d})  {new / old:.1f}x")
+    finally:
+        db._pool.clear()
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
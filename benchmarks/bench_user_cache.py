@@ -0,0 +1,118 @@
+"""
+User lookups with and without the read-through user cache, on a temp copy
+of bank.db, plus two staleness stresses: each writer thread pays from its
+own account and must read its new balance straight after every transfer
+while reader threads keep refilling the cache with that account; and a
+second process changes a balance that this one has cached and must read
+the new value on its next lookup.
+
+    python benchmarks/bench_user_cache.py [turns] [seconds]
+"""
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import db  # noqa: E402
+import storage  # noqa: E402
+
+
+def bench(repo, account, turns):
+    # /dashboard plus a balance check in the chat
+    lookups = 0.0
+    start = time.perf_counter()
+    for _ in range(turns):
+        t = time.perf_counter()
+        repo.get_user_by_account(account)
+        repo.get_balance(account)
+        lookups += time.perf_counter() - t
+        repo.get_transaction_page(account)
+    total = time.perf_counter() - start
+    return total / turns * 1e6, lookups / total
+
+
+def stress(repo, seconds, n_writers=4, n_readers=4):
+    payee = "STRESS_PAYEE"
+    repo.save_user(payee, "pw", "Payee", "payee@stress", "0", 0)
+    senders = [f"STRESS{n:03d}" for n in range(n_writers)]
+    for n, account in enumerate(senders):
+        repo.save_user(account, "pw", f"Sender {n}", f"s{n}@stress", "0", 10 ** 9)
+
+    stop = threading.Event()
+    stale, transfers = [0] * n_writers, [0] * n_writers
+
+    def writer(n):
+        account, expected = senders[n], 10 ** 9
+        while not stop.is_set():
+            ok, _, _ = repo.transfer(account, payee, 1)
+            expected -= ok
+            transfers[n] += ok
+            if repo.get_balance(account) != expected:
+                stale[n] += 1
+
+    def reader():
+        while not stop.is_set():
+            for account in senders:
+                repo.get_balance(account)
+
+    threads = [threading.Thread(target=writer, args=(n,)) for n in range(n_writers)]
+    threads += [threading.Thread(target=reader) for _ in range(n_readers)]
+    for t in threads:
+        t.start()
+    time.sleep(seconds)
+    stop.set()
+    for t in threads:
+        t.join()
+    return sum(transfers), sum(stale)
+
+
+def other_process(repo, account, rounds=20):
+    """Balances written by a separate process; returns stale reads here."""
+    stale = 0
+    for n in range(rounds):
+        repo.get_balance(account)           # cached in this process
+        subprocess.run([sys.executable, "-c", f"import sys; sys.path.insert(0, {ROOT!r}); import db; "
+                        f"db.DB_PATH = {db.DB_PATH!r}; db.update_balance({account!r}, {n})"], check=True)
+        stale += repo.get_balance(account) != n
+    return stale
+
+
+def main():
+    turns = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    seconds = float(sys.argv[2]) if len(sys.argv) > 2 else 3
+    tmp = tempfile.mkdtemp()
+    try:
+        db.DB_PATH = os.path.join(tmp, "bank.db")
+        shutil.copy(os.path.join(ROOT, "bank.db"), db.DB_PATH)
+        uncached = storage.SQLiteRepository(user_cache_size=0)
+        cached = storage.SQLiteRepository()
+        cached.init_schema()
+        conn = db.get_db()
+        account = conn.execute("SELECT account_number FROM users LIMIT 1").fetchone()[0]
+        conn.close()
+
+        print(f"turns: {turns}")
+        before, share_before = bench(uncached, account, turns)
+        after, share_after = bench(cached, account, turns)
+        print(f"dashboard turn    uncached: {before:8.1f} us (user lookups {share_before:.0%})   "
+              f"cached: {after:8.1f} us (user lookups {share_after:.0%})  ({before / after:.2f}x)")
+        print("user cache:", cached.users.stats())
+
+        transfers, stale = stress(cached, seconds)
+        print(f"stress: {transfers} transfers, {stale} stale balance reads")
+        external = other_process(cached, account)
+        print(f"other process: {external} stale balance reads out of 20")
+        return 1 if stale or external else 0
+    finally:
+        db._pool.clear()
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
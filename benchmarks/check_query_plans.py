@@ -0,0 +1,40 @@
+"""
+EXPLAIN QUERY PLAN check for the hot queries: on a migrated temp copy of
+bank.db, every query in db.HOT_QUERIES must use its index. Exits 1 if any
+of them falls back to a full table scan.
+
+    python benchmarks/check_query_plans.py
+"""
+import os
+import shutil
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import db  # noqa: E402
+
+
+def main():
+    tmp = tempfile.mkdtemp()
+    try:
+        db.DB_PATH = os.path.join(tmp, "bank.db")
+        shutil.copy(os.path.join(ROOT, "bank.db"), db.DB_PATH)
+        db.create_db()
+        db.migrate()
+
+        failed = 0
+        for name, plan, ok in db.check_query_plans():
+            failed += not ok
+            print(f"{'ok  ' if ok else 'FAIL'} {name}")
+            for line in plan:
+                print(f"       {line}")
+        return 1 if failed else 0
+    finally:
+        db._pool.clear()
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
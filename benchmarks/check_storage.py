@@ -0,0 +1,272 @@
+"""
+Storage conformance check: one scenario run against every backend in
+storage.py, on throwaway databases.
+
+  sqlite         SQLiteRepository on a temp copy of bank.db
+  postgres-shim  PostgresRepository's SQL, run on SQLite through a small
+                 DB-API shim (%s params, to_char, BIGSERIAL, FOR UPDATE)
+
+Besides the queries, it checks that chat logs past the retention window
+are archived and dropped.
+  postgres       a real server, only if BANKBOT_DATABASE_URL is set
+                 (use an empty scratch database: the check writes to it)
+
+    python benchmarks/check_storage.py
+"""
+import gzip
+import os
+import re
+import shutil
+import sqlite3
+import sys
+import tempfile
+import threading
+import uuid
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import db  # noqa: E402
+import storage  # noqa: E402
+
+
+# ---------------- POSTGRES SHIM ----------------
+_REWRITES = [
+    (re.compile(r"%s"), "?"),
+    (re.compile(r"BIGSERIAL PRIMARY KEY"), "INTEGER PRIMARY KEY AUTOINCREMENT"),
+    (re.compile(r"\s+FOR UPDATE"), ""),
+    (re.compile(r"^\s*LOCK TABLE .*$"), "SELECT 1"),     # one connection at a time anyway
+]
+
+
+def _translate(sql):
+    for pattern, replacement in _REWRITES:
+        sql = pattern.sub(replacement, sql)
+    return sql
+
+
+class ShimCursor:
+
+    def __init__(self, conn):
+        self._conn = conn
+        self._cur = conn.cursor()
+
+    def _begin(self):
+        # BEGIN IMMEDIATE stands in for PostgreSQL's row locks
+        if not self._conn.in_transaction:
+            self._conn.execute("BEGIN IMMEDIATE")
+
+    def execute(self, sql, params=()):
+        self._begin()
+        self._cur.execute(_translate(sql), params)
+
+    def executemany(self, sql, rows):
+        self._begin()
+        self._cur.executemany(_translate(sql), rows)
+
+    def fetchone(self):
+        return self._cur.fetchone()
+
+    def fetchall(self):
+        return self._cur.fetchall()
+
+    @property
+    def rowcount(self):
+        return self._cur.rowcount
+
+
+class ShimConnection:
+
+    def __init__(self, path):
+        self._conn = sqlite3.connect(path, isolation_level=None, timeout=30, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.create_function("to_char", 2, lambda value, fmt: value)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+
+    def cursor(self):
+        return ShimCursor(self._conn)
+
+    def commit(self):
+        if self._conn.in_transaction:
+            self._conn.execute("COMMIT")
+
+    def rollback(self):
+        if self._conn.in_transaction:
+            self._conn.execute("ROLLBACK")
+
+    def close(self):
+        self._conn.close()
+
+
+# ---------------- SCENARIO ----------------
+def scenario(repo):
+    tag = uuid.uuid4().hex[:6]
+    alice, bob, carol = (f"77{tag}{n}" for n in "123")
+    checks = {}
+
+    repo.init_schema()
+    repo.save_user(alice, "pw", "Alice", f"alice{tag}@x", "1", 1000)
+    repo.save_user(bob, "pw", "Bob", f"bob{tag}@x", "2", 500)
+    repo.save_user(carol, "pw", "Carol", f"carol{tag}@x", "3", 0)
+    repo.save_admin(f"admin{tag}@x", "pw", "Admin")
+
+    checks["user login"] = repo.verify_user_login(f"alice{tag}@x", "pw")["account_number"] == alice
+    checks["bad login"] = repo.verify_user_login(f"alice{tag}@x", "nope") is None
+    checks["admin login"] = repo.verify_admin_login(f"admin{tag}@x", "pw")["name"] == "Admin"
+    checks["balance"] = repo.get_balance(alice) == 1000 and repo.get_balance("0") is None
+
+    key = uuid.uuid4().hex
+    ok, _, txn_id = repo.transfer(alice, bob, 300, "Bob", "UPI", idempotency_key=key)
+    checks["transfer"] = ok and repo.get_balance(alice) == 700 and repo.get_balance(bob) == 800
+    checks["idempotent replay"] = (repo.transfer(alice, bob, 300, "Bob", "UPI", idempotency_key=key)
+                                   == (True, "Transfer Successful", txn_id)
+                                   and repo.get_balance(alice) == 700)
+    checks["insufficient"] = repo.transfer(carol, bob, 1)[:2] == (False, "Insufficient Balance")
+    checks["unknown receiver"] = repo.transfer_funds(alice, "999", 1) == (False, "Receiver account does not exist")
+    checks["external payee"] = repo.transfer(alice, "999", 100, "Shop", "UPI", allow_external=True)[0] \
+        and repo.get_balance(alice) == 600
+    checks["self / zero"] = (not repo.transfer(alice, alice, 5)[0]) and (not repo.transfer(alice, bob, 0)[0])
+
+    for i in range(5):
+        repo.transfer(bob, alice, 1, "Alice", "UPI")
+    page, older = repo.get_transaction_page(alice, limit=3)
+    rest, _ = repo.get_transaction_page(alice, older, limit=10)
+    full = repo.get_transactions(alice)
+    checks["history pages"] = ([t["id"] for t in page + rest] == [t["id"] for t in full]
+                               and len(full) == 7)
+    checks["history names"] = (full[0]["type"] == "Received from Bob"
+                               and full[-1]["type"] == "Sent to Bob"
+                               and re.fullmatch(r"\d{4}-\d\d-\d\d \d\d:\d\d:\d\d", str(full[0]["date"])))
+
+    before = repo.get_total_queries()
+    for msg in ("hi", "check balance", "hi"):
+        repo.save_chat(alice, msg, f"re: {msg}", "greet", 0.9)
+    repo.flush_chats()
+    logs = repo.get_chat_logs(alice)
+    checks["chat logs"] = (repo.get_total_queries() - before == 3
+                           and [r["user_message"] for r in logs] == ["hi", "check balance", "hi"]
+                           and [r["user_message"] for r in repo.get_chat_logs(alice, oldest_first=True)][0] == "hi"
+                           and "account" not in logs[0].keys()
+                           and repo.get_chat_logs()[0]["account"] == alice)
+    page, older = repo.get_chat_log_page({"account": alice}, limit=2)
+    rest, last = repo.get_chat_log_page({"account": alice}, older, limit=2)
+    checks["chat log page"] = ([r["user_message"] for r in page + rest] == ["hi", "check balance", "hi"]
+                               and last is None
+                               and not repo.get_chat_log_page({"account": alice, "min_confidence": 0.95})[0]
+                               and len(repo.get_chat_log_page({"account": alice, "intent": "greet",
+                                                               "since": "2000-01-01 00:00:00"})[0]) == 3)
+    exported = [r for batch in repo.iter_chat_logs({"account": alice}, "user_message, timestamp", batch_size=2)
+                for r in batch]
+    checks["chat log export"] = ([r[0] for r in exported] == ["hi", "check balance", "hi"]
+                                 and re.fullmatch(r"\d{4}-\d\d-\d\d \d\d:\d\d:\d\d", str(exported[0][1]))
+                                 and not list(repo.iter_chat_logs({"account": alice, "intent": "nope"})))
+    checks["recent / stats"] = (repo.get_recent_chats(1)[0]["user_message"] == "hi"
+                                and repo.get_total_intents() >= 1
+                                and any(r["user_message"] == "hi" and r["freq"] >= 2
+                                        for r in repo.get_frequent_questions()))
+
+    # rollups agree with a recount of the logs
+    today = db.utc_timestamp()[:10]
+    analytics = repo.get_chat_analytics()
+    logged = repo.get_chat_logs()
+    checks["analytics rollups"] = (
+        analytics["daily_volume"][-1] == {"day": today, "messages": sum(
+            1 for r in logged if str(r["timestamp"]).startswith(today))}
+        and {r["intent"]: r["messages"] for r in analytics["intents"]}.get("greet", 0) >= 3
+        and {r["bucket"]: r["messages"] for r in analytics["confidence"]}.get("0.9-1.0", 0) >= 3)
+
+    # near-duplicate messages land in one auto-FAQ cluster, each row counted once
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    from sklearn.pipeline import make_pipeline
+    import faq_clusters
+    artifact = {"version": f"check-{tag}", "pipeline": make_pipeline(
+        TfidfVectorizer().fit(["check my balance", "transfer money", "block card"]))}
+    def clusters():
+        return {r["id"]: (r["freq"], r["variants"]) for r in faq_clusters.top(repo, limit=10 ** 6)}
+    faq_clusters.refresh(repo, artifact)
+    before = clusters()
+    for msg in (f"Balance {tag}?", f"balance {tag}", f"check my balance {tag}"):
+        repo.save_chat(alice, msg, "re: balance", "balance", 0.8)
+    repo.flush_chats()
+    processed = faq_clusters.refresh(repo, artifact)
+    changed = [(freq - before.get(c, (0, 0))[0], variants - before.get(c, (0, 0))[1])
+               for c, (freq, variants) in clusters().items() if before.get(c) != (freq, variants)]
+    checks["faq clusters"] = (processed == 3 and faq_clusters.refresh(repo, artifact) == 0
+                              and changed == [(3, 2)])
+
+    # a month past retention goes to an archive file but stays in the totals
+    before = repo.get_total_queries()
+    insert_chats = getattr(repo, "insert_chats", db.insert_chats)
+    insert_chats([(alice, f"old {tag}", "re: old", "greet", 0.5, "2001-01-15 10:00:00")])
+    repo.archive_old_chat_logs()
+    archive = os.path.join(db.archive_dir(), "chat_logs_200101.csv.gz")
+    checks["retention"] = (repo.get_total_queries() - before == 1
+                           and all(r["user_message"] != f"old {tag}" for r in repo.get_chat_logs(alice))
+                           and os.path.exists(archive)
+                           and f"old {tag}" in gzip.open(archive, "rt").read())
+
+    repo.add_faq(f"q{tag}", "a")
+    faq = [f for f in repo.get_all_faqs() if f["question"] == f"q{tag}"]
+    repo.delete_faq(faq[0]["id"])
+    checks["faq"] = len(faq) == 1 and not [f for f in repo.get_all_faqs() if f["question"] == f"q{tag}"]
+
+    # two stores stand in for two worker processes: the database lease keeps
+    # their read-modify-writes of one session from losing updates
+    import session_store
+    stores = [session_store.SharedStateStore(dict, repo) for _ in range(2)]
+    session = f"session-{tag}"
+
+    def bump(store):
+        for _ in range(20):
+            with store.session(session) as state:
+                state["n"] = state.get("n", 0) + 1
+    threads = [threading.Thread(target=bump, args=(store,)) for store in stores * 2]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    checks["shared sessions"] = stores[1].load(session) == {"n": 80}
+    stores[0].delete(session)
+    checks["shared sessions"] &= stores[1].load(session) == {}
+
+    # concurrent transfers in both directions: money conserved, nothing negative
+    def churn(a, b):
+        for _ in range(50):
+            repo.transfer(a, b, 37)
+    threads = [threading.Thread(target=churn, args=pair) for pair in [(alice, bob), (bob, alice)] * 3]
+    start = repo.get_balance(alice) + repo.get_balance(bob)
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    checks["concurrent transfers"] = (repo.get_balance(alice) + repo.get_balance(bob) == start
+                                      and min(repo.get_balance(alice), repo.get_balance(bob)) >= 0)
+    return checks
+
+
+def main():
+    tmp = tempfile.mkdtemp()
+    backends = []
+    try:
+        db.DB_PATH = os.path.join(tmp, "bank.db")
+        shutil.copy(os.path.join(ROOT, "bank.db"), db.DB_PATH)
+        backends.append(("sqlite", storage.SQLiteRepository()))
+        shim_path = os.path.join(tmp, "shim.db")
+        backends.append(("postgres-shim", storage.PostgresRepository(connect=lambda: ShimConnection(shim_path),
+                                                                        user_cache_size=64)))
+        if storage.DATABASE_URL:
+            backends.append(("postgres", storage.PostgresRepository(storage.DATABASE_URL)))
+
+        failed = 0
+        for name, repo in backends:
+            for check, ok in scenario(repo).items():
+                failed += not ok
+                print(f"{'ok  ' if ok else 'FAIL'} {name:14s} {check}")
+        return 1 if failed else 0
+    finally:
+        db._pool.clear()
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,102 @@
+"""
+Concurrent read/write stress test for the db.py storage layer, on a temp
+copy of bank.db. Writer threads log chats and record transactions while
+reader threads run the admin dashboard queries; every write must land and
+no thread may see "database is locked".
+
+    python benchmarks/stress_db.py [seconds] [writers] [readers] [--legacy]
+
+--legacy runs the same load with the pre-WAL setup (rollback journal,
+synchronous=FULL, no write queue) for comparison.
+"""
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+LEGACY = "--legacy" in sys.argv
+if LEGACY:
+    os.environ.update(BANKBOT_DB_JOURNAL_MODE="DELETE", BANKBOT_DB_SYNCHRONOUS="FULL",
+                      BANKBOT_DB_WRITE_QUEUE="0")
+
+import db  # noqa: E402
+
+
+def writer(n, stop, counts, errors):
+    account = f"STRESS{n:03d}"
+    while not stop.is_set():
+        try:
+            db.save_chat(account, "check balance", "Your balance is ...", "balance", 1.0)
+            db.record_transaction(account, "STRESS-RCV", "Stress", 1, "UPI", "Success")
+            counts[n] += 1
+        except Exception as e:
+            errors.append(repr(e))
+
+
+def reader(stop, counts, errors):
+    while not stop.is_set():
+        try:
+            db.get_total_queries()
+            db.get_total_intents()
+            db.get_recent_chats(10)
+            db.get_frequent_questions()
+            counts.append(1)
+        except Exception as e:
+            errors.append(repr(e))
+
+
+def main():
+    args = [a for a in sys.argv[1:] if not a.startswith("--")]
+    seconds = float(args[0]) if args else 5
+    n_writers = int(args[1]) if len(args) > 1 else 8
+    n_readers = int(args[2]) if len(args) > 2 else 4
+
+    tmp = tempfile.mkdtemp()
+    try:
+        db.DB_PATH = os.path.join(tmp, "bank.db")
+        shutil.copy(os.path.join(ROOT, "bank.db"), db.DB_PATH)
+        db.create_db()
+        db.migrate()
+        before = db.get_total_queries()
+
+        stop = threading.Event()
+        writes = [0] * n_writers
+        reads, errors = [], []
+        threads = [threading.Thread(target=writer, args=(i, stop, writes, errors)) for i in range(n_writers)]
+        threads += [threading.Thread(target=reader, args=(stop, reads, errors)) for _ in range(n_readers)]
+        for t in threads:
+            t.start()
+        time.sleep(seconds)
+        stop.set()
+        for t in threads:
+            t.join()
+
+        if db.chat_log is not None:
+            db.chat_log.flush()
+        logged = db.get_total_queries() - before
+        conn = db.get_db()
+        txns = conn.execute("SELECT COUNT(*) FROM transactions WHERE receiver_account='STRESS-RCV'").fetchone()[0]
+        mode = conn.execute("PRAGMA journal_mode").fetchone()[0]
+        conn.close()
+
+        print(f"mode: {mode}  write queue: {db.WRITE_QUEUE}  "
+              f"writers: {n_writers}  readers: {n_readers}  {seconds:g}s")
+        print(f"chat writes : {sum(writes):7d}  ({sum(writes) / seconds:8.0f}/s)  rows logged: {logged}")
+        print(f"dashboard   : {len(reads):7d}  ({len(reads) / seconds:8.0f}/s)")
+        print(f"errors      : {len(errors):7d}  {sorted(set(errors))[:3]}")
+        print("writer:", db.write_stats())
+        ok = not errors and logged == sum(writes) and txns == sum(writes)
+        print("OK" if ok else "FAILED: lost writes or errors")
+        return 0 if ok else 1
+    finally:
+        db._pool.clear()
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,107 @@
+"""
+Concurrent transfer stress test on a temp copy of bank.db: threads move
+random amounts between a handful of accounts (many transfers deliberately
+overdraw), some requests are retried with the same idempotency key. At the
+end total money must be unchanged, no balance may be negative, every
+account's balance must match its ledger, and no key may have paid twice.
+
+    python benchmarks/stress_transfer.py [transfers_per_thread] [threads]
+"""
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import uuid
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import db  # noqa: E402
+
+ACCOUNTS = [f"95000000{i:02d}" for i in range(6)]
+OPENING = 1000
+
+
+def setup():
+    conn = db.get_db()
+    conn.executemany("INSERT INTO users (account_number, password, name, email, balance) "
+                     "VALUES (?, 'x', ?, ?, ?)",
+                     [(a, f"Stress {a[-2:]}", f"{a}@stress", OPENING) for a in ACCOUNTS])
+    conn.commit()
+    conn.close()
+
+
+def worker(seed, transfers, results):
+    outcome = {"ok": 0, "rejected": 0, "retries": 0, "bad_retries": 0}
+    rng = random.Random(seed)
+    for _ in range(transfers):
+        sender, receiver = rng.sample(ACCOUNTS, 2)
+        amount = rng.randint(1, 400)
+        key = uuid.uuid4().hex
+        ok, _, txn_id = db.transfer(sender, receiver, amount, mode="UPI", idempotency_key=key)
+        if ok and rng.random() < 0.2:
+            # client retry of a request that already went through
+            again = db.transfer(sender, receiver, amount, mode="UPI", idempotency_key=key)
+            outcome["retries"] += 1
+            if again != (True, "Transfer Successful", txn_id):
+                outcome["bad_retries"] += 1
+        outcome["ok" if ok else "rejected"] += 1
+    results.append(outcome)
+
+
+def main():
+    transfers = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    threads = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+    tmp = tempfile.mkdtemp()
+    try:
+        db.DB_PATH = os.path.join(tmp, "bank.db")
+        shutil.copy(os.path.join(ROOT, "bank.db"), db.DB_PATH)
+        db.create_db()
+        db.migrate()
+        setup()
+
+        results = []
+        workers = [threading.Thread(target=worker, args=(n, transfers, results)) for n in range(threads)]
+        for t in workers:
+            t.start()
+        for t in workers:
+            t.join()
+
+        counts = {k: sum(r[k] for r in results) for k in results[0]}
+
+        conn = db.get_db()
+        marks = ",".join("?" * len(ACCOUNTS))
+        balances = dict(conn.execute(
+            f"SELECT account_number, balance FROM users WHERE account_number IN ({marks})", ACCOUNTS).fetchall())
+        ledger = {a: OPENING for a in ACCOUNTS}
+        rows = conn.execute(f"SELECT sender_account, receiver_account, amount FROM transactions "
+                            f"WHERE sender_account IN ({marks})", ACCOUNTS).fetchall()
+        for sender, receiver, amount in rows:
+            ledger[sender] -= amount
+            ledger[receiver] += amount
+        conn.close()
+
+        total = sum(balances.values())
+        print(f"threads: {threads}  transfers: {threads * transfers}  "
+              f"ok: {counts['ok']}  rejected: {counts['rejected']}  "
+              f"retries: {counts['retries']} (bad: {counts['bad_retries']})")
+        print(f"money: {total} (expected {OPENING * len(ACCOUNTS)})  ledger rows: {len(rows)}")
+        checks = {
+            "money conserved": total == OPENING * len(ACCOUNTS),
+            "no negative balance": min(balances.values()) >= 0,
+            "balances match ledger": balances == ledger,
+            "one ledger row per success": len(rows) == counts["ok"],
+            "retries replayed": counts["bad_retries"] == 0,
+        }
+        for name, ok in checks.items():
+            print(f"{'ok  ' if ok else 'FAIL'} {name}")
+        return 0 if all(checks.values()) else 1
+    finally:
+        db._pool.clear()
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
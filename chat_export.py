@@ -0,0 +1,116 @@
+import csv
+import io
+import zlib
+
+from db import CHAT_LOG_COLUMNS
+
+# Chat log exports streamed straight into the HTTP response: each batch of
+# rows from repo.iter_chat_logs is encoded and sent before the next one is
+# read, so memory stays flat whatever the size of the log and nothing is
+# written to disk.
+#
+#   csv      plain CSV, as before
+#   csv.gz   the same CSV, gzip-compressed on the fly
+#   parquet  columnar and compressed, one row group per batch; needs pyarrow
+
+# the columns the old export had: account first for admins, left out for a user
+ADMIN_COLUMNS = CHAT_LOG_COLUMNS
+USER_COLUMNS = CHAT_LOG_COLUMNS.replace("account, ", "")
+
+FORMATS = {
+    # format -> (mimetype, file extension)
+    "csv": ("text/csv", ".csv"),
+    "csv.gz": ("application/gzip", ".csv.gz"),
+    "parquet": ("application/vnd.apache.parquet", ".parquet"),
+}
+
+
+def csv_chunks(header, batches):
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(header)
+    for batch in batches:
+        writer.writerows(batch)
+        yield buf.getvalue().encode("utf-8")
+        buf.seek(0)
+        buf.truncate()
+    if buf.tell():
+        yield buf.getvalue().encode("utf-8")        # header of an empty export
+
+
+def gzip_chunks(header, batches):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)     # wbits 31: gzip container
+    for chunk in csv_chunks(header, batches):
+        out = compressor.compress(chunk)
+        if out:
+            yield out
+    yield compressor.flush()
+
+
+class _ChunkSink:
+    """Write-only file for pyarrow that hands written bytes on instead of keeping them."""
+
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+        self.closed = False
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self):
+        data, self.chunks = b"".join(self.chunks), []
+        return data
+
+
+def parquet_chunks(header, batches):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema([(name, pa.float64() if name == "confidence" else pa.string()) for name in header])
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(pa.PythonFile(sink, mode="w"), schema, compression="snappy")
+    try:
+        for batch in batches:
+            arrays = []
+            for column, field in zip(zip(*batch), schema):
+                if field.type == pa.string():
+                    column = [None if v is None else str(v) for v in column]
+                arrays.append(pa.array(column, type=field.type))
+            writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+            data = sink.drain()
+            if data:
+                yield data
+    finally:
+        writer.close()
+    yield sink.drain()
+
+
+def stream(fmt, header, batches):
+    """
+    Byte chunks of the export. Raises ValueError for an unknown format, and
+    RuntimeError when parquet is asked for without pyarrow, before any row
+    is read.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"unknown export format: {fmt}")
+    if fmt == "parquet":
+        try:
+            import pyarrow.parquet  # noqa: F401
+        except ImportError:
+            raise RuntimeError("parquet export needs pyarrow (pip install pyarrow)") from None
+        return parquet_chunks(header, batches)
+    if fmt == "csv.gz":
+        return gzip_chunks(header, batches)
+    return csv_chunks(header, batches)
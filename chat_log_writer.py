@@ -0,0 +1,160 @@
+import atexit
+import os
+import queue
+import threading
+import time
+
+# Chat logging off the request path: save_chat() drops the row into a
+# bounded in-memory queue and returns; one background thread writes rows
+# out with a single executemany per batch, every CHAT_LOG_BATCH_ROWS rows
+# or CHAT_LOG_FLUSH_MS milliseconds, whichever comes first. Whatever is
+# still queued is written on shutdown.
+#
+# When the queue is full (the disk cannot keep up) CHAT_LOG_WHEN_FULL picks
+# the backpressure policy:
+#   block  wait up to CHAT_LOG_BLOCK_MS for room, then write inline
+#   sync   write the row inline straight away
+#   drop   discard the row and count it
+
+CHAT_LOG_ASYNC = os.environ.get("BANKBOT_CHAT_LOG_ASYNC", "1") == "1"
+CHAT_LOG_BATCH_ROWS = int(os.environ.get("BANKBOT_CHAT_LOG_BATCH_ROWS", 200))
+CHAT_LOG_FLUSH_MS = float(os.environ.get("BANKBOT_CHAT_LOG_FLUSH_MS", 50))
+CHAT_LOG_QUEUE_SIZE = int(os.environ.get("BANKBOT_CHAT_LOG_QUEUE_SIZE", 10000))
+CHAT_LOG_WHEN_FULL = os.environ.get("BANKBOT_CHAT_LOG_WHEN_FULL", "block")
+CHAT_LOG_BLOCK_MS = float(os.environ.get("BANKBOT_CHAT_LOG_BLOCK_MS", 1000))
+
+_STOP = object()
+
+
+class ChatLogWriter:
+
+    def __init__(self, write_rows, max_rows=CHAT_LOG_BATCH_ROWS, flush_ms=CHAT_LOG_FLUSH_MS,
+                 max_queue=CHAT_LOG_QUEUE_SIZE, when_full=CHAT_LOG_WHEN_FULL,
+                 block_ms=CHAT_LOG_BLOCK_MS):
+        """write_rows(rows) persists a list of row tuples in one transaction."""
+        if when_full not in ("block", "sync", "drop"):
+            raise ValueError(f"unknown chat log backpressure policy: {when_full}")
+        self.write_rows = write_rows
+        self.max_rows = max_rows
+        self.flush_wait = flush_ms / 1000.0
+        self.when_full = when_full
+        self.block_wait = block_ms / 1000.0
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._worker = None
+        self._start_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._batches = 0
+        self._rows = 0
+        self._largest = 0
+        self._inline = 0
+        self._dropped = 0
+        self._failed = 0
+
+    # ---------------- CALLER SIDE ----------------
+    def put(self, row):
+        """Queue one row; applies the backpressure policy if the queue is full."""
+        self._start()
+        try:
+            self._queue.put_nowait(row)
+            return
+        except queue.Full:
+            pass
+        if self.when_full == "drop":
+            with self._stats_lock:
+                self._dropped += 1
+            return
+        if self.when_full == "block":
+            try:
+                self._queue.put(row, timeout=self.block_wait)
+                return
+            except queue.Full:
+                pass
+        with self._stats_lock:
+            self._inline += 1
+        self.write_rows([row])
+
+    def flush(self):
+        """Block until every row queued so far has been written."""
+        if self._worker is not None:
+            self._queue.join()
+
+    def close(self):
+        """Write out what is queued and stop the worker."""
+        with self._start_lock:
+            worker, self._worker = self._worker, None
+        if worker is not None:
+            self._queue.put(_STOP)
+            worker.join()
+
+    def _start(self):
+        if self._worker is not None:
+            return
+        with self._start_lock:
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._loop, name="chat-log-writer", daemon=True)
+                self._worker.start()
+
+    # ---------------- WORKER ----------------
+    def _loop(self):
+        stopping = False
+        while not stopping:
+            first = self._queue.get()
+            if first is _STOP:
+                self._queue.task_done()
+                break
+            batch = [first]
+            deadline = time.monotonic() + self.flush_wait
+            while len(batch) < self.max_rows:
+                remaining = deadline - time.monotonic()
+                try:
+                    row = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if row is _STOP:
+                    stopping = True
+                    self._queue.task_done()
+                    break
+                batch.append(row)
+            self._write(batch)
+
+    def _write(self, batch):
+        try:
+            self.write_rows(batch)
+        except Exception as e:
+            print("CHAT LOG WRITE ERROR:", e)
+            with self._stats_lock:
+                self._failed += len(batch)
+        else:
+            with self._stats_lock:
+                self._batches += 1
+                self._rows += len(batch)
+                self._largest = max(self._largest, len(batch))
+        finally:
+            for _ in batch:
+                self._queue.task_done()
+
+    # ---------------- METRICS ----------------
+    def stats(self):
+        with self._stats_lock:
+            batches, rows = self._batches, self._rows
+            return {
+                "queue_depth": self._queue.qsize(),
+                "batches": batches,
+                "rows": rows,
+                "avg_batch_size": round(rows / batches, 2) if batches else 0.0,
+                "max_batch_size": self._largest,
+                "written_inline": self._inline,
+                "dropped": self._dropped,
+                "failed": self._failed,
+                "config": {"max_rows": self.max_rows, "flush_ms": self.flush_wait * 1000.0,
+                           "max_queue": self._queue.maxsize, "when_full": self.when_full},
+            }
+
+
+def create_writer(write_rows):
+    """The shared writer, or None when BANKBOT_CHAT_LOG_ASYNC=0."""
+    if not CHAT_LOG_ASYNC:
+        return None
+    writer = ChatLogWriter(write_rows)
+    atexit.register(writer.close)
+    return writer
@@ -1,16 +1,231 @@
+import csv
+import gzip
 import sqlite3
 import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
 
-# Path for DB (same directory as app.py)
+from chat_log_writer import create_writer
+
+# Path for DB (same directory as app.py unless BANKBOT_DB_PATH says otherwise)
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-DB_PATH = os.path.join(BASE_DIR, "bank.db")
+DB_PATH = os.environ.get("BANKBOT_DB_PATH", os.path.join(BASE_DIR, "bank.db"))
+
+POOL_SIZE = int(os.environ.get("BANKBOT_DB_POOL_SIZE", 8))              # idle connections kept
+STATEMENT_CACHE = int(os.environ.get("BANKBOT_DB_STATEMENT_CACHE", 256))  # per connection
+BUSY_TIMEOUT_MS = int(os.environ.get("BANKBOT_DB_BUSY_TIMEOUT_MS", 5000))
+
+# WAL lets the dashboard read while chats are being logged; with WAL,
+# synchronous=NORMAL only fsyncs at checkpoints and stays crash-safe.
+JOURNAL_MODE = os.environ.get("BANKBOT_DB_JOURNAL_MODE", "WAL")
+SYNCHRONOUS = os.environ.get("BANKBOT_DB_SYNCHRONOUS", "NORMAL")
+CACHE_SIZE_KB = int(os.environ.get("BANKBOT_DB_CACHE_SIZE_KB", 16000))
+MMAP_SIZE = int(os.environ.get("BANKBOT_DB_MMAP_SIZE", 64 * 1024 * 1024))
+WRITE_QUEUE = os.environ.get("BANKBOT_DB_WRITE_QUEUE", "1") == "1"      # 0: write inline
+
+# Set once per connection, not once per query.
+PRAGMAS = (
+    f"PRAGMA journal_mode={JOURNAL_MODE}",
+    f"PRAGMA synchronous={SYNCHRONOUS}",
+    f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}",
+    f"PRAGMA cache_size=-{CACHE_SIZE_KB}",
+    f"PRAGMA mmap_size={MMAP_SIZE}",
+    "PRAGMA temp_store=MEMORY",
+)
 
 
 # ---------------- DATABASE CONNECTION ----------------
+# Opening a connection (file open, schema read, pragmas) costs more than the
+# one-row queries the helpers run, and a chat turn runs several of them.
+# get_db() hands out a pooled connection instead; close() gives it back, so
+# every existing `conn = get_db() ... conn.close()` keeps working. Like a
+# real close, anything not committed is rolled back.
+
+class PooledConnection(sqlite3.Connection):
+
+    def close(self):
+        if self.in_transaction:
+            self.rollback()
+        if not _pool.release(self):
+            super().close()
+
+
+class ConnectionPool:
+    """Bounded set of idle connections, shared by all threads (LIFO)."""
+
+    def __init__(self, path, size=POOL_SIZE):
+        self.path = path
+        self.size = size
+        self._idle = []
+        self._lock = threading.Lock()
+        self.opened = 0
+        self.reused = 0
+
+    def acquire(self):
+        with self._lock:
+            if self._idle:
+                self.reused += 1
+                return self._idle.pop()
+            self.opened += 1
+        conn = sqlite3.connect(self.path, factory=PooledConnection,
+                               cached_statements=STATEMENT_CACHE, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        conn.pool_path = self.path
+        for pragma in PRAGMAS:
+            conn.execute(pragma)
+        return conn
+
+    def release(self, conn):
+        """Keep conn for reuse; False if the pool is full (caller closes it)."""
+        with self._lock:
+            if any(c is conn for c in self._idle):     # closed twice
+                return True
+            if conn.pool_path == self.path and len(self._idle) < self.size:
+                self._idle.append(conn)
+                return True
+        return False
+
+    def clear(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            sqlite3.Connection.close(conn)
+
+    def stats(self):
+        with self._lock:
+            return {"idle": len(self._idle), "max_idle": self.size,
+                    "opened": self.opened, "reused": self.reused}
+
+
+_pool = ConnectionPool(DB_PATH)
+
+
 def get_db():
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    return conn
+    """A connection from the pool; conn.close() returns it."""
+    if _pool.path != DB_PATH:      # DB_PATH re-pointed (scripts, tests)
+        _pool.clear()
+        _pool.path = DB_PATH
+    return _pool.acquire()
+
+
+def pool_stats():
+    return _pool.stats()
+
+
+# ---------------- SERIALIZED WRITES ----------------
+# Every INSERT/UPDATE/DELETE goes through one writer thread, so writers
+# queue in memory instead of spinning on SQLite's file lock. Jobs that pile
+# up while a commit is in flight are committed together (one fsync), each
+# inside its own savepoint so one failing job does not undo the others.
+# The caller still blocks until its write is committed.
+
+class WriteQueue:
+
+    MAX_GROUP = 64      # jobs per transaction
+
+    def __init__(self, enabled=WRITE_QUEUE):
+        self.enabled = enabled
+        self._jobs = queue.Queue()
+        self._thread = None
+        self._conn = None           # writer's connection while a group runs
+        self._lock = threading.Lock()
+        self.jobs = 0
+        self.commits = 0
+
+    def submit(self, fn):
+        """Run fn(conn) inside a write transaction and return its result."""
+        if not self.enabled:
+            return self._run_inline(fn)
+        if threading.current_thread() is self._thread:
+            return fn(self._conn)   # a job calling another write helper
+        self._start()
+        future = Future()
+        self._jobs.put((fn, future))
+        return future.result()
+
+    def _run_inline(self, fn):
+        conn = get_db()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            result = fn(conn)
+            conn.commit()
+            return result
+        finally:
+            conn.close()
+
+    def _start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._loop, name="db-writer", daemon=True)
+                self._thread.start()
+
+    def _loop(self):
+        while True:
+            group = [self._jobs.get()]
+            while len(group) < self.MAX_GROUP:
+                try:
+                    group.append(self._jobs.get_nowait())
+                except queue.Empty:
+                    break
+            self._run_group(group)
+
+    def _run_group(self, group):
+        done = []
+        conn = None
+        try:
+            conn = self._conn = get_db()
+            conn.execute("BEGIN IMMEDIATE")
+            for fn, future in group:
+                conn.execute("SAVEPOINT job")
+                try:
+                    result = fn(conn)
+                except BaseException as e:
+                    conn.execute("ROLLBACK TO job")
+                    conn.execute("RELEASE job")
+                    future.set_exception(e)
+                    continue
+                conn.execute("RELEASE job")
+                done.append((future, result))
+            conn.commit()
+        except BaseException as e:
+            # BEGIN or COMMIT failed: nothing in this group was written
+            for future, _ in done:
+                future.set_exception(e)
+            for fn, future in group:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        finally:
+            self._conn = None
+            if conn is not None:
+                conn.close()
+        self.jobs += len(group)
+        self.commits += 1
+        for future, result in done:
+            future.set_result(result)
+
+    def stats(self):
+        return {"enabled": self.enabled, "queued": self._jobs.qsize(),
+                "jobs": self.jobs, "commits": self.commits}
+
+
+_writer = WriteQueue()
+
+
+def run_write(fn):
+    """fn(conn) runs on the writer; it must not commit (the queue does)."""
+    return _writer.submit(fn)
+
+
+def execute_write(sql, params=()):
+    """One write statement through the queue; returns the cursor's lastrowid."""
+    return run_write(lambda conn: conn.execute(sql, params).lastrowid)
+
+
+def write_stats():
+    return _writer.stats()
 
 
 # ---------------- CREATE ALL TABLES ----------------
@@ -102,6 +317,14 @@ def verify_admin_login(email, password):
     return row
 
 
+def save_admin(email, password, name):
+    """Create the admin account, or update it if the email exists."""
+    execute_write("""
+        INSERT INTO admin (email, password, name) VALUES (?, ?, ?)
+        ON CONFLICT(email) DO UPDATE SET password=excluded.password, name=excluded.name
+    """, (email, password, name))
+
+
 # ---------------- USER ACCOUNT FUNCTIONS ----------------
 def get_user_by_account(account):
     conn = get_db()
@@ -112,63 +335,161 @@ def get_user_by_account(account):
     return row
 
 
+def save_user(account, password, name, email, phone, balance):
+    """Create a customer account, or update it if the account number exists."""
+    execute_write("""
+        INSERT INTO users (account_number, password, name, email, phone, balance)
+        VALUES (?, ?, ?, ?, ?, ?)
+        ON CONFLICT(account_number) DO UPDATE SET
+            password=excluded.password, name=excluded.name, email=excluded.email,
+            phone=excluded.phone, balance=excluded.balance
+    """, (account, password, name, email, phone, balance))
+
+
 def get_balance(account):
     user = get_user_by_account(account)
     return user["balance"] if user else None
 
 
 def update_balance(account, new_balance):
-    conn = get_db()
-    c = conn.cursor()
-    c.execute("UPDATE users SET balance=? WHERE account_number=?", (new_balance, account))
-    conn.commit()
-    conn.close()
+    execute_write("UPDATE users SET balance=? WHERE account_number=?", (new_balance, account))
+
+
+# ---------------- USER ROW CHANGES (user cache freshness) ----------------
+# Other processes write to users too, and the user cache (user_cache.py) must
+# not serve a row one of them has changed. Triggers bump user_changes.n in
+# the same transaction as every insert, update or delete on users, whoever
+# runs it. users_version() reads it on one dedicated connection, and only
+# when PRAGMA data_version -- which moves when another connection commits
+# anything -- says the database changed since the previous call.
+
+class UserChangeWatch:
+
+    def __init__(self):
+        self._conn = None
+        self._path = None
+        self._lock = threading.Lock()
+        self._data_version = None
+        self._version = None
+
+    def version(self):
+        with self._lock:
+            if self._path != DB_PATH:
+                if self._conn is not None:
+                    self._conn.close()
+                self._conn = sqlite3.connect(DB_PATH, isolation_level=None, check_same_thread=False)
+                self._path = DB_PATH
+                self._data_version = None
+            data_version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+            if data_version != self._data_version:
+                self._version = self._conn.execute("SELECT n FROM user_changes WHERE id = 1").fetchone()[0]
+                self._data_version = data_version
+            return self._version
+
+
+_user_watch = UserChangeWatch()
+
+
+def users_version():
+    """Changes so far to the users table, by any process."""
+    return _user_watch.version()
 
 
 # ---------------- TRANSACTION FUNCTIONS ----------------
-def transfer_funds(sender, receiver, amount):
-    sender_balance = get_balance(sender)
-    if sender_balance is None or sender_balance < amount:
-        return False, "Insufficient Balance"
+# Debit, credit and ledger row commit together or not at all. The debit is
+# a conditional UPDATE (balance >= amount), so two concurrent transfers can
+# never both spend the same money. A retried request that carries the same
+# idempotency key gets the original outcome back instead of paying twice.
+
+def transfer(sender, receiver, amount, receiver_name=None, mode=None,
+             idempotency_key=None, allow_external=False):
+    """
+    Move `amount` from sender to receiver in one transaction.
+    Returns (ok, message, transaction id or None). With allow_external, a
+    receiver outside this bank is paid out (debit + ledger, no credit).
+    """
+    def run(conn):
+        if idempotency_key:
+            done = conn.execute("SELECT id FROM transactions WHERE idempotency_key=?",
+                                (idempotency_key,)).fetchone()
+            if done:
+                return True, "Transfer Successful", done["id"]
+        if not isinstance(amount, int) or amount <= 0:
+            return False, "Invalid amount", None
+        if sender == receiver:
+            return False, "Cannot transfer to the same account", None
 
-    receiver_user = get_user_by_account(receiver)
-    if not receiver_user:
-        return False, "Receiver account does not exist"
+        payee = conn.execute("SELECT name FROM users WHERE account_number=?", (receiver,)).fetchone()
+        if payee is None and not allow_external:
+            return False, "Receiver account does not exist", None
 
-    update_balance(sender, sender_balance - amount)
-    update_balance(receiver, receiver_user["balance"] + amount)
-    return True, "Transfer Successful"
+        debit = conn.execute(
+            "UPDATE users SET balance = balance - ? WHERE account_number=? AND balance >= ?",
+            (amount, sender, amount))
+        if debit.rowcount != 1:
+            return False, "Insufficient Balance", None
+        if payee is not None:
+            conn.execute("UPDATE users SET balance = balance + ? WHERE account_number=?",
+                         (amount, receiver))
+        cur = conn.execute("""
+            INSERT INTO transactions (sender_account, receiver_account, receiver_name, amount,
+                                      mode, status, idempotency_key)
+            VALUES (?, ?, ?, ?, ?, 'Success', ?)
+        """, (sender, receiver, receiver_name or (payee["name"] if payee else None),
+              amount, mode, idempotency_key))
+        return True, "Transfer Successful", cur.lastrowid
+
+    return run_write(run)
+
+
+def transfer_funds(sender, receiver, amount):
+    ok, message, _ = transfer(sender, receiver, amount)
+    return ok, message
 
 
 def record_transaction(sender, receiver, receiver_name, amount, mode, status):
-    conn = get_db()
-    c = conn.cursor()
-    c.execute("""
+    execute_write("""
         INSERT INTO transactions (sender_account, receiver_account, receiver_name, amount, mode, status)
         VALUES (?, ?, ?, ?, ?, ?)
     """, (sender, receiver, receiver_name, amount, mode, status))
-    conn.commit()
-    conn.close()
 
 
-def get_transactions(account):
+TXN_PAGE_SIZE = int(os.environ.get("BANKBOT_TXN_PAGE_SIZE", 20))
+
+# Keyset page of one account's history, newest first, with the sender's name
+# joined in. Each side of the OR is its own index range scan that stops
+# after `limit` rows, so a page costs the same however long the history is.
+TRANSACTION_PAGE_SQL = """
+    SELECT t.id, t.timestamp, t.sender_account, t.receiver_account, t.receiver_name,
+           t.amount, t.mode, t.status, s.name AS sender_name
+    FROM (
+        SELECT id FROM (SELECT id FROM transactions
+                        WHERE sender_account=? AND id<? ORDER BY id DESC LIMIT ?)
+        UNION
+        SELECT id FROM (SELECT id FROM transactions
+                        WHERE receiver_account=? AND id<? ORDER BY id DESC LIMIT ?)
+    ) page
+    JOIN transactions t ON t.id = page.id
+    LEFT JOIN users s ON s.account_number = t.sender_account
+    ORDER BY t.id DESC
+    LIMIT ?
+"""
+
+
+def get_transactions(account, before_id=None, limit=None):
     """
-    Return a formatted list of transactions for dashboard:
+    Return a formatted list of transactions for dashboard, newest first:
     [
-      {date, type, amount, mode, status},
+      {id, date, type, amount, mode, status},
       ...
     ]
+    Only rows with id < before_id; at most `limit` of them (None: all).
     """
+    before = before_id if before_id is not None else 2 ** 63 - 1
+    n = limit if limit is not None else -1      # LIMIT -1: no limit
     conn = get_db()
-    c = conn.cursor()
-    c.execute("""
-        SELECT timestamp, sender_account, receiver_account, receiver_name,
-               amount, mode, status
-        FROM transactions
-        WHERE sender_account=? OR receiver_account=?
-        ORDER BY id DESC
-    """, (account, account))
-    rows = c.fetchall()
+    rows = conn.execute(TRANSACTION_PAGE_SQL,
+                        (account, before, n, account, before, n, n)).fetchall()
     conn.close()
 
     formatted = []
@@ -176,11 +497,10 @@ def get_transactions(account):
         if t["sender_account"] == account:
             txn_type = f"Sent to {t['receiver_name']}"
         else:
-            sender = get_user_by_account(t["sender_account"])
-            sender_name = sender["name"] if sender else "Unknown"
-            txn_type = f"Received from {sender_name}"
+            txn_type = f"Received from {t['sender_name'] or 'Unknown'}"
 
         formatted.append({
+            "id": t["id"],
             "date": t["timestamp"],
             "type": txn_type,
             "amount": t["amount"],
@@ -190,68 +510,644 @@ def get_transactions(account):
     return formatted
 
 
+def get_transaction_page(account, before_id=None, limit=TXN_PAGE_SIZE):
+    """(transactions, before_id for the next older page or None)."""
+    txns = get_transactions(account, before_id, limit + 1)
+    if len(txns) > limit:
+        return txns[:limit], txns[limit - 1]["id"]
+    return txns, None
+
+
+# ---------------- CHAT LOG PARTITIONS ----------------
+# Chat logs live in one table per UTC month (chat_logs_YYYYMM, registered in
+# chat_log_partitions), so recent-data queries only read recent months and
+# old months can be dropped whole. Partitions older than the retention
+# window are written to ARCHIVE_DIR as gzipped CSV and dropped; this runs
+# whenever a new month's partition is created. A `chat_logs` view over the
+# live partitions is kept for ad-hoc queries; the helpers below read the
+# partitions directly.
+
+CHAT_LOG_RETENTION_MONTHS = int(os.environ.get("BANKBOT_CHAT_LOG_RETENTION_MONTHS", 12))  # 0 keeps all
+ANALYTICS_MONTHS = int(os.environ.get("BANKBOT_ANALYTICS_MONTHS", 3))    # 0: every live month
+ARCHIVE_DIR = os.environ.get("BANKBOT_ARCHIVE_DIR")                      # default: archive/ next to the DB
+
+CHAT_LOG_COLUMNS = "account, user_message, bot_response, intent, confidence, timestamp"
+
+_known_partitions = set()       # (DB_PATH, month) already created
+_partition_lock = threading.Lock()
+
+
+def month_of(timestamp):
+    return timestamp[:7]        # "YYYY-MM-DD HH:MM:SS" -> "YYYY-MM"
+
+
+def shift_month(month, delta):
+    year, mon = divmod(int(month[:4]) * 12 + int(month[5:7]) - 1 + delta, 12)
+    return f"{year:04d}-{mon + 1:02d}"
+
+
+def partition_table(month):
+    return "chat_logs_" + month.replace("-", "")
+
+
+def archive_dir():
+    return ARCHIVE_DIR or os.path.join(os.path.dirname(DB_PATH), "archive")
+
+
+def _create_partition(conn, month):
+    name = partition_table(month)
+    conn.execute(f"""
+        CREATE TABLE IF NOT EXISTS {name} (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            account TEXT,
+            user_message TEXT NOT NULL,
+            bot_response TEXT NOT NULL,
+            intent TEXT,
+            confidence REAL,
+            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{name}_account ON {name} (account, id)")
+    conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{name}_message ON {name} (user_message, bot_response)")
+    conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{name}_intent ON {name} (intent, id)")
+    if conn.execute("INSERT OR IGNORE INTO chat_log_partitions (month, table_name) VALUES (?, ?)",
+                    (month, name)).rowcount:
+        _rebuild_chat_logs_view(conn)
+        return True
+    return False
+
+
+def _rebuild_chat_logs_view(conn):
+    tables = [r[0] for r in conn.execute(
+        "SELECT table_name FROM chat_log_partitions WHERE archived_at IS NULL ORDER BY month")]
+    if not tables:         # everything archived: keep an empty view, not a free name
+        union = "SELECT " + ", ".join(f"NULL AS {c}" for c in ["id"] + CHAT_LOG_COLUMNS.split(", ")) + " WHERE 0"
+    else:
+        union = " UNION ALL ".join(f"SELECT id, {CHAT_LOG_COLUMNS} FROM {t}" for t in tables)
+    conn.execute("DROP VIEW IF EXISTS chat_logs")
+    conn.execute(f"CREATE VIEW chat_logs AS {union}")
+
+
+def window_start(months):
+    """First month of a window of `months` calendar months ending this month."""
+    return shift_month(month_of(utc_timestamp()), 1 - months) if months > 0 else "0000-00"
+
+
+def _partitions(conn, months=0, oldest_first=False, since=None, until=None):
+    """
+    Live partition tables, newest first. months > 0 keeps the last `months`
+    months; since/until (timestamps) skip months outside that range.
+    """
+    first = max(window_start(months), month_of(since)) if since else window_start(months)
+    last = month_of(until) if until else "9999-12"
+    return [r[0] for r in conn.execute(f"""
+        SELECT table_name FROM chat_log_partitions
+        WHERE archived_at IS NULL AND month BETWEEN ? AND ?
+        ORDER BY month {"ASC" if oldest_first else "DESC"}
+    """, (first, last))]
+
+
+def _union(tables, select):
+    """SELECT ... over several partitions as one UNION ALL subquery body."""
+    return " UNION ALL ".join(select.format(table=t) for t in tables)
+
+
+def insert_chats(rows):
+    """rows: [(account, user_message, bot_response, intent, confidence, timestamp), ...]"""
+    months = {month_of(row[5]) for row in rows}
+
+    def write(conn):
+        created = False
+        for month in months:
+            if (DB_PATH, month) not in _known_partitions:
+                created |= _create_partition(conn, month)
+        # ids come from one sequence across partitions (the highest any of
+        # them has handed out), so they keep growing in arrival order
+        # whichever month a row lands in
+        last = conn.execute(
+            "SELECT COALESCE(MAX(seq), 0) FROM sqlite_sequence WHERE name LIKE 'chat\\_logs\\_%' ESCAPE '\\'"
+        ).fetchone()[0]
+        by_month = {}
+        for n, row in enumerate(rows, last + 1):
+            by_month.setdefault(month_of(row[5]), []).append((n,) + tuple(row))
+        for month, month_rows in by_month.items():
+            conn.executemany(f"""
+                INSERT INTO {partition_table(month)} (id, {CHAT_LOG_COLUMNS})
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            """, month_rows)
+            conn.execute("UPDATE chat_log_partitions SET row_count = row_count + ? WHERE month=?",
+                         (len(month_rows), month))
+        apply_rollups(conn.executemany, rows)
+        return created
+
+    created = run_write(write)
+    with _partition_lock:
+        _known_partitions.update((DB_PATH, month) for month in months)
+    if created:
+        archive_old_partitions()
+
+
+def archive_old_partitions(keep_months=None, now_month=None):
+    """
+    Archive and drop partitions older than the retention window: the
+    current month plus keep_months before it stay live. Returns the
+    archive files written.
+    """
+    keep = CHAT_LOG_RETENTION_MONTHS if keep_months is None else keep_months
+    if keep <= 0:
+        return []
+    cutoff = shift_month(now_month or month_of(utc_timestamp()), -keep)
+    conn = get_db()
+    old = conn.execute("""
+        SELECT month, table_name FROM chat_log_partitions
+        WHERE archived_at IS NULL AND month < ?
+        ORDER BY month
+    """, (cutoff,)).fetchall()
+    conn.close()
+
+    written = []
+    for month, table in old:
+        conn = get_db()
+        try:
+            rows = conn.execute(f"SELECT id, {CHAT_LOG_COLUMNS} FROM {table} ORDER BY id")
+            path = write_chat_archive(month, ["id"] + CHAT_LOG_COLUMNS.split(", "), rows)
+        finally:
+            conn.close()
+
+        def drop(conn, month=month, table=table, path=path):
+            conn.execute(f"DROP TABLE IF EXISTS {table}")
+            conn.execute("DELETE FROM chat_rollup_messages WHERE month=?", (month,))
+            conn.execute("UPDATE chat_log_partitions SET archived_at=?, archive_file=? WHERE month=?",
+                         (utc_timestamp(), path, month))
+            _rebuild_chat_logs_view(conn)
+        run_write(drop)
+        written.append(path)
+        print(f"ℹ️ Archived chat logs for {month} to {path}.")
+    return written
+
+
+def partition_stats():
+    conn = get_db()
+    live, archived = conn.execute("""
+        SELECT COUNT(*) - COUNT(archived_at), COUNT(archived_at) FROM chat_log_partitions
+    """).fetchone()
+    conn.close()
+    return {"live": live, "archived": archived, "retention_months": CHAT_LOG_RETENTION_MONTHS,
+            "analytics_months": ANALYTICS_MONTHS, "archive_dir": archive_dir()}
+
+
+def write_chat_archive(month, header, rows):
+    """Stream rows into <archive dir>/chat_logs_YYYYMM.csv.gz; returns the path."""
+    folder = archive_dir()
+    os.makedirs(folder, exist_ok=True)
+    path = os.path.join(folder, partition_table(month) + ".csv.gz")
+    tmp_path = path + ".tmp"
+    with gzip.open(tmp_path, "wt", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(header)
+        writer.writerows(tuple(r) for r in rows)
+    os.replace(tmp_path, path)     # never leave a half-written archive
+    return path
+
+
 # ---------------- SAVE & GET CHAT LOGS ----------------
+chat_log = create_writer(insert_chats)     # None: BANKBOT_CHAT_LOG_ASYNC=0
+
+
+def utc_timestamp():
+    """Now, in the form CURRENT_TIMESTAMP stores."""
+    return time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime())
+
+
 def save_chat(account, user_message, bot_response, intent=None, confidence=None):
+    # stamped now, not when the batch is written
+    row = (account, user_message, bot_response, intent, confidence, utc_timestamp())
+    if chat_log is not None:
+        chat_log.put(row)
+    else:
+        insert_chats([row])
+
+
+def flush_chats():
+    """Wait until every queued chat log row is written."""
+    if chat_log is not None:
+        chat_log.flush()
+
+
+def chat_log_stats():
+    return chat_log.stats() if chat_log is not None else None
+
+
+def get_recent_chats(limit=10):
     conn = get_db()
-    c = conn.cursor()
-    c.execute("""
-        INSERT INTO chat_logs (account, user_message, bot_response, intent, confidence)
-        VALUES (?, ?, ?, ?, ?)
-    """, (account, user_message, bot_response, intent, confidence))
-    conn.commit()
+    rows = []
+    for table in _partitions(conn):          # newest month first; usually just one
+        rows += conn.execute(f"""
+            SELECT {CHAT_LOG_COLUMNS}
+            FROM {table}
+            ORDER BY id DESC
+            LIMIT ?
+        """, (limit - len(rows),)).fetchall()
+        if len(rows) >= limit:
+            break
     conn.close()
+    return rows
 
 
-def get_recent_chats(limit=10):
+def get_chat_logs(account=None, oldest_first=False):
+    """
+    Full chat log, newest first (or oldest first). For one account the
+    account column is left out; for all accounts it comes first.
+    """
+    order = "ASC" if oldest_first else "DESC"
     conn = get_db()
-    c = conn.cursor()
-    c.execute("""
-        SELECT account, user_message, bot_response, intent, confidence, timestamp
-        FROM chat_logs
-        ORDER BY id DESC
-        LIMIT ?
-    """, (limit,))
-    rows = c.fetchall()
+    rows = []
+    for table in _partitions(conn, oldest_first=oldest_first):
+        if account is None:
+            rows += conn.execute(f"""
+                SELECT {CHAT_LOG_COLUMNS}
+                FROM {table}
+                ORDER BY id {order}
+            """).fetchall()
+        else:
+            rows += conn.execute(f"""
+                SELECT user_message, bot_response, intent, confidence, timestamp
+                FROM {table}
+                WHERE account=?
+                ORDER BY id {order}
+            """, (account,)).fetchall()
     conn.close()
     return rows
 
 
-# ---------------- AUTO-FAQ / ANALYTICS ----------------
-def get_frequent_questions():
+# ---------------- CHAT LOG PAGES (admin views) ----------------
+# Keyset pages, newest first: a page is the next `limit` matching rows with
+# id below the cursor, read partition by partition, so its cost depends on
+# the page size and not on how many logs exist. An account or intent
+# filter walks that column's (column, id) index.
+
+CHAT_PAGE_SIZE = int(os.environ.get("BANKBOT_CHAT_PAGE_SIZE", 50))
+
+# filter name -> condition; since is inclusive, until exclusive (UTC timestamps)
+CHAT_LOG_FILTERS = {
+    "account": "account = {}",
+    "intent": "intent = {}",
+    "min_confidence": "confidence >= {}",
+    "max_confidence": "confidence <= {}",
+    "since": "timestamp >= {}",
+    "until": "timestamp < {}",
+}
+
+
+def chat_log_filter_sql(filters, mark="?"):
+    """(conditions, params) for the filters that are set."""
+    conditions, params = [], []
+    for name, condition in CHAT_LOG_FILTERS.items():
+        value = (filters or {}).get(name)
+        if value is not None and value != "":
+            conditions.append(condition.format(mark))
+            params.append(value)
+    return conditions, params
+
+
+def get_chat_log_page(filters=None, before_id=None, limit=CHAT_PAGE_SIZE):
+    """(rows, before_id for the next older page or None); rows carry id first."""
+    filters = filters or {}
+    conditions, params = chat_log_filter_sql(filters)
+    where = " AND ".join(conditions + ["id < ?"])
+    before = before_id if before_id is not None else 2 ** 63 - 1
     conn = get_db()
-    c = conn.cursor()
-    c.execute("""
-        SELECT user_message, bot_response, COUNT(*) AS freq
-        FROM chat_logs
-        WHERE TRIM(user_message) <> ''
+    rows = []
+    for table in _partitions(conn, since=filters.get("since"), until=filters.get("until")):
+        rows += conn.execute(f"""
+            SELECT id, {CHAT_LOG_COLUMNS}
+            FROM {table}
+            WHERE {where}
+            ORDER BY id DESC
+            LIMIT ?
+        """, params + [before, limit + 1 - len(rows)]).fetchall()
+        if len(rows) > limit:
+            break
+    conn.close()
+    if len(rows) > limit:
+        return rows[:limit], rows[limit - 1]["id"]
+    return rows, None
+
+
+# ---------------- CHAT LOG EXPORT ----------------
+EXPORT_BATCH_SIZE = int(os.environ.get("BANKBOT_EXPORT_BATCH_SIZE", 1000))
+
+
+def iter_chat_logs(filters=None, columns=CHAT_LOG_COLUMNS, batch_size=EXPORT_BATCH_SIZE):
+    """
+    Matching chat rows oldest first, in batches of up to batch_size, pulled
+    with fetchmany so an export of any size holds one batch at a time.
+    Close the generator to release the connection early.
+    """
+    filters = filters or {}
+    conditions, params = chat_log_filter_sql(filters)
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    conn = get_db()
+    cur = conn.cursor()
+    try:
+        for table in _partitions(conn, oldest_first=True,
+                                 since=filters.get("since"), until=filters.get("until")):
+            cur.execute(f"SELECT {columns} FROM {table} {where} ORDER BY id", params)
+            while True:
+                batch = cur.fetchmany(batch_size)
+                if not batch:
+                    break
+                yield batch
+    finally:
+        cur.close()         # ends an unfinished read before the connection goes back to the pool
+        conn.close()
+
+
+# ---------------- ANALYTICS ROLLUPS ----------------
+# Admin analytics read small rollup tables instead of the logs:
+#   chat_rollup_daily       (day, intent)                    -> messages
+#   chat_rollup_messages    (month, user_message, response)  -> messages
+#   chat_rollup_confidence  (day, confidence bucket)         -> messages
+# They are updated in the same transaction that inserts the chat rows, so
+# they always agree with the logs. Daily and confidence counts outlive
+# archiving; message texts are dropped together with their month's logs.
+
+CONFIDENCE_BUCKETS = 10         # [0, 0.1), [0.1, 0.2), ... [0.9, 1]; -1: no confidence
+
+ROLLUP_UPSERTS = [
+    """INSERT INTO chat_rollup_daily (day, intent, messages) VALUES ({0}, {0}, {0})
+       ON CONFLICT (day, intent) DO UPDATE
+       SET messages = chat_rollup_daily.messages + excluded.messages""",
+    """INSERT INTO chat_rollup_messages (month, user_message, bot_response, messages) VALUES ({0}, {0}, {0}, {0})
+       ON CONFLICT (month, user_message, bot_response) DO UPDATE
+       SET messages = chat_rollup_messages.messages + excluded.messages""",
+    """INSERT INTO chat_rollup_confidence (day, bucket, messages) VALUES ({0}, {0}, {0})
+       ON CONFLICT (day, bucket) DO UPDATE
+       SET messages = chat_rollup_confidence.messages + excluded.messages""",
+]
+
+# one CASE per bucket boundary, so SQL and confidence_bucket() always agree
+BUCKET_SQL = "CASE WHEN confidence IS NULL THEN -1 " + " ".join(
+    f"WHEN confidence >= {b / CONFIDENCE_BUCKETS} THEN {b}" for b in range(CONFIDENCE_BUCKETS - 1, 0, -1)
+) + " ELSE 0 END"
+
+# rebuilds the rollups from a chat log table (a partition, or chat_logs)
+ROLLUP_BACKFILL = [
+    """INSERT INTO chat_rollup_daily (day, intent, messages)
+       SELECT substr(CAST(timestamp AS TEXT), 1, 10), COALESCE(intent, ''), COUNT(*)
+       FROM {table} WHERE timestamp IS NOT NULL
+       GROUP BY 1, 2""",
+    """INSERT INTO chat_rollup_messages (month, user_message, bot_response, messages)
+       SELECT substr(CAST(timestamp AS TEXT), 1, 7), user_message, COALESCE(bot_response, ''), COUNT(*)
+       FROM {table} WHERE timestamp IS NOT NULL AND TRIM(user_message) <> ''
+       GROUP BY 1, 2, 3""",
+    f"""INSERT INTO chat_rollup_confidence (day, bucket, messages)
+       SELECT substr(CAST(timestamp AS TEXT), 1, 10), {BUCKET_SQL}, COUNT(*)
+       FROM {{table}} WHERE timestamp IS NOT NULL
+       GROUP BY 1, 2""",
+]
+
+# reads; {0} is the paramstyle mark, the parameter the window start
+ROLLUP_QUERIES = {
+    "frequent_questions": """
+        SELECT user_message, bot_response, SUM(messages) AS freq
+        FROM chat_rollup_messages
+        WHERE month >= {0}
         GROUP BY user_message, bot_response
-        ORDER BY freq DESC
-    """)
-    rows = c.fetchall()
+        ORDER BY freq DESC""",
+    "total_intents": """
+        SELECT COUNT(DISTINCT intent) FROM chat_rollup_daily
+        WHERE day >= {0} AND intent <> ''""",
+    "intents": """
+        SELECT intent, SUM(messages) AS messages FROM chat_rollup_daily
+        WHERE day >= {0}
+        GROUP BY intent ORDER BY messages DESC""",
+    "daily_volume": """
+        SELECT day, SUM(messages) AS messages FROM chat_rollup_daily
+        WHERE day >= {0}
+        GROUP BY day ORDER BY day""",
+    "confidence": """
+        SELECT bucket, SUM(messages) AS messages FROM chat_rollup_confidence
+        WHERE day >= {0}
+        GROUP BY bucket ORDER BY bucket""",
+}
+
+
+def confidence_bucket(confidence):
+    if confidence is None:
+        return -1
+    for b in range(CONFIDENCE_BUCKETS - 1, 0, -1):
+        if confidence >= b / CONFIDENCE_BUCKETS:
+            return b
+    return 0
+
+
+def rollup_rows(rows):
+    """Upsert parameters for ROLLUP_UPSERTS from chat rows (account, msg, response, intent, conf, ts)."""
+    daily, messages, confidence = {}, {}, {}
+    for _, user_message, bot_response, intent, conf, ts in rows:
+        key = (ts[:10], intent or "")
+        daily[key] = daily.get(key, 0) + 1
+        if (user_message or "").strip():
+            key = (ts[:7], user_message, bot_response or "")
+            messages[key] = messages.get(key, 0) + 1
+        key = (ts[:10], confidence_bucket(conf))
+        confidence[key] = confidence.get(key, 0) + 1
+    return [[k + (n,) for k, n in counts.items()] for counts in (daily, messages, confidence)]
+
+
+def apply_rollups(executemany, rows, mark="?"):
+    for sql, params in zip(ROLLUP_UPSERTS, rollup_rows(rows)):
+        if params:
+            executemany(sql.format(mark), params)
+
+
+def format_analytics(intents, daily_volume, confidence):
+    return {
+        "intents": [{"intent": r[0] or None, "messages": r[1]} for r in intents],
+        "daily_volume": [{"day": r[0], "messages": r[1]} for r in daily_volume],
+        "confidence": [
+            {"bucket": "none" if r[0] < 0 else
+             f"{r[0] / CONFIDENCE_BUCKETS:.1f}-{(r[0] + 1) / CONFIDENCE_BUCKETS:.1f}",
+             "messages": r[1]}
+            for r in confidence
+        ],
+    }
+
+
+# ---------------- AUTO-FAQ / ANALYTICS ----------------
+# Analytics cover the last ANALYTICS_MONTHS calendar months, so their cost
+# does not grow with total history; months=0 reads all of it.
+
+def _rollup_query(name, months):
+    conn = get_db()
+    # a window_start month also bounds days: "2024-05" <= "2024-05-01"
+    rows = conn.execute(ROLLUP_QUERIES[name].format("?"), (window_start(months),)).fetchall()
     conn.close()
     return rows
 
 
+def get_frequent_questions(months=ANALYTICS_MONTHS):
+    return _rollup_query("frequent_questions", months)
+
+
 def get_total_queries():
+    # every message ever logged, archived months included, from the registry
     conn = get_db()
-    c = conn.cursor()
-    c.execute("SELECT COUNT(*) FROM chat_logs")
-    total = c.fetchone()[0]
+    total = conn.execute("SELECT COALESCE(SUM(row_count), 0) FROM chat_log_partitions").fetchone()[0]
     conn.close()
     return total
 
 
-def get_total_intents():
+def get_total_intents(months=ANALYTICS_MONTHS):
+    return _rollup_query("total_intents", months)[0][0]
+
+
+def get_chat_analytics(months=ANALYTICS_MONTHS):
+    """Per-intent counts, daily volume and the confidence histogram."""
+    return format_analytics(*(_rollup_query(name, months)
+                              for name in ("intents", "daily_volume", "confidence")))
+
+
+# ---------------- AUTO-FAQ CLUSTERS ----------------
+# State of faq_clusters.py, which groups near-duplicate chat messages:
+#   faq_clusters          id -> label (first message seen), bot_response, variants
+#   faq_cluster_keys      hash of a normalized message -> cluster
+#   faq_cluster_counts    (cluster, month) -> messages
+#   faq_cluster_buckets   LSH bucket -> clusters whose label falls in it
+#   faq_cluster_progress  last chat id clustered, model version of the buckets
+# A batch is saved only if the progress row still holds the id it started
+# from, so two servers clustering at once never count a row twice.
+
+FAQ_LOOKUP_CHUNK = 500          # keys/buckets per IN (...) lookup
+
+FAQ_CLUSTER_QUERIES = {
+    "top": """
+        SELECT c.id, c.label AS user_message, c.bot_response, SUM(n.messages) AS freq, c.variants
+        FROM faq_cluster_counts n
+        JOIN faq_clusters c ON c.id = n.cluster_id
+        WHERE n.month >= {0}
+        GROUP BY c.id, c.label, c.bot_response, c.variants
+        ORDER BY freq DESC
+        LIMIT {0}""",
+    "progress": "SELECT last_chat_id, model_version FROM faq_cluster_progress WHERE id = 1",
+    "keys": "SELECT key, cluster_id FROM faq_cluster_keys WHERE key IN ({marks})",
+    "buckets": """
+        SELECT DISTINCT c.id, c.label
+        FROM faq_cluster_buckets b
+        JOIN faq_clusters c ON c.id = b.cluster_id
+        WHERE b.bucket IN ({marks})""",
+    "labels": "SELECT id, label FROM faq_clusters",
+}
+
+
+def lookup_faq_clusters(query, keys, buckets, mark="?"):
+    """
+    ({key: cluster id} for the known keys, {cluster id: label} for clusters
+    in any of the buckets -- every cluster when buckets is None).
+    query(sql, params) returns rows.
+    """
+    known, candidates = {}, {}
+    for sql, values, found in ((FAQ_CLUSTER_QUERIES["keys"], list(keys), known),
+                               (FAQ_CLUSTER_QUERIES["buckets"], list(buckets or ()), candidates)):
+        for start in range(0, len(values), FAQ_LOOKUP_CHUNK):
+            chunk = values[start:start + FAQ_LOOKUP_CHUNK]
+            found.update((r[0], r[1]) for r in query(sql.format(marks=", ".join([mark] * len(chunk))), chunk))
+    if buckets is None:
+        candidates.update((r[0], r[1]) for r in query(FAQ_CLUSTER_QUERIES["labels"], ()))
+    return known, candidates
+
+
+def apply_faq_batch(cur, batch, mark="?"):
+    """
+    Save one faq_clusters batch through a DB-API cursor, inside the caller's
+    transaction; False (nothing written) if another run got there first.
+    New clusters carry negative ids in the batch and get real ids here.
+    """
+    m = mark
+    cur.execute(f"UPDATE faq_cluster_progress SET last_chat_id={m}, model_version={m} "
+                f"WHERE id = 1 AND last_chat_id={m}",
+                (batch["last_chat_id"], batch["model_version"], batch["after_id"]))
+    if cur.rowcount != 1:
+        return False
+
+    ids = {}
+    if batch["clusters"]:
+        cur.execute("SELECT COALESCE(MAX(id), 0) FROM faq_clusters")
+        for n, (temp, _, _) in enumerate(batch["clusters"], cur.fetchone()[0] + 1):
+            ids[temp] = n
+        cur.executemany(f"INSERT INTO faq_clusters (id, label, bot_response, variants) VALUES ({m}, {m}, {m}, 0)",
+                        [(ids[temp], label, response) for temp, label, response in batch["clusters"]])
+
+    def real(cluster):
+        return ids.get(cluster, cluster)
+
+    variants = {}
+    for _, cluster in batch["keys"]:
+        variants[real(cluster)] = variants.get(real(cluster), 0) + 1
+    if batch["keys"]:
+        cur.executemany(f"INSERT INTO faq_cluster_keys (key, cluster_id) VALUES ({m}, {m})",
+                        [(key, real(cluster)) for key, cluster in batch["keys"]])
+        cur.executemany(f"UPDATE faq_clusters SET variants = variants + {m} WHERE id = {m}",
+                        [(n, cluster) for cluster, n in variants.items()])
+    if batch["counts"]:
+        cur.executemany(f"""
+            INSERT INTO faq_cluster_counts (cluster_id, month, messages) VALUES ({m}, {m}, {m})
+            ON CONFLICT (cluster_id, month) DO UPDATE
+            SET messages = faq_cluster_counts.messages + excluded.messages
+        """, [(real(cluster), month, n) for (cluster, month), n in batch["counts"].items()])
+    if batch["rebuild"]:
+        cur.execute("DELETE FROM faq_cluster_buckets")
+    if batch["buckets"]:
+        cur.executemany(f"""
+            INSERT INTO faq_cluster_buckets (bucket, cluster_id) VALUES ({m}, {m})
+            ON CONFLICT (bucket, cluster_id) DO NOTHING
+        """, [(bucket, real(cluster)) for bucket, cluster in batch["buckets"]])
+    return True
+
+
+def get_chats_after(after_id, limit):
+    """Chat rows (id, user_message, bot_response, timestamp) with id > after_id, oldest first."""
     conn = get_db()
-    c = conn.cursor()
-    c.execute("""
-        SELECT COUNT(DISTINCT intent)
-        FROM chat_logs
-        WHERE intent IS NOT NULL AND intent <> ''
-    """)
-    total = c.fetchone()[0]
+    tables = _partitions(conn)
+    if not tables:
+        conn.close()
+        return []
+    # each partition contributes at most `limit` rows, read along its rowid
+    rows = conn.execute(" UNION ALL ".join(
+        f"SELECT * FROM (SELECT id, user_message, bot_response, timestamp FROM {t} "
+        f"WHERE id > ? ORDER BY id LIMIT ?)" for t in tables
+    ) + " ORDER BY id LIMIT ?", [after_id, limit] * len(tables) + [limit]).fetchall()
     conn.close()
-    return total
+    return rows
+
+
+def get_faq_progress():
+    conn = get_db()
+    row = conn.execute(FAQ_CLUSTER_QUERIES["progress"]).fetchone()
+    conn.close()
+    return row[0], row[1]
+
+
+def find_faq_clusters(keys, buckets=None):
+    conn = get_db()
+    try:
+        return lookup_faq_clusters(lambda sql, params: conn.execute(sql, params).fetchall(), keys, buckets)
+    finally:
+        conn.close()
+
+
+def save_faq_batch(batch):
+    def write(conn):
+        return apply_faq_batch(conn.cursor(), batch)
+    return run_write(write)
+
+
+def get_faq_clusters(months=ANALYTICS_MONTHS, limit=100):
+    conn = get_db()
+    rows = conn.execute(FAQ_CLUSTER_QUERIES["top"].format("?"), (window_start(months), limit)).fetchall()
+    conn.close()
+    return rows
 
 
 # ---------------- FAQ MANAGEMENT (manual) ----------------
@@ -265,37 +1161,349 @@ def get_all_faqs():
 
 
 def add_faq(question, answer):
-    conn = get_db()
-    c = conn.cursor()
-    c.execute("INSERT INTO faq (question, answer) VALUES (?, ?)", (question, answer))
-    conn.commit()
-    conn.close()
+    execute_write("INSERT INTO faq (question, answer) VALUES (?, ?)", (question, answer))
 
 
 def delete_faq(faq_id):
+    execute_write("DELETE FROM faq WHERE id=?", (faq_id,))
+
+
+# ---------------- CHAT SESSIONS ----------------
+# Chatbot state shared by every worker (session_store.SharedStateStore):
+#
+#   chat_sessions       session key -> JSON state, last saved time
+#   chat_session_locks  session key -> lease held by the request using it
+#
+# A request claims the lease before it loads the state and gives it back in
+# the transaction that saves it, so one user's requests run one at a time
+# across processes. A lease that outlives its expiry (the worker died) can
+# be claimed by the next request; a save from a request whose lease was
+# taken over is dropped.
+
+SESSION_QUERIES = {
+    # no row is changed while someone else's lease is still live
+    "claim": """
+        INSERT INTO chat_session_locks (session_key, owner, expires_at) VALUES ({0}, {0}, {0})
+        ON CONFLICT (session_key) DO UPDATE
+        SET owner = excluded.owner, expires_at = excluded.expires_at
+        WHERE chat_session_locks.expires_at < {0}""",
+    "release": "DELETE FROM chat_session_locks WHERE session_key={0} AND owner={0}",
+    "load": "SELECT state FROM chat_sessions WHERE session_key={0} AND updated_at>={0}",
+    "save": """
+        INSERT INTO chat_sessions (session_key, state, updated_at) VALUES ({0}, {0}, {0})
+        ON CONFLICT (session_key) DO UPDATE
+        SET state = excluded.state, updated_at = excluded.updated_at""",
+    "delete": "DELETE FROM chat_sessions WHERE session_key={0}",
+    "purge": "DELETE FROM chat_sessions WHERE updated_at<{0}",
+    "purge_locks": "DELETE FROM chat_session_locks WHERE expires_at<{0}",
+}
+
+
+def apply_session_save(cur, key, state, now, owner=None, purge_before=None, mark="?"):
+    """
+    Save one session through a DB-API cursor, inside the caller's
+    transaction, releasing `owner`'s lease; False (nothing written) if the
+    lease is no longer owner's.
+    """
+    q = {name: sql.format(mark) for name, sql in SESSION_QUERIES.items()}
+    if owner is not None:
+        cur.execute(q["release"], (key, owner))
+        if cur.rowcount != 1:
+            return False
+    cur.execute(q["save"], (key, state, now))
+    if purge_before is not None:
+        cur.execute(q["purge"], (purge_before,))
+        cur.execute(q["purge_locks"], (now,))
+    return True
+
+
+def claim_session(key, owner, now, lease):
+    def write(conn):
+        return conn.execute(SESSION_QUERIES["claim"].format("?"), (key, owner, now + lease, now)).rowcount == 1
+    return run_write(write)
+
+
+def release_session(key, owner):
+    execute_write(SESSION_QUERIES["release"].format("?"), (key, owner))
+
+
+def load_session(key, since):
     conn = get_db()
-    c = conn.cursor()
-    c.execute("DELETE FROM faq WHERE id=?", (faq_id,))
-    conn.commit()
+    row = conn.execute(SESSION_QUERIES["load"].format("?"), (key, since)).fetchone()
     conn.close()
+    return row["state"] if row else None
+
 
+def save_session(key, state, now, owner=None, purge_before=None):
+    def write(conn):
+        return apply_session_save(conn.cursor(), key, state, now, owner, purge_before)
+    return run_write(write)
 
-# ---------------- SAFE MIGRATION ----------------
-def ensure_columns():
+
+def delete_session(key):
+    execute_write(SESSION_QUERIES["delete"].format("?"), (key,))
+
+
+# ---------------- SCHEMA MIGRATIONS ----------------
+# Numbered, forward-only steps. The schema version lives in the database
+# header (PRAGMA user_version), so each step runs exactly once per database,
+# in its own transaction, right after create_db().
+
+def _add_chat_log_columns(conn):
+    # databases created before chat_logs had intent/confidence
+    have = {row["name"] for row in conn.execute("PRAGMA table_info(chat_logs)")}
+    for name, kind in (("intent", "TEXT"), ("confidence", "REAL")):
+        if name not in have:
+            conn.execute(f"ALTER TABLE chat_logs ADD COLUMN {name} {kind}")
+
+
+def _partition_chat_logs(conn):
+    # chat_logs becomes one table per month plus a view over them
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS chat_log_partitions (
+            month TEXT PRIMARY KEY,
+            table_name TEXT NOT NULL,
+            row_count INTEGER NOT NULL DEFAULT 0,
+            archived_at DATETIME,
+            archive_file TEXT
+        )
+    """)
+    conn.execute("ALTER TABLE chat_logs RENAME TO chat_logs_unpartitioned")
+    month = f"COALESCE(substr(timestamp, 1, 7), '{month_of(utc_timestamp())}')"
+    months = [r[0] for r in conn.execute(f"SELECT DISTINCT {month} FROM chat_logs_unpartitioned")]
+    for m in sorted(set(months) | {month_of(utc_timestamp())}):
+        _create_partition(conn, m)
+        copied = conn.execute(f"""
+            INSERT INTO {partition_table(m)} (id, {CHAT_LOG_COLUMNS})
+            SELECT id, {CHAT_LOG_COLUMNS} FROM chat_logs_unpartitioned
+            WHERE {month} = ?
+            ORDER BY id
+        """, (m,)).rowcount
+        conn.execute("UPDATE chat_log_partitions SET row_count=? WHERE month=?", (copied, m))
+    conn.execute("DROP TABLE chat_logs_unpartitioned")
+    _rebuild_chat_logs_view(conn)
+
+
+def _index_chat_log_intents(conn):
+    # admin views filter by intent; new partitions get this in _create_partition
+    for (name,) in conn.execute("SELECT table_name FROM chat_log_partitions WHERE archived_at IS NULL"):
+        conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{name}_intent ON {name} (intent, id)")
+
+
+def _create_rollups(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS chat_rollup_daily (
+            day TEXT NOT NULL,
+            intent TEXT NOT NULL,
+            messages INTEGER NOT NULL,
+            PRIMARY KEY (day, intent)
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS chat_rollup_messages (
+            month TEXT NOT NULL,
+            user_message TEXT NOT NULL,
+            bot_response TEXT NOT NULL,
+            messages INTEGER NOT NULL,
+            PRIMARY KEY (month, user_message, bot_response)
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS chat_rollup_confidence (
+            day TEXT NOT NULL,
+            bucket INTEGER NOT NULL,
+            messages INTEGER NOT NULL,
+            PRIMARY KEY (day, bucket)
+        )
+    """)
+    # a day or month never spans two partitions, so the backfills never collide
+    for (name,) in conn.execute("SELECT table_name FROM chat_log_partitions WHERE archived_at IS NULL"):
+        for sql in ROLLUP_BACKFILL:
+            conn.execute(sql.format(table=name))
+
+
+def _create_faq_clusters(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS faq_clusters (
+            id INTEGER PRIMARY KEY,
+            label TEXT NOT NULL,
+            bot_response TEXT,
+            variants INTEGER NOT NULL DEFAULT 0
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS faq_cluster_keys (
+            key TEXT PRIMARY KEY,
+            cluster_id INTEGER NOT NULL
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS faq_cluster_counts (
+            cluster_id INTEGER NOT NULL,
+            month TEXT NOT NULL,
+            messages INTEGER NOT NULL,
+            PRIMARY KEY (cluster_id, month)
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_faq_cluster_counts_month ON faq_cluster_counts (month)")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS faq_cluster_buckets (
+            bucket TEXT NOT NULL,
+            cluster_id INTEGER NOT NULL,
+            PRIMARY KEY (bucket, cluster_id)
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS faq_cluster_progress (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            last_chat_id INTEGER NOT NULL,
+            model_version TEXT
+        )
+    """)
+    conn.execute("INSERT OR IGNORE INTO faq_cluster_progress (id, last_chat_id) VALUES (1, 0)")
+
+
+def _create_chat_sessions(conn):
+    # chat_sessions was created by the sqlite session store before it had a migration
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS chat_sessions (
+            session_key TEXT PRIMARY KEY,
+            state TEXT NOT NULL,
+            updated_at REAL NOT NULL
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS chat_session_locks (
+            session_key TEXT PRIMARY KEY,
+            owner TEXT NOT NULL,
+            expires_at REAL NOT NULL
+        )
+    """)
+
+
+def _create_user_changes(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS user_changes (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            n INTEGER NOT NULL
+        )
+    """)
+    conn.execute("INSERT OR IGNORE INTO user_changes (id, n) VALUES (1, 0)")
+    for event in ("INSERT", "UPDATE", "DELETE"):
+        conn.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS users_changed_{event.lower()} AFTER {event} ON users
+            BEGIN
+                UPDATE user_changes SET n = n + 1 WHERE id = 1;
+            END
+        """)
+
+
+MIGRATIONS = [
+    (1, "chat_logs intent/confidence columns", _add_chat_log_columns),
+    (2, "indexes for the hot lookups", [
+        # get_transactions: sender and receiver side, newest first
+        "CREATE INDEX IF NOT EXISTS idx_transactions_sender ON transactions (sender_account, id)",
+        "CREATE INDEX IF NOT EXISTS idx_transactions_receiver ON transactions (receiver_account, id)",
+        # /chat_logs and export_excel: one account's log in id order
+        "CREATE INDEX IF NOT EXISTS idx_chat_logs_account ON chat_logs (account, id)",
+        # get_frequent_questions: covering, the GROUP BY never touches the table
+        "CREATE INDEX IF NOT EXISTS idx_chat_logs_message ON chat_logs (user_message, bot_response)",
+        # verify_user_login (email is not UNIQUE in older databases)
+        "CREATE INDEX IF NOT EXISTS idx_users_email ON users (email)",
+    ]),
+    (3, "transfer idempotency keys", [
+        "ALTER TABLE transactions ADD COLUMN idempotency_key TEXT",
+        "CREATE UNIQUE INDEX IF NOT EXISTS idx_transactions_idempotency "
+        "ON transactions (idempotency_key) WHERE idempotency_key IS NOT NULL",
+    ]),
+    (4, "monthly chat_logs partitions", _partition_chat_logs),
+    (5, "chat log intent indexes", _index_chat_log_intents),
+    (6, "analytics rollup tables", _create_rollups),
+    (7, "auto-FAQ cluster tables", _create_faq_clusters),
+    (8, "shared chat session tables", _create_chat_sessions),
+    (9, "user change counter", _create_user_changes),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+
+def migrate():
+    """Apply every migration newer than the database's user_version."""
     conn = get_db()
-    c = conn.cursor()
     try:
-        c.execute("ALTER TABLE chat_logs ADD COLUMN intent TEXT;")
-        c.execute("ALTER TABLE chat_logs ADD COLUMN confidence REAL;")
-        print("ℹ️ Added missing columns in chat_logs table.")
-    except sqlite3.OperationalError:
-        pass  # already exists
-    conn.commit()
-    conn.close()
+        for version, description, step in MIGRATIONS:
+            conn.execute("BEGIN IMMEDIATE")
+            # re-read under the write lock: another process may have migrated
+            if conn.execute("PRAGMA user_version").fetchone()[0] >= version:
+                conn.rollback()
+                continue
+            if callable(step):
+                step(conn)
+            else:
+                for sql in step:
+                    conn.execute(sql)
+            conn.execute(f"PRAGMA user_version={version}")
+            conn.commit()
+            print(f"ℹ️ Applied migration {version}: {description}.")
+    finally:
+        conn.close()
+        with _partition_lock:
+            _known_partitions.difference_update({k for k in _known_partitions if k[0] == DB_PATH})
+
+
+# ---------------- QUERY PLAN CHECK ----------------
+# The hot queries (as run by db.py and app.py) and the index each must use.
+# {chat_logs} stands for a chat log partition; the newest one is checked.
+HOT_QUERIES = [
+    ("get_transactions", TRANSACTION_PAGE_SQL, ("x", 100, 20, "x", 100, 20, 20),
+     ("idx_transactions_sender", "idx_transactions_receiver")),
+    ("get_chat_logs (/chat_logs)", """
+        SELECT user_message, bot_response, intent, confidence, timestamp
+        FROM {chat_logs}
+        WHERE account=?
+        ORDER BY id DESC
+    """, ("x",), ("idx_{chat_logs}_account",)),
+    ("get_chat_logs (export_excel)", """
+        SELECT user_message, bot_response, intent, confidence, timestamp
+        FROM {chat_logs}
+        WHERE account=?
+        ORDER BY id
+    """, ("x",), ("idx_{chat_logs}_account",)),
+    ("get_frequent_questions", ROLLUP_QUERIES["frequent_questions"].format("?"),
+     ("2024-01",), ("sqlite_autoindex_chat_rollup_messages_1",)),
+    ("get_chat_analytics (daily volume)", ROLLUP_QUERIES["daily_volume"].format("?"),
+     ("2024-01",), ("sqlite_autoindex_chat_rollup_daily_1",)),
+    ("get_chat_log_page (intent filter)", """
+        SELECT id, account, user_message, bot_response, intent, confidence, timestamp
+        FROM {chat_logs}
+        WHERE intent = ? AND id < ?
+        ORDER BY id DESC
+        LIMIT ?
+    """, ("x", 100, 51), ("idx_{chat_logs}_intent",)),
+    ("verify_user_login", "SELECT * FROM users WHERE email=? AND password=?",
+     ("x", "x"), ("idx_users_email",)),
+]
+
+
+def check_query_plans():
+    """[(name, plan lines, ok)]: ok when the plan uses the expected indexes."""
+    conn = get_db()
+    try:
+        results = []
+        partition = _partitions(conn)[0]
+        for name, sql, params, indexes in HOT_QUERIES:
+            sql = sql.replace("{chat_logs}", partition)
+            indexes = [index.replace("{chat_logs}", partition) for index in indexes]
+            plan = [row["detail"] for row in conn.execute("EXPLAIN QUERY PLAN " + sql, params)]
+            ok = all(any(index in line for line in plan) for index in indexes)
+            results.append((name, plan, ok))
+        return results
+    finally:
+        conn.close()
 
 
 # ---------------- INIT ----------------
 if __name__ == "__main__":
     create_db()
-    ensure_columns()
+    migrate()
     print("📌 DB setup complete.")
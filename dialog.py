@@ -0,0 +1,146 @@
+import re
+
+# Table-driven dialog flows for the chatbot. A flow is plain data: a dict of
+# step number -> step spec. Flow() compiles every spec into a handler once at
+# import, so a turn is one dict lookup on the current step instead of a walk
+# down the whole if/elif tree.
+#
+# Step spec keys:
+#   parse          callable(turn) -> value, or None to re-ask (required
+#                  unless the step supplies its own `handle`)
+#   field          record key the parsed value is stored under
+#   retry          reply when parse() returns None      (+ retry_intent)
+#   help           (rule_name, intent, reply): answered without advancing
+#   reject         [(predicate(value, record), reply), ...]: the flow ends
+#   next           next step number, or {value: step}; default step + 1
+#   prompt         reply after advancing: str, {value: str} or
+#                  callable(record)                     (+ prompt_intent)
+#   finish         callable(record, value) -> reply: last step of the flow
+#   handle         callable(turn) -> (intent, entities, reply): custom step
+
+
+class Turn:
+    """One user message as seen by the flows."""
+
+    __slots__ = ("memory", "raw", "text", "hits", "ent")
+
+    def __init__(self, memory, raw, text, hits, ent):
+        self.memory = memory
+        self.raw = raw          # stripped user input
+        self.text = text        # normalize_text(raw)
+        self.hits = hits        # RuleHits for text
+        self.ent = ent
+
+
+# ---------------- PARSERS ----------------
+def digits(turn):
+    return int(turn.raw) if turn.raw.isdigit() else None
+
+
+def number(pattern, strip_commas=True):
+    """First match of pattern in the message, as an int."""
+    regex = re.compile(pattern)
+
+    def parse(turn):
+        m = regex.search(turn.raw.replace(",", "") if strip_commas else turn.raw)
+        return int(m.group(0)) if m else None
+    return parse
+
+
+def whole(pattern):
+    """The whole message as an int, if it matches pattern."""
+    regex = re.compile(pattern)
+    return lambda turn: int(turn.raw) if regex.fullmatch(turn.raw) else None
+
+
+def choice(mapping):
+    return lambda turn: mapping.get(turn.raw)
+
+
+def keyword(pairs):
+    """Value of the first (word, value) pair whose word occurs in the text."""
+    def parse(turn):
+        for word, value in pairs:
+            if word in turn.text:
+                return value
+        return None
+    return parse
+
+
+def contains(word):
+    return lambda turn: word in turn.text
+
+
+def free_text(turn):
+    return turn.raw
+
+
+def below(limit):
+    return lambda value, record: value < limit
+
+
+# ---------------- FLOW ----------------
+class Flow:
+
+    def __init__(self, steps, state, record=None, intent=None, result_intent=None,
+                 on_exit=None, on_finish=None):
+        """
+        state(memory) -> dict holding "step"; record(memory) -> dict the
+        step fields go into (defaults to the state dict). Rejections and
+        finish replies use result_intent; on_exit(memory) runs after a
+        rejection, on_finish(memory) after a finish step.
+        """
+        self.state = state
+        self.record = record or state
+        self.intent = intent
+        self.result_intent = result_intent or intent
+        self.on_exit = on_exit
+        self.on_finish = on_finish
+        self.handlers = {step: self._compile(step, spec) for step, spec in steps.items()}
+
+    def handle(self, turn):
+        """(intent, entities, reply) for this turn, or None if no step matches."""
+        handler = self.handlers.get(self.state(turn.memory)["step"])
+        return handler(turn) if handler else None
+
+    def _compile(self, step, spec):
+        if "handle" in spec:
+            return spec["handle"]
+
+        parse = spec["parse"]
+        field = spec.get("field")
+        help_ = spec.get("help")
+        retry_intent = spec.get("retry_intent", self.intent)
+        retry = spec.get("retry")
+        rejects = spec.get("reject", ())
+        finish = spec.get("finish")
+        nxt = spec.get("next", step + 1)
+        prompt = spec.get("prompt")
+        prompt_intent = spec.get("prompt_intent", self.intent)
+
+        def handler(turn):
+            if help_ and help_[0] in turn.hits:
+                return help_[1], {}, help_[2]
+            value = parse(turn)
+            if value is None:
+                return retry_intent, {}, retry
+            record = self.record(turn.memory)
+            if field:
+                record[field] = value
+            for rejected, reply in rejects:
+                if rejected(value, record):
+                    self.on_exit(turn.memory)
+                    return self.result_intent, {}, reply
+            if finish:
+                reply = finish(record, value)
+                self.on_finish(turn.memory)
+                return self.result_intent, {}, reply
+            self.state(turn.memory)["step"] = nxt[value] if isinstance(nxt, dict) else nxt
+            if isinstance(prompt, dict):
+                reply = prompt[value]
+            elif callable(prompt):
+                reply = prompt(record)
+            else:
+                reply = prompt
+            return prompt_intent, {}, reply
+        return handler
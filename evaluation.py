@@ -0,0 +1,114 @@
+import hashlib
+import io
+import os
+from datetime import datetime
+
+# Training-set evaluation of a model version, computed once when the model
+# is trained and stored next to its artifact (model_store.save_metrics), so
+# the admin dashboard reads numbers instead of re-predicting the whole CSV.
+#
+# The stored form is additive: the confusion counts {true: {predicted: n}}
+# plus how many bytes of the CSV they cover and a hash of those bytes. Rows
+# appended to the CSV afterwards are evaluated on their own, on demand, and
+# merged in; if the covered bytes changed (the file was edited, not just
+# appended to) the whole file is evaluated again.
+
+
+def _read_csv_bytes(data_file):
+    with open(data_file, "rb") as f:
+        return f.read()
+
+
+def _frame(raw, names=None):
+    import pandas as pd     # deferred: the dashboard only reads stored numbers
+    if names:
+        return pd.read_csv(io.BytesIO(raw), encoding="latin1", names=names, header=None)
+    return pd.read_csv(io.BytesIO(raw), encoding="latin1")
+
+
+def _confusion(pipeline, data):
+    confusion = {}
+    if len(data):
+        preds = pipeline.predict(data["text"].astype(str))
+        for true, pred in zip(data["intent"].astype(str), preds):
+            row = confusion.setdefault(true, {})
+            row[str(pred)] = row.get(str(pred), 0) + 1
+    return confusion
+
+
+def evaluate(pipeline, data_file, version=None):
+    """Metrics over every row of data_file."""
+    raw = _read_csv_bytes(data_file)
+    data = _frame(raw)
+    return {
+        "model_version": version,
+        "rows": len(data),
+        "data_bytes": len(raw),
+        "data_sha256": hashlib.sha256(raw).hexdigest(),
+        "columns": [str(c) for c in data.columns],
+        "confusion": _confusion(pipeline, data),
+        "evaluated_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "incremental_updates": 0,
+    }
+
+
+def pending(metrics, data_file):
+    """True when data_file differs from what the metrics cover."""
+    try:
+        return os.path.getsize(data_file) != metrics["data_bytes"]
+    except OSError:
+        return False
+
+
+def update(pipeline, data_file, metrics):
+    """
+    Metrics brought up to date with data_file: only rows appended since
+    `metrics` was computed are predicted, unless the covered part changed.
+    """
+    raw = _read_csv_bytes(data_file)
+    covered = metrics["data_bytes"]
+    if len(raw) < covered or hashlib.sha256(raw[:covered]).hexdigest() != metrics["data_sha256"]:
+        return evaluate(pipeline, data_file, metrics.get("model_version"))
+    if len(raw) == covered:
+        return metrics
+
+    new = _frame(raw[covered:], names=metrics["columns"])
+    confusion = {true: dict(row) for true, row in metrics["confusion"].items()}
+    for true, row in _confusion(pipeline, new).items():
+        merged = confusion.setdefault(true, {})
+        for pred, n in row.items():
+            merged[pred] = merged.get(pred, 0) + n
+    return dict(metrics, rows=metrics["rows"] + len(new), data_bytes=len(raw),
+                data_sha256=hashlib.sha256(raw).hexdigest(), confusion=confusion,
+                evaluated_at=datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                incremental_updates=metrics.get("incremental_updates", 0) + 1)
+
+
+def summarize(metrics):
+    """Accuracy, per-intent precision/recall/support and the confusion matrix."""
+    confusion = metrics["confusion"]
+    labels = sorted(set(confusion) | {p for row in confusion.values() for p in row})
+    support = {label: sum(confusion.get(label, {}).values()) for label in labels}
+    predicted = {label: sum(row.get(label, 0) for row in confusion.values()) for label in labels}
+    correct = sum(confusion.get(label, {}).get(label, 0) for label in labels)
+    total = sum(support.values())
+
+    per_intent = {}
+    for label in labels:
+        tp = confusion.get(label, {}).get(label, 0)
+        per_intent[label] = {
+            "precision": round(tp / predicted[label], 4) if predicted[label] else 0.0,
+            "recall": round(tp / support[label], 4) if support[label] else 0.0,
+            "support": support[label],
+        }
+    return {
+        "model_version": metrics.get("model_version"),
+        "rows": metrics["rows"],
+        "intents": sum(1 for label in labels if support[label]),
+        "accuracy": round(correct / total, 4) if total else None,
+        "per_intent": per_intent,
+        "confusion": {"labels": labels,
+                      "matrix": [[confusion.get(t, {}).get(p, 0) for p in labels] for t in labels]},
+        "evaluated_at": metrics.get("evaluated_at"),
+        "incremental_updates": metrics.get("incremental_updates", 0),
+    }
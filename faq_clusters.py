@@ -0,0 +1,182 @@
+import hashlib
+import os
+import re
+import threading
+
+# Auto-FAQ: chat messages grouped into clusters of near-duplicates, so
+# "balance?", "Balance" and "check my balance" count as one question.
+#
+# Messages are normalized (case, punctuation, digits, spacing) and hashed;
+# a hash seen before goes straight to its cluster. A new one is turned into
+# a vector by the live model's TF-IDF vectorizer and compared with the
+# clusters that share a locality-sensitive hash bucket with it (random
+# hyperplanes, LSH_BANDS bands of LSH_BITS bits): it joins the most similar
+# one at FAQ_SIMILARITY or above, or starts a cluster of its own. Messages
+# the vectorizer knows no words of only merge when they normalize the same.
+#
+# refresh() works through chat rows logged since its last run, so the cost
+# follows new traffic, never the size of the history. The state lives in
+# the database (db.py, AUTO-FAQ CLUSTERS) and is shared by every server.
+# A retrained model has a new vocabulary: the buckets are rebuilt from the
+# cluster labels, while messages keep the clusters they were put in.
+#
+# The admin pages never wait for it: refresh_in_background() starts one
+# refresh per process on a daemon thread and the page shows the clusters
+# saved so far.
+
+FAQ_SIMILARITY = float(os.environ.get("BANKBOT_FAQ_SIMILARITY", 0.6))     # cosine, TF-IDF
+FAQ_BATCH_SIZE = int(os.environ.get("BANKBOT_FAQ_BATCH_SIZE", 5000))      # chat rows per batch
+FAQ_TOP = 100                   # clusters shown on the admin pages
+
+LSH_BANDS = 16
+LSH_BITS = 6
+LSH_SEED = 0
+
+_planes = {}                    # n_features -> random hyperplanes
+_refresh_lock = threading.Lock()
+_refresh_thread = None
+
+
+def normalize(message):
+    text = re.sub(r"\d+", "0", (message or "").lower())
+    text = re.sub(r"[^\w\s]|_", " ", text)
+    return " ".join(text.split())
+
+
+def message_key(normalized):
+    return hashlib.sha1(normalized.encode("utf-8")).hexdigest()[:16]
+
+
+def _hyperplanes(n_features):
+    import numpy as np      # deferred: only needed once the model is loaded
+    if n_features not in _planes:
+        rng = np.random.RandomState(LSH_SEED)
+        _planes[n_features] = rng.standard_normal((n_features, LSH_BANDS * LSH_BITS))
+    return _planes[n_features]
+
+
+def _buckets(vectors):
+    """LSH bucket names per row of a sparse TF-IDF matrix ([] for empty rows)."""
+    import numpy as np
+    bits = np.asarray(vectors @ _hyperplanes(vectors.shape[1])) > 0
+    bands = bits.reshape(-1, LSH_BANDS, LSH_BITS) @ (1 << np.arange(LSH_BITS))
+    empty = vectors.getnnz(axis=1) == 0
+    return [[] if is_empty else [f"{band}:{value}" for band, value in enumerate(row)]
+            for row, is_empty in zip(bands.tolist(), empty)]
+
+
+def _similarity(a, b):
+    # TF-IDF rows are L2-normalized, so the dot product is the cosine
+    return a.multiply(b).sum()
+
+
+def _cluster_batch(repo, artifact, after_id, rows, rebuild):
+    vectorizer = artifact["pipeline"][0]
+
+    # new rows by normalized message: [normalized, first raw text, reply, {month: n}]
+    by_key = {}
+    for r in rows:
+        normalized = normalize(r[1])
+        if not normalized:
+            continue
+        entry = by_key.setdefault(message_key(normalized), [normalized, r[1], r[2], {}])
+        month = str(r[3])[:7]
+        entry[3][month] = entry[3].get(month, 0) + 1
+
+    known, _ = repo.find_faq_clusters(list(by_key), ())
+    new_keys = sorted((k for k in by_key if k not in known),
+                      key=lambda k: -sum(by_key[k][3].values()))
+    new_vectors = vectorizer.transform([by_key[k][0] for k in new_keys]) if new_keys else None
+    new_buckets = _buckets(new_vectors) if new_keys else []
+
+    # candidate clusters: every cluster on a rebuild, else those sharing a bucket
+    wanted = None if rebuild else {b for names in new_buckets for b in names}
+    _, candidates = repo.find_faq_clusters((), wanted) if rebuild or wanted else ({}, {})
+    index, vectors, buckets = {}, {}, []
+    if candidates:
+        ids = list(candidates)
+        label_vectors = vectorizer.transform([normalize(candidates[c]) for c in ids])
+        for n, (cluster, names) in enumerate(zip(ids, _buckets(label_vectors))):
+            vectors[cluster] = label_vectors[n]
+            for name in names:
+                index.setdefault(name, set()).add(cluster)
+            if rebuild:
+                buckets.extend((name, cluster) for name in names)
+
+    clusters, keys = [], []
+    for n, key in enumerate(new_keys):
+        vector, names = new_vectors[n], new_buckets[n]
+        best, best_score = None, FAQ_SIMILARITY
+        for cluster in set().union(*(index.get(name, ()) for name in names)):
+            score = _similarity(vector, vectors[cluster])
+            if score >= best_score:
+                best, best_score = cluster, score
+        if best is None:
+            best = -(len(clusters) + 1)         # saved with a real id by the repository
+            _, raw, reply, _ = by_key[key]
+            clusters.append((best, raw, reply))
+            vectors[best] = vector
+            for name in names:
+                index.setdefault(name, set()).add(best)
+            buckets.extend((name, best) for name in names)
+        known[key] = best
+        keys.append((key, best))
+
+    counts = {}
+    for key, (_, _, _, months) in by_key.items():
+        for month, n in months.items():
+            counts[(known[key], month)] = counts.get((known[key], month), 0) + n
+
+    return {
+        "after_id": after_id,
+        "last_chat_id": rows[-1][0] if rows else after_id,
+        "model_version": str(artifact["version"]),     # model_version is a TEXT column
+        "rebuild": rebuild,
+        "clusters": clusters,
+        "keys": keys,
+        "counts": counts,
+        "buckets": buckets,
+    }
+
+
+def refresh(repo, artifact, batch_size=FAQ_BATCH_SIZE):
+    """Cluster the chat rows logged since the last run; returns how many were read."""
+    processed = 0
+    while True:
+        after_id, version = repo.get_faq_progress()
+        rows = repo.get_chats_after(after_id, batch_size)
+        rebuild = version != str(artifact["version"])
+        if not rows and not rebuild:
+            return processed
+        if repo.save_faq_batch(_cluster_batch(repo, artifact, after_id, rows, rebuild)):
+            processed += len(rows)
+            if len(rows) < batch_size:
+                return processed
+        # else another server saved this batch first; carry on from where it got to
+
+
+def refresh_in_background(repo, artifact):
+    """Start refresh() on a daemon thread unless one is running; returns that thread."""
+    global _refresh_thread
+    with _refresh_lock:
+        if _refresh_thread is None:
+            _refresh_thread = threading.Thread(target=_background_refresh, args=(repo, artifact),
+                                               name="faq-clusters", daemon=True)
+            _refresh_thread.start()
+        return _refresh_thread
+
+
+def _background_refresh(repo, artifact):
+    global _refresh_thread
+    try:
+        refresh(repo, artifact)
+    except Exception as e:
+        print("FAQ CLUSTER ERROR:", e)
+    finally:
+        with _refresh_lock:
+            _refresh_thread = None
+
+
+def top(repo, months=None, limit=FAQ_TOP):
+    window = {"months": months} if months is not None else {}
+    return repo.get_faq_clusters(limit=limit, **window)
@@ -0,0 +1,73 @@
+import os
+
+from batcher import MicroBatcher
+
+TOP_K = 3
+
+# optional micro-batching layer in front of the model (off by default)
+BATCHING_ENABLED = os.environ.get("BANKBOT_BATCHING", "0") == "1"
+BATCH_MAX_SIZE = int(os.environ.get("BANKBOT_BATCH_MAX_SIZE", 32))
+BATCH_MAX_WAIT_MS = float(os.environ.get("BANKBOT_BATCH_MAX_WAIT_MS", 5))
+
+batcher = None
+
+
+def enable_batching(max_batch=BATCH_MAX_SIZE, max_wait_ms=BATCH_MAX_WAIT_MS):
+    global batcher
+    if batcher is None:
+        batcher = MicroBatcher(max_batch=max_batch, max_wait_ms=max_wait_ms)
+    return batcher
+
+
+def batching_stats():
+    return batcher.stats() if batcher is not None else None
+
+
+class InferenceResult:
+    """
+    Classifier output for one message, computed at most once and shared by
+    the rule engine's dataset fallback and the ML override in app.py.
+
+    Nothing is computed until run() is first called, so messages fully
+    handled by the rules (menu choices, flow steps) never touch the model.
+    """
+
+    def __init__(self, text, current, top_k=TOP_K):
+        self.text = text
+        self.current = current            # the milestone_two.active snapshot used
+        self.version = current["version"]
+        self.k = top_k
+        self.computed = False
+        self.features = None              # sparse TF-IDF row
+        self.proba = None                 # full probability vector
+        self.top_k = []                   # [(intent, probability), ...]
+        self.intent = "unknown"
+        self.confidence = 0.0
+
+    @property
+    def available(self):
+        return self.current["model"] is not None
+
+    def run(self):
+        if self.computed:
+            return self
+        self.computed = True
+        model = self.current["model"]
+        if model is None:
+            return self
+        if batcher is not None and batcher.submit(self):
+            return self
+        try:
+            self.features = model[:-1].transform([self.text])
+            self.proba = model[-1].predict_proba(self.features)[0]
+        except Exception as e:
+            print("INFERENCE ERROR:", e)
+            return self
+        self._fill_from_proba(model[-1].classes_)
+        return self
+
+    def _fill_from_proba(self, classes):
+        import numpy as np   # already loaded with the model; keeps app startup light
+        order = np.argsort(self.proba)[::-1][:self.k]
+        self.top_k = [(str(classes[i]), float(self.proba[i])) for i in order]
+        self.intent, self.confidence = self.top_k[0]
@@ -1,29 +1,14 @@
-import pandas as pd
+import os
 import re
 import random
 import string
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.linear_model import LogisticRegression
-from sklearn.pipeline import make_pipeline
-from db import record_transaction
-import sqlite3
-
-DB_PATH = "bank.db"
-
-def get_balance(account):
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    c.execute("SELECT balance FROM users WHERE account_number=?", (account,))
-    row = c.fetchone()
-    conn.close()
-    return row[0] if row else None
-
-def update_balance(account, new_balance):
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    c.execute("UPDATE users SET balance=? WHERE account_number=?", (new_balance, account))
-    conn.commit()
-    conn.close()
+import threading
+import time
+import uuid
+from storage import repo
+from inference import InferenceResult
+from rule_router import RuleRouter
+from dialog import Flow, Turn, digits, number, whole, choice, keyword, contains, free_text, below
 
 def random_txn_id():
     import random, string
@@ -94,89 +79,150 @@ def extract_entities(text):
     return ent
 
 # ========= Load model (optional dataset replies) =========
-try:
-    df = pd.read_csv(DATA_FILE, encoding='latin1')
-    has_data = True
-except FileNotFoundError:
-    df = pd.DataFrame(columns=["text", "intent", "response"])
-    has_data = False
-
-if has_data and not all(col in df.columns for col in ["text", "intent", "response"]):
-    raise SystemExit("CSV must contain columns: text,intent,response")
-
-if has_data:
-    X = df["text"].astype(str)
-    y = df["intent"].astype(str)
-    model = make_pipeline(
-        TfidfVectorizer(ngram_range=(1,2), stop_words='english', max_features=18000),
-        LogisticRegression(max_iter=2500)
-    )
-    model.fit(X, y)
-else:
-    model = None
+# `active` holds everything one reply needs from the trained model: the
+# pipeline and the intent -> responses index built with it. Retraining
+# builds a complete new dict and rebinds the name in one step, so a request
+# always sees a consistent model + responses pair.
+active = {"artifact": None, "model": None, "responses": None, "version": None}
+
+def install_model(new_artifact):
+    global active, model, MODEL_VERSION
+    active = {
+        "artifact": new_artifact,
+        "model": new_artifact["pipeline"] if new_artifact else None,
+        "responses": new_artifact["responses"] if new_artifact else None,
+        "version": new_artifact["version"] if new_artifact else None,
+    }
+    # module-level aliases kept for the CLI and older callers
+    model, MODEL_VERSION = active["model"], active["version"]
+    if new_artifact:
+        model_status.update(state="ready", error=None)
+
+# The model is not loaded at import: trainer pulls in pandas and scikit-learn,
+# which dominate startup. Until load_model() has run, active["model"] is None
+# and replies come from the rules alone.
+model_status = {"state": "not_loaded", "error": None}   # loading / ready / failed
+_load_lock = threading.Lock()
+_load_thread = None
+_load_failed_at = None
+# seconds before a failed background load may be tried again
+MODEL_RETRY_INTERVAL = float(os.environ.get("BANKBOT_MODEL_RETRY_INTERVAL", 60))
+
+def load_model():
+    """Load the persisted model (refit from the CSV if needed) and install it."""
+    from trainer import build_artifact   # heavy imports, deferred to first use
+    model_status["state"] = "loading"
+    try:
+        artifact = build_artifact(DATA_FILE) if os.path.exists(DATA_FILE) else None
+    except Exception as e:
+        model_status.update(state="failed", error=str(e))
+        raise
+    # a retrain that finished meanwhile has already installed a newer model
+    if active["artifact"] is None:
+        install_model(artifact)
+    model_status.update(state="ready", error=None)
+    return active
+
+def load_model_in_background():
+    """
+    Start load_model() on a daemon thread unless it is loaded or loading; a
+    failed load is retried by a call made MODEL_RETRY_INTERVAL seconds later.
+    """
+    global _load_thread
+    with _load_lock:
+        if _load_thread is not None or model_status["state"] == "ready":
+            return _load_thread
+        if (model_status["state"] == "failed" and _load_failed_at is not None
+                and time.monotonic() - _load_failed_at < MODEL_RETRY_INTERVAL):
+            return None
+        model_status["state"] = "loading"
+        _load_thread = threading.Thread(target=_background_load, name="model-loader", daemon=True)
+        _load_thread.start()
+        return _load_thread
+
+def _background_load():
+    global _load_thread, _load_failed_at
+    try:
+        load_model()
+    except Exception as e:
+        model_status.update(state="failed", error=str(e))
+        print("MODEL LOAD ERROR:", e)
+    finally:
+        with _load_lock:
+            if model_status["state"] == "failed":
+                _load_failed_at = time.monotonic()
+            _load_thread = None
 
 # ========= Dataset helper (safe) =========
-def dataset_response_for_intent(intent, user_input):
-    if not has_data:
+def dataset_response_for_intent(intent, user_input, current=None):
+    # O(1) lookups in the prebuilt index; no DataFrame work per message
+    index = (current or active)["responses"]
+    if not index:
         return None
-    subset = df[df["intent"] == intent]
-    if subset.empty:
+    responses = index["by_intent"].get(intent)
+    if not responses:
         return None
-    exact = subset[subset["text"].str.strip().str.lower() == user_input.strip().lower()]
-    if not exact.empty:
-        return exact.iloc[0]["response"]
-    return subset.sample(1, random_state=random.randint(1, 1_000_000)).iloc[0]["response"]
+    exact = index["exact"].get((intent, user_input.strip().lower()))
+    if exact is not None:
+        return exact
+    return random.choice(responses)
 
 # ========= Memory =========
-memory = {
-    # high-level router
-    "menu": None,  # 'card','atm','loan','account'
-    # card flow
-    "card": {
-        "type": None,   # 'debit'|'credit'
-        "action": None, # 'block','unblock','status','apply','report','viewbill','paybill'
-        "step": 0,
-        "last4": None,
-        "amount": None
-    },
-    # atm flow
-    "atm": {
-        "submenu": False,
-        "action": None,  # 'locator','limit','issue','not_dispensed','pin_change'
-        "last4": None
-    },
-    # loan flow
-    "loan": {
-        "category": None,  # 'secured','unsecured','business'
-        "product": None,   # 'home','auto','lap','gold','fd' | 'personal','education','credit','debt' | 'term','wc','equip','invoice','od'
-        "service": None,   # 'elig','apply','status'
-        "elig": { "age":None, "salary":None, "emp":None, "exp":None, "cibil":None, "eligible":None, "amount":None },
-        "apply": { "name":None, "salary":None, "pan":None, "uploaded":False },
-        "waiting_apply": False,
-        "step": 0,
-        "must_check_first": False
-    },
-    # account open
-    "acct": {
-        "step": 0,
-        "name": None,
-        "age": None,
-        "type": None,  # 'savings'|'current'
-        "addr": None,
-        "aadhaar": None
-    },
-    # transfer/balance
-    "flow": None, "step": 0, "receiver":None, "account":None, "amount":None,
-    "last_intent": None
-}
+# Conversation state is per user: the web app keeps one of these dicts per
+# session in a session_store backend and passes it to handle_user_input.
+# `cli_memory` is only the default for the command-line chat below.
+def new_state():
+    return {
+        # high-level router
+        "menu": None,  # 'card','atm','loan','account'
+        # card flow
+        "card": {
+            "type": None,   # 'debit'|'credit'
+            "action": None, # 'block','unblock','status','apply','report','viewbill','paybill'
+            "step": 0,
+            "last4": None,
+            "amount": None
+        },
+        # atm flow
+        "atm": {
+            "submenu": False,
+            "action": None,  # 'locator','limit','issue','not_dispensed','pin_change'
+            "last4": None
+        },
+        # loan flow
+        "loan": {
+            "category": None,  # 'secured','unsecured','business'
+            "product": None,   # 'home','auto','lap','gold','fd' | 'personal','education','credit','debt' | 'term','wc','equip','invoice','od'
+            "service": None,   # 'elig','apply','status'
+            "elig": { "age":None, "salary":None, "emp":None, "exp":None, "cibil":None, "eligible":None, "amount":None },
+            "apply": { "name":None, "salary":None, "pan":None, "uploaded":False },
+            "waiting_apply": False,
+            "step": 0,
+            "must_check_first": False
+        },
+        # account open
+        "acct": {
+            "step": 0,
+            "name": None,
+            "age": None,
+            "type": None,  # 'savings'|'current'
+            "addr": None,
+            "aadhaar": None
+        },
+        # transfer/balance
+        "flow": None, "step": 0, "receiver":None, "account":None, "amount":None, "transfer_key": None,
+        "last_intent": None
+    }
 
-def reset_card():
+cli_memory = new_state()
+
+def reset_card(memory):
     memory["card"] = {"type":None,"action":None,"step":0,"last4":None,"amount":None}
 
-def reset_atm():
+def reset_atm(memory):
     memory["atm"] = {"submenu":False,"action":None,"last4":None}
 
-def reset_loan():
+def reset_loan(memory):
     memory["loan"] = {
         "category": None,
         "product": None,
@@ -207,10 +253,17 @@ def reset_loan():
         "waiting_apply": False
     }
 
-def reset_acct():
+def reset_acct(memory):
     memory["acct"] = {"step":0,"name":None,"age":None,"type":None,"addr":None,"aadhaar":None}
 
-def clear_transfer_memory():
+def is_idle(memory):
+    """No flow or follow-up pending: the reply depends only on the message."""
+    loan = memory.get("loan", {})
+    return (memory.get("menu") is None and memory.get("flow") is None
+            and memory.get("last_intent") != "balance"
+            and not loan.get("waiting_apply") and loan.get("category") is None)
+
+def clear_transfer_memory(memory):
     for k in ["flow","step","receiver","receiver_account","amount"]:
         memory[k] = None if k != "step" else 0
 
@@ -292,11 +345,880 @@ DOCS_BUSINESS = (
     "• For Invoice Financing: Invoice Copy + Buyer Details\n"
 )
 
+# ========= Keyword rules =========
+# Every keyword test the handler makes against the normalized text, compiled
+# once. _route() takes one TEXT_RULES.match() per message and checks names
+# in its own priority order, so behaviour is identical to the old re.search
+# cascade.
+KEYWORD_RULES = [
+    ("greet",            r'\b(hi|hello|hey)\b'),
+    ("debit",            r'\bdebit( card)?\b'),
+    ("credit",           r'\bcredit( card)?\b'),
+    ("balance",          r'\b(balance|check balance|account balance)\b'),
+    ("pay",              r'\b(pay|transfer|send)\b'),
+    # card actions
+    ("block",            r'\bblock\b'),
+    ("unblock",          r'\bunblock\b'),
+    ("debit_status",     r'\b(status|check)\b'),
+    ("credit_status",    r'\b(status|limit|check)\b'),
+    ("apply",            r'\bapply\b'),
+    ("report",           r'\breport|lost|stolen\b'),
+    ("paybill",          r'\bpay bill|bill payment|payment\b'),
+    ("viewbill",         r'\bview bill|bill\b'),
+    # atm actions
+    ("atm_locator",      r'nearest|locate|near'),
+    ("atm_limit",        r'limit|withdrawal'),
+    ("atm_issue",        r'issue|problem'),
+    ("atm_not_dispensed", r'not dispensed|card not dispensed'),
+    ("atm_pin",          r'pin'),
+    # loan flow
+    ("eligib",           r'eligib'),
+    ("status",           r'status'),
+    ("cibil_question",   r'what.*cibil|cibil meaning|explain cibil'),
+    ("documents",        r'what.*document|document[s]?\??'),
+    ("done",             r'\b(done|submitted|uploaded)\b'),
+    # open account / emi / generic info
+    ("open_account",     r'\b(open account|create account|new account|open an account)\b'),
+    ("emi",              r'\b(emi|emi calculator)\b'),
+    ("emi_period",       r'\bmonthly|quarterly|yearly\b'),
+    ("emi_duration",     r'\d+\s+(months?|years?|quarters?)'),
+    ("month",            r'month'),
+    ("year",             r'year'),
+    ("quarter",          r'quarter'),
+    ("cibil",            r'cibil'),
+    ("doc_question",     r'what document|which document|required document|document list'),
+]
+TEXT_RULES = RuleRouter(KEYWORD_RULES)
+
+# loan product keywords: the last keyword (in list order) found in the text wins
+LOAN_PRODUCTS = {
+    "secured": ({"1":"home","2":"auto","3":"lap","4":"gold","5":"fd"},
+                [("home","home"),("auto","auto"),("vehicle","auto"),
+                 ("property","lap"),("gold","gold"),("fixed deposit","fd")]),
+    "unsecured": ({"1":"personal","2":"education","3":"credit","4":"debt"},
+                  [("personal","personal"),("education","education"),
+                   ("credit card","credit"),("revolving","credit"),("debt","debt")]),
+    "business": ({"1":"term","2":"wc","3":"equip","4":"invoice","5":"od"},
+                 [("term","term"),("working","wc"),("equipment","equip"),
+                  ("invoice","invoice"),("overdraft","od")]),
+}
+LOAN_PRODUCT_RULES = {
+    cat: RuleRouter([(i, re.escape(k)) for i, (k, _) in enumerate(textmap)])
+    for cat, (_, textmap) in LOAN_PRODUCTS.items()
+}
+
+def match_loan_product(category, raw, text):
+    mapping, textmap = LOAN_PRODUCTS[category]
+    t = raw.strip()
+    if t in mapping:
+        return mapping[t]
+    hits = LOAN_PRODUCT_RULES[category].all(text)
+    return textmap[hits[-1]][1] if hits else None
+
+# ========= Dialog flows =========
+# The card/ATM menus and the loan/account step flows are data. _route()
+# dispatches straight to the current state's handler instead of walking
+# every flow's branches (see dialog.py for the step spec format).
+CONTINUE = "\n\nWould you like to continue?"
+
+CARD_FLOWS = {
+    "debit": {
+        "menu": ("debit_menu", DEBIT_MENU),
+        "choices": {"1":"block","2":"unblock","3":"status","4":"apply","5":"report"},
+        "keywords": [("block","block"),("unblock","unblock"),("debit_status","status"),
+                     ("apply","apply"),("report","report")],
+        "no_last4": {"apply"},
+        "ask_last4": "For security, please enter the last 4 digits of your debit card.",
+        "replies": {
+            "apply": ("debit_card_replacement", "Your Debit Card request has been submitted successfully.\nFurther application details will be sent to your registered mobile number and email."),
+            "block": ("debit_card_block", "Your Debit Card ending with **** **** **** {last4} has been blocked successfully."),
+            "unblock": ("debit_card_unblock", "Your Debit Card ending with **** **** **** {last4} has been unblocked."),
+            "status": ("debit_card_status", "Your Debit Card **** **** **** {last4} is active."),
+            "report": ("debit_card_report_lost", "Lost/Stolen report filed. Debit Card **** **** **** {last4} is now blocked."),
+        },
+    },
+    "credit": {
+        "menu": ("credit_menu", CREDIT_MENU),
+        "choices": {"1":"block","2":"unblock","3":"status","4":"apply","5":"viewbill","6":"paybill"},
+        "keywords": [("block","block"),("unblock","unblock"),("credit_status","status"),
+                     ("apply","apply"),("paybill","paybill"),("viewbill","viewbill")],
+        "no_last4": {"apply"},
+        "ask_last4": "For security, please enter the last 4 digits of your credit card.",
+        "ask_amount": {"paybill": ("credit_card_payment", "Enter bill amount to pay (e.g., 2500).")},
+        "replies": {
+            "apply": ("credit_card_application", "Your Credit Card request has been submitted successfully.\nFurther application details will be sent to your registered mobile number and email."),
+            "block": ("credit_card_action", "Your Credit Card **** **** **** {last4} has been blocked successfully."),
+            "unblock": ("credit_card_action", "Your Credit Card **** **** **** {last4} has been unblocked."),
+            "status": ("credit_card_action", "Your Credit Card **** **** **** {last4} is active. Limit changes require KYC."),
+            "viewbill": ("credit_card_action", "Latest bill for **** **** **** {last4} is available in your statements."),
+            "paybill": ("credit_card_action", "Payment of ₹{amount:,} received for Credit Card **** **** **** {last4}."),
+        },
+    },
+}
+
+ATM_FLOW = {
+    "menu": ("atm_menu", ATM_MENU),
+    "choices": {"1":"locator","2":"limit","3":"issue","4":"not_dispensed","5":"pin_change"},
+    "keywords": [("atm_locator","locator"),("atm_limit","limit"),("atm_issue","issue"),
+                 ("atm_not_dispensed","not_dispensed"),("atm_pin","pin_change")],
+    "no_last4": {"locator"},
+    "ask_last4": "Please enter the last 4 digits of your card to proceed.",
+    "replies": {
+        "locator": ("atm_locator", "Nearest ATMs will be shown based on your location."),
+        "limit": ("atm_withdrawal_limit", "ATM withdrawal limit is ₹40,000/day."),
+        "issue": ("atm_issue_report", "ATM issue reported. Resolution within 48 hours."),
+        "not_dispensed": ("atm_card_not_dispensed", "Card not dispensed — amount will be auto-reversed if debited."),
+        "pin_change": ("atm_pin_change", "Change your ATM PIN using the mobile app or ATM."),
+    },
+}
+
+def run_action_menu(spec, rec, turn, reset):
+    """Pick an action (number or keyword), collect last4/amount, then reply."""
+    if rec["action"] is None:
+        rec["action"] = spec["choices"].get(turn.raw) or next(
+            (action for rule, action in spec["keywords"] if rule in turn.hits), None)
+        if rec["action"] is None:
+            return spec["menu"][0], {}, spec["menu"][1]
+    action = rec["action"]
+
+    if action not in spec["no_last4"] and not rec["last4"]:
+        if 'last4' in turn.ent and re.fullmatch(r'\d{4}', turn.ent['last4']):
+            rec["last4"] = turn.ent['last4']
+        else:
+            return "ask_card_last4", {}, spec["ask_last4"]
+
+    amount = None
+    if action in spec.get("ask_amount", {}):
+        if not rec["amount"] and 'money' in turn.ent:
+            try:
+                rec["amount"] = str(int(float(turn.ent['money'])))
+            except (TypeError, ValueError):
+                rec["amount"] = None
+        if not rec["amount"]:
+            intent, reply = spec["ask_amount"][action]
+            return intent, {}, reply
+        amount = int(float(rec["amount"]))
+
+    intent, reply = spec["replies"][action]
+    last4 = rec["last4"]
+    reset(turn.memory); turn.memory["menu"] = None
+    return intent, {}, reply.format(last4=last4, amount=amount) + CONTINUE
+
+def card_flow(turn):
+    c = turn.memory["card"]
+    if c["type"] is None:
+        if wants_debit(turn.raw):
+            c["type"]="debit"
+            return "debit_menu", {}, DEBIT_MENU
+        if wants_credit(turn.raw):
+            c["type"]="credit"
+            return "credit_menu", {}, CREDIT_MENU
+        return "card_menu", {}, "Please choose 1 for Debit or 2 for Credit."
+    return run_action_menu(CARD_FLOWS[c["type"]], c, turn, reset_card)
+
+def atm_flow(turn):
+    return run_action_menu(ATM_FLOW, turn.memory["atm"], turn, reset_atm)
+
+# ----- loans -----
+def end_loan(memory):
+    reset_loan(memory); memory["menu"] = None
+
+def offer_loan_apply(memory):
+    L = memory["loan"]
+    L["elig"]["eligible"] = True
+    L["service"] = "apply"
+    L["step"] = 10  # next prompt asks for full name
+    L["waiting_apply"] = True
+
+EMP_CHOICES = {"1": "govt", "2": "private", "3": "self"}
+
+def experience_rules(govt, private, self_employed):
+    """Minimum years of experience: 1 for government, 3 private, 2 self-employed."""
+    return [
+        (lambda v, E: E["emp"] == "govt" and v < 1, govt),
+        (lambda v, E: E["emp"] == "private" and v < 3, private),
+        (lambda v, E: E["emp"] == "self" and v < 2, self_employed),
+    ]
+
+def education_result(E, amount):
+    if amount <= 400000:
+        collateral = "No collateral required (Parent will be co-applicant)"
+    elif amount <= 750000:
+        collateral = "Third party guarantee required"
+    else:
+        collateral = "Tangible collateral (Property / Fixed Deposit) required"
+    return (
+        f"Education Loan Eligibility Result\n\n"
+        f"Loan Amount Considered: ₹{E['amount']:,}\n"
+        f"Course Location: {E['location']}\n"
+        f"Parent Income: ₹{E['salary']:,}/month\n"
+        f"CIBIL Score: {E['cibil']} (Good)\n\n"
+        f"Collateral: {collateral}\n"
+        f"Co-Applicant: Parent/Guardian mandatory\n"
+        f"Repayment: After course + job placement\n\n"
+        f"Type 'apply' to continue with application."
+    )
+
+def personal_result(E, cibil):
+    E["amount"] = min(E["salary"] * 24, 2000000)  # 20L max
+    return (
+        f"Personal Loan Eligibility Confirmed.\n\n"
+        f"Eligible Loan Amount: ₹{E['amount']:,}\n"
+        f"Tenure: Up to 7 years\n"
+        f"EMI will be calculated based on your income.\n\n"
+        f"Type 'apply' to continue or 'not now' to cancel."
+    )
+
+def auto_result(E, price):
+    if E["vehicle"] == "two":
+        E["amount"] = int(price * 0.90)
+    elif price <= 1200000:
+        E["amount"] = int(price * 0.85)
+    else:
+        E["amount"] = int(price * 0.80)
+    return (
+        f"Auto Loan Eligibility Confirmed.\n\n"
+        f"Vehicle Price: ₹{price:,}\n"
+        f"Eligible Loan Amount: ₹{E['amount']:,}\n"
+        f"Repayment Tenure: Up to 5–7 years based on vehicle type.\n\n"
+        f"Type 'apply' to continue or 'not now' to cancel."
+    )
+
+def lap_result(E, prop_value):
+    E["amount"] = int(prop_value * 0.50)
+    return (
+        f"Loan Against Property Eligibility Confirmed.\n\n"
+        f"Property Value: ₹{prop_value:,}\n"
+        f"Eligible Loan Amount (50% LTV): ₹{E['amount']:,}\n"
+        f"Repayment Tenure: Up to 15 years\n\n"
+        f"Type 'apply' to continue or 'not now' to cancel."
+    )
+
+def gold_result(E, price_per_gram):
+    gold_value = E["weight"] * price_per_gram
+    E["amount"] = int(gold_value * 0.75)  # 75% LTV
+    return (
+        f"Gold Loan Eligibility Confirmed.\n\n"
+        f"Gold Weight: {E['weight']} g\n"
+        f"Purity: {E['purity']} Carat\n"
+        f"Estimated Gold Value: ₹{gold_value:,}\n"
+        f"Eligible Loan Amount (75% LTV): ₹{E['amount']:,}\n"
+        f"Tenure: Up to 12 months\n\n"
+        f"Type 'apply' to continue or 'not now' to cancel."
+    )
+
+def fd_result(E, fd_amt):
+    E["amount"] = int(fd_amt * 0.90)
+    return (
+        f"Loan Against FD Eligibility Confirmed.\n\n"
+        f"FD Amount: ₹{fd_amt:,}\n"
+        f"Eligible Loan Amount (90% of FD): ₹{E['amount']:,}\n"
+        f"Tenure: Up to remaining FD maturity\n"
+        f"Interest Rate: FD rate + ~1%\n\n"
+        f"Type 'apply' to continue or 'not now' to cancel."
+    )
+
+def credit_result(E, cibil):
+    E["amount"] = E["salary"] * 3  # credit limit: 2x to 4x salary
+    return (
+        f"Credit Card Eligibility Confirmed.\n\n"
+        f"Estimated Credit Limit: ₹{E['amount']:,}\n"
+        f"CIBIL Score Verified: {E['cibil']}\n"
+        f"Interest on Revolving Balance: ~2.50% per month (approx. 34% annually)\n"
+        f"Minimum Due Each Month: 5% of outstanding billing amount\n\n"
+        f"Note: If full bill is not paid, interest applies from the transaction date.\n\n"
+        f"Type 'apply' to continue or 'not now' to cancel."
+    )
+
+def debt_result(E, cibil):
+    E["amount"] = E["salary"] * 20
+    return (
+        f"Debt Consolidation Loan Eligibility Confirmed.\n\n"
+        f"Maximum Eligible Loan Amount: ₹{E['amount']:,}\n"
+        f"CIBIL Score Verified: {E['cibil']}\n"
+        f"Tenure: Up to 7 years\n\n"
+        f"This loan will combine your existing EMIs into one single payment.\n\n"
+        f"Type 'apply' to continue or 'not now' to cancel."
+    )
+
+def term_result(E, purpose):
+    amount = max(150000, int(E["turnover"] * 0.4))  # approx formula
+    if E["cibil"] >= 800:
+        guarantor_msg = "Not required (Strong CIBIL)"
+    else:
+        guarantor_msg = "1 guarantor recommended"
+    return (
+        f"Term Loan Eligibility Confirmed.\n\n"
+        f"Estimated Eligible Loan Amount: ₹{amount:,}\n"
+        f"Guarantor Requirement: {guarantor_msg}\n"
+        f"Repayment Tenure: Up to 7 years\n\n"
+        "Type 'apply' to continue or 'not now' to cancel."
+    )
+
+def wc_result(E, business_type):
+    amount = min(max(100000, int(E["turnover"] * 0.20)), 2500000)  # 20% of turnover
+    return (
+        f"Working Capital Loan Eligibility Confirmed.\n\n"
+        f"Eligible Loan Limit: ₹{amount:,}\n"
+        f"Repayment: Renewable every 12 months\n"
+        f"Security: May require property/business collateral\n\n"
+        "Type 'apply' to continue or 'not now' to cancel."
+    )
+
+def equip_result(E, registered):
+    amount = min(max(int(E["turnover"] * 0.20), 100000), 5000000)
+    return (
+        f"Equipment Financing Loan Eligibility Confirmed.\n\n"
+        f"Eligible Loan Amount: ₹{amount:,}\n"
+        f"Repayment Tenure: Up to 7 years\n"
+        f"Margin Requirement: 25%\n"
+        f"Security: Hypothecation of Equipment + Business Collateral if required\n\n"
+        "Type 'apply' to continue or 'not now' to cancel."
+    )
+
+def invoice_result(E, invoice):
+    finance = int(invoice * 0.80)
+    return (
+        f"Invoice Financing Eligibility Confirmed.\n\n"
+        f"Invoice Value: ₹{invoice:,}\n"
+        f"Eligible Finance: ₹{finance:,}\n"
+        f"Repayment: 30–90 days (Buyer pays bank)\n"
+        f"Platform: CENT TReDS (RXIL)\n\n"
+        "Type 'apply' to continue or 'not now' to cancel."
+    )
+
+def personal_od_result(E, balance):
+    od_limit = min(balance * 4, 5000)
+    return (
+        f"Overdraft Eligibility Confirmed.\n\n"
+        f"Eligible Limit: ₹{od_limit:,}\n"
+        f"Interest: Base Rate + 2%\n"
+        f"Tenure: Up to 36 months (with review)\n\n"
+        "Type 'apply' to continue or 'not now' to cancel."
+    )
+
+def business_od_result(E, turnover):
+    od_limit = int(turnover * 0.20)
+    return (
+        f"Business OD Eligibility Confirmed.\n\n"
+        f"Annual Turnover: ₹{turnover:,}\n"
+        f"Eligible OD Limit: ₹{od_limit:,} (20% of turnover)\n\n"
+        "Type 'apply' to continue or 'not now' to cancel."
+    )
+
+def home_result(E, property_value):
+    # LTV Calculation
+    if property_value <= 3000000:
+        E["amount"] = int(property_value * 0.90)
+    elif property_value <= 7500000:
+        E["amount"] = int(property_value * 0.80)
+    else:
+        E["amount"] = int(property_value * 0.75)
+    return (
+        f"Home Loan Eligibility Confirmed.\n\n"
+        f"Maximum Eligible Loan Amount: ₹{E['amount']:,}\n"
+        f"Co-Borrower Recommended: Yes (Parent/Spouse)\n"
+        f"Repayment Tenure: Up to 30 years (subject to retirement age)\n\n"
+        f"Type 'apply' to continue with application or 'not now' to exit."
+    )
+
+INCOME = r'\d{4,9}'
+EMP_PROMPT = "Select Employment Type:\n1) Government Employee\n2) Private Employee\n3) Self-Employed"
+
+# product -> {step: spec}; products without an entry use "home"
+LOAN_ELIGIBILITY_STEPS = {
+    # ===== EDUCATION LOAN SPECIAL RULES =====
+    "education": {
+        1: {"parse": digits, "field": "age", "retry": "Please enter student age.",
+            "reject": [(below(17), "Not eligible: Student must be at least 17 years old.")],
+            "prompt": "Enter parent's monthly income."},
+        2: {"parse": number(INCOME), "field": "salary", "retry": "Please enter numeric income. Example: 30000",
+            "reject": [(below(15000), "Not eligible: Parent income must be at least ₹15,000/month.")],
+            "prompt": "Parent employment type?\n1) Government\n2) Private"},
+        3: {"parse": choice({"1": "govt", "2": "private"}), "field": "emp",
+            "retry": "Please type 1 for Government or 2 for Private.",
+            "prompt": "Enter parent CIBIL score."},
+        4: {"help": ("cibil_question", "loan_info",
+                     "CIBIL score shows credit repayment history.\n"
+                     "Range: 300–900. Above 750 is considered good.\n\n"
+                     "Please enter parent CIBIL score (300–900)."),
+            "parse": whole(r'\d{3,4}'), "field": "cibil", "retry": "Enter valid CIBIL (300–900).",
+            "reject": [(below(700), "Not eligible: CIBIL score must be 700 or above.")],
+            "prompt": "Is the course in 'India' or 'Abroad'?"},
+        5: {"parse": keyword([("india", "India"), ("abroad", "Abroad")]), "field": "location",
+            "retry": "Please type 'India' or 'Abroad'.",
+            "prompt": "How much loan amount do you need?"},
+        6: {"parse": number(r'\d{4,9}'), "field": "amount",
+            "retry": "Please enter amount numeric. Example: 600000",
+            "finish": education_result},
+    },
+    # ===== PERSONAL LOAN ELIGIBILITY (Central Bank of India Rules) =====
+    "personal": {
+        1: {"parse": digits, "field": "age", "retry": "Please enter your age in numbers.",
+            "reject": [(below(21), "Not eligible: Minimum age required is 21.")],
+            "prompt": "Enter your monthly income (₹)."},
+        2: {"parse": number(INCOME), "field": "salary", "retry": "Please enter numeric income, e.g., 25000.",
+            "reject": [(below(15000), "Not eligible: Minimum income required is ₹15,000/month.")],
+            "prompt": "Select Employment Type:\n1) Government Employee\n2) Private/MNC Employee\n3) Self-Employed"},
+        3: {"parse": choice(EMP_CHOICES), "field": "emp", "retry": "Please choose 1, 2, or 3.",
+            "prompt": "Enter total years of work experience."},
+        4: {"parse": whole(r'\d{1,2}'), "field": "exp", "retry": "Please enter years as a number.",
+            "reject": experience_rules(
+                "Not eligible: Government employees need at least 1 year of service.",
+                "Not eligible: Private employees need minimum 3 years service.",
+                "Not eligible: Self-employed requires minimum 2 years business proof."),
+            "prompt": "Enter your CIBIL score (300–900)."},
+        5: {"help": ("cibil_question", "loan_info",
+                     "CIBIL score shows how you repaid past loans.\n"
+                     "Range: 300–900. Above 750 is ideal.\n\n"
+                     "Please enter CIBIL score (300–900)."),
+            "parse": whole(r'\d{3,4}'), "field": "cibil", "retry": "Please enter a valid CIBIL score (300–900).",
+            "reject": [(below(700), "Not eligible: CIBIL score must be 700 or above.")],
+            "finish": personal_result},
+    },
+    # ===== AUTO / VEHICLE LOAN RULES =====
+    "auto": {
+        1: {"parse": digits, "field": "age", "retry": "Please enter your age in numbers.",
+            "reject": [(below(18), "Not eligible: Minimum age is 18.")],
+            "prompt": "Enter your monthly income (₹)."},
+        2: {"parse": number(INCOME), "field": "salary", "retry": "Please enter numeric income. Example: 30000",
+            "reject": [(below(20000), "Not eligible: Minimum income must be ₹20,000/month.")],
+            "prompt": EMP_PROMPT},
+        3: {"parse": choice(EMP_CHOICES), "field": "emp", "retry": "Please select 1, 2, or 3.",
+            "prompt": "Enter total years of work experience."},
+        4: {"parse": whole(r'\d{1,2}'), "field": "exp", "retry": "Please enter experience in years (e.g., 2).",
+            "reject": experience_rules(
+                "Not eligible: Government employees need minimum 1 year experience.",
+                "Not eligible: Private employees need minimum 3 years experience.",
+                "Not eligible: Self-employed need minimum 2 years business proof."),
+            "prompt": "Enter your CIBIL score (300–900)."},
+        5: {"parse": whole(r'\d{3}'), "field": "cibil", "retry": "Enter valid CIBIL (300–900).",
+            "reject": [(below(700), "Not eligible: CIBIL score must be at least 700.")],
+            "prompt": "Select Vehicle Type:\n1) Two-Wheeler\n2) Four-Wheeler (Car)"},
+        6: {"parse": choice({"1": "two", "2": "car"}), "field": "vehicle", "retry": "Please select 1 or 2.",
+            "prompt": "Enter the on-road vehicle price (₹)."},
+        7: {"parse": number(r'\d{4,10}'), "retry": "Please enter price numeric. Example: 85000",
+            "finish": auto_result},
+    },
+    # ===== LOAN AGAINST PROPERTY (LAP) RULES =====
+    "lap": {
+        1: {"parse": digits, "field": "age", "retry": "Please enter age in numbers.",
+            "reject": [(lambda v, E: v < 21 or v > 70, "Not eligible: Age must be between 21 and 70.")],
+            "prompt": "Enter your monthly income (₹)."},
+        2: {"parse": number(INCOME), "field": "salary", "retry": "Please enter numeric income. Example: 22000",
+            "reject": [(below(18000), "Not eligible: Minimum income must be ₹18,000/month.")],
+            "prompt": EMP_PROMPT},
+        3: {"parse": choice(EMP_CHOICES), "field": "emp", "retry": "Please select 1, 2, or 3.",
+            "prompt": "Enter total years of work/business experience."},
+        4: {"parse": whole(r'\d{1,2}'), "field": "exp", "retry": "Please enter experience in years (e.g., 2).",
+            "reject": experience_rules(
+                "Not eligible: Government employees need minimum 1 year experience.",
+                "Not eligible: Private employees need minimum 3 years experience.",
+                "Not eligible: Self-employed need minimum 2 years business proof."),
+            "prompt": "Enter your CIBIL score (300–900)."},
+        5: {"parse": whole(r'\d{3}'), "field": "cibil", "retry": "Enter a valid CIBIL score (300–900).",
+            "reject": [(below(700), "Not eligible: CIBIL score must be 700 or above.")],
+            "prompt": "Enter your property market value (₹)."},
+        6: {"parse": number(r'\d{5,12}'), "retry": "Please enter property value numeric. Example: 3500000",
+            "finish": lap_result},
+    },
+    # ===== GOLD LOAN RULES =====
+    "gold": {
+        1: {"parse": digits, "field": "age", "retry": "Please enter age in numbers.",
+            "reject": [(below(18), "Not eligible: Minimum age is 18.")],
+            "prompt": "Enter gold weight in grams (e.g., 25)."},
+        2: {"parse": number(r'\d{1,4}', strip_commas=False), "field": "weight",
+            "retry": "Please enter a valid weight in grams.",
+            "reject": [(below(5), "Not eligible: Minimum 5 grams required.")],
+            "prompt": "Enter gold purity (carat) e.g., 22 or 24."},
+        3: {"parse": choice({"22": 22, "23": 23, "24": 24}), "field": "purity",
+            "retry": "Gold must be at least 22 carat. Please enter 22, 23, or 24.",
+            "prompt": "Enter today's approximate gold market price per gram (₹). Example: 5800"},
+        4: {"parse": number(r'\d{3,6}'), "retry": "Enter numeric price per gram. Example: 5800",
+            "finish": gold_result},
+    },
+    # ===== LOAN AGAINST FIXED DEPOSIT (FD LOAN) =====
+    "fd": {
+        1: {"parse": digits, "field": "age", "retry": "Please enter age in numbers.",
+            "reject": [(below(18), "Not eligible: Minimum age is 18.")],
+            "prompt": "Enter your Fixed Deposit amount (₹)."},
+        2: {"parse": number(r'\d{4,9}'), "retry": "Please enter a valid deposit amount (e.g., 50000).",
+            "reject": [(below(10000), "Not eligible: FD amount must be at least ₹10,000.")],
+            "finish": fd_result},
+    },
+    # ===== CREDIT CARD (Revolving Loan) Eligibility (CBI Rules) =====
+    "credit": {
+        1: {"parse": digits, "field": "age", "retry": "Please enter your age in numbers.",
+            "reject": [(below(21), "Not eligible: Minimum age for Credit Card is 21.")],
+            "prompt": "Enter your monthly income (₹). Minimum ₹20,000 required."},
+        2: {"parse": number(INCOME), "field": "salary", "retry": "Please enter numeric income, e.g., 25000.",
+            "reject": [(below(20000), "Not eligible: Minimum monthly income is ₹20,000.")],
+            "prompt": "Employment type?\n1) Government\n2) Private\n3) Self-Employed"},
+        3: {"parse": choice(EMP_CHOICES), "field": "emp",
+            "retry": "Please choose 1 for Government, 2 for Private, 3 for Self-Employed.",
+            "prompt": "Enter your CIBIL score (300–900). Must be 750+."},
+        4: {"help": ("cibil_question", "loan_info",
+                     "CIBIL score is your credit repayment history rating.\n"
+                     "Range: 300–900. Score above 750 is considered good.\n\n"
+                     "Please enter your CIBIL score (300–900)."),
+            "parse": whole(r'\d{3,4}'), "field": "cibil", "retry": "Enter a valid CIBIL score (300–900).",
+            "reject": [(below(750), "Not eligible: CIBIL must be 750+ for Credit Card.")],
+            "finish": credit_result},
+    },
+    # ===== DEBT CONSOLIDATION LOAN ELIGIBILITY (CBI Rules) =====
+    "debt": {
+        1: {"parse": digits, "field": "age", "retry": "Enter your age in numbers.",
+            "reject": [(below(21), "Not eligible: Minimum age is 21.")],
+            "prompt": "Enter your monthly income (₹). Minimum ₹25,000 required."},
+        2: {"parse": number(INCOME), "field": "salary", "retry": "Please enter numeric income, e.g., 30000.",
+            "reject": [(below(25000), "Not eligible: Minimum monthly income is ₹25,000.")],
+            "prompt": "Employment Type?\n1) Government\n2) Private\n3) Self-Employed"},
+        3: {"parse": choice(EMP_CHOICES), "field": "emp",
+            "retry": "Choose 1 for Government, 2 for Private, 3 for Self-Employed.",
+            "prompt": "How many years of work experience?"},
+        4: {"parse": whole(r'\d{1,2}'), "field": "exp", "retry": "Enter years as a number.",
+            "reject": experience_rules(
+                "Not eligible: Government employees need at least 1 year experience.",
+                "Not eligible: Private employees need at least 3 years experience.",
+                "Not eligible: Self-employed need minimum 2 years experience + ITR."),
+            "prompt": "Enter your CIBIL score (300–900). Minimum 700 required."},
+        5: {"help": ("cibil_question", "loan_info",
+                     "CIBIL score represents your credit repayment history.\n"
+                     "Range: 300–900. Higher score = easier loan approvals.\n\n"
+                     "Enter your CIBIL score now (300–900)."),
+            "parse": whole(r'\d{3,4}'), "field": "cibil", "retry": "Please enter a valid CIBIL score (300–900).",
+            "reject": [(below(700), "Not eligible: CIBIL score must be 700+ for Debt Consolidation.")],
+            "finish": debt_result},
+    },
+    # ===== TERM LOAN ELIGIBILITY =====
+    "term": {
+        1: {"parse": digits, "field": "age", "retry": "Please enter age in numbers.",
+            "reject": [(below(21), "Not eligible: Minimum age is 21.")],
+            "prompt": "How many years has your business been running?"},
+        2: {"parse": digits, "field": "exp", "retry": "Enter years in numbers.",
+            "reject": [(below(2), "Not eligible: Business must run for at least 2 years.")],
+            "prompt": "Enter your annual business turnover (₹)."},
+        3: {"parse": number(r'\d{4,10}'), "field": "turnover", "retry": "Enter numeric amount, example: 350000",
+            "reject": [(below(300000), "Not eligible: Minimum turnover should be ₹3,00,000/year.")],
+            "prompt": "Enter your CIBIL score (300–900)."},
+        4: {"parse": whole(r'\d{3}'), "field": "cibil", "retry": "Enter valid CIBIL score (300–900).",
+            "reject": [(below(700), "Not eligible: CIBIL must be 700 or above.")],
+            "prompt": "Loan Purpose?\n1) Business Expansion\n2) Machinery / Equipment\n3) Office/Shop Renovation"},
+        5: {"parse": free_text, "field": "purpose", "finish": term_result},
+    },
+    # ===== WORKING CAPITAL LOAN (WC LOAN) =====
+    "wc": {
+        1: {"parse": digits, "field": "age", "retry": "Please enter age in numbers.",
+            "reject": [(below(21), "Not eligible: Minimum age is 21.")],
+            "prompt": "How many years has your business been running?"},
+        2: {"parse": digits, "field": "exp", "retry": "Enter years as a number.",
+            "reject": [(below(1), "Not eligible: Business must run for at least 1 year.")],
+            "prompt": "Enter your annual business turnover (₹)."},
+        3: {"parse": number(r'\d{4,10}'), "field": "turnover", "retry": "Enter numeric amount, example: 350000",
+            "reject": [(below(300000), "Not eligible: Minimum turnover should be ₹3,00,000/year.")],
+            "prompt": "Enter your Business Credit Score (CIBIL / Commercial Score)."},
+        4: {"parse": whole(r'\d{3}'), "field": "cibil", "retry": "Enter valid score (300–900).",
+            "reject": [(below(600), "Not eligible: Business credit score must be at least 600.")],
+            "prompt": "Business Type?\n1) Trading\n2) Manufacturing\n3) Services"},
+        5: {"parse": free_text, "field": "type", "finish": wc_result},
+    },
+    # ===== EQUIPMENT FINANCING LOAN =====
+    "equip": {
+        1: {"parse": digits, "field": "age", "retry": "Please enter age in numbers.",
+            "reject": [(below(21), "Not eligible: Minimum age is 21.")],
+            "prompt": "How many years has your business been running?"},
+        2: {"parse": digits, "field": "exp", "retry": "Enter number of years.",
+            "reject": [(below(3), "Not eligible: Business must be running for at least 3 years.")],
+            "prompt": "Enter your annual business turnover (₹)."},
+        3: {"parse": number(r'\d{4,10}'), "field": "turnover", "retry": "Enter numeric turnover, example: 1200000",
+            "reject": [(below(500000), "Not eligible: Minimum turnover required is ₹5,00,000 per year.")],
+            "prompt": "Enter your Credit Score (300–900)."},
+        4: {"parse": whole(r'\d{3}'), "field": "cibil", "retry": "Enter valid score (300–900).",
+            "reject": [(below(750), "Not eligible: Credit Score must be 750 or above.")],
+            "prompt": "Do you have GST & Udyam Registration? (yes/no)"},
+        5: {"parse": contains("yes"),
+            "reject": [(lambda v, E: not v, "Not eligible: GST & Udyam registration are mandatory.")],
+            "finish": equip_result},
+    },
+    # ===== INVOICE FINANCING (CENT TReDS) =====
+    "invoice": {
+        1: {"parse": digits, "field": "exp", "retry": "Please enter business age in years.",
+            "reject": [(below(2), "Not eligible: Business must be running for at least 2 years.")],
+            "prompt": "Do you have Udyam (MSME) Registration? (yes/no)"},
+        2: {"parse": contains("yes"),
+            "reject": [(lambda v, E: not v, "Not eligible: MSME (Udyam) registration is required.")],
+            "prompt": "Enter your Credit Score (300–900)."},
+        3: {"parse": whole(r'\d{3}'), "field": "cibil", "retry": "Enter valid credit score.",
+            "reject": [(below(700), "Not eligible: Credit Score must be 700 or above.")],
+            "prompt": "Enter invoice amount (₹)."},
+        4: {"parse": number(r'\d{4,12}'), "field": "amount",
+            "retry": "Enter numeric invoice amount. Example: 250000",
+            "reject": [(below(25000), "Not eligible: Minimum invoice value is ₹25,000."),
+                       (lambda v, E: v > 10000000,
+                        "Not eligible: Maximum invoice allowed is ₹1,00,00,000 per invoice.")],
+            "finish": invoice_result},
+    },
+    # ===== OVERDRAFT FACILITY (OD): personal steps 2-4, business steps 5-7 =====
+    "od": {
+        1: {"parse": choice({"1": "personal", "2": "business"}), "field": "type",
+            "retry": "Please choose 1 for Personal or 2 for Business.",
+            "next": {"personal": 2, "business": 5},
+            "prompt": {"personal": "Has your savings account been active for at least 6 months? (yes/no)",
+                       "business": "How old is your business? (years)"}},
+        2: {"parse": contains("yes"),
+            "reject": [(lambda v, E: not v, "Not eligible: Account must be active for 6+ months.")],
+            "prompt": "Is your Aadhaar linked to this account? (yes/no)"},
+        3: {"parse": contains("yes"),
+            "reject": [(lambda v, E: not v, "Not eligible: Aadhaar linking is mandatory.")],
+            "prompt": "Enter your average monthly balance (₹)."},
+        4: {"parse": number(r'\d{3,9}'), "retry": "Enter numeric balance, e.g., 1500",
+            "finish": personal_od_result},
+        5: {"parse": lambda turn: digits(turn) or 0,
+            "reject": [(below(2), "Not eligible: Business must be running for at least 2 years.")],
+            "prompt": "Enter Credit Score (300–900)."},
+        6: {"parse": whole(r'\d{3}'), "retry": "Enter valid credit score.",
+            "reject": [(below(700), "Not eligible: Credit score must be 700+.")],
+            "prompt": "Enter annual turnover (₹)."},
+        7: {"parse": number(r'\d{4,12}'), "retry": "Enter numeric turnover, e.g., 1200000",
+            "finish": business_od_result},
+    },
+    # ===== (Default) Home loan and other secured loans =====
+    "home": {
+        1: {"parse": digits, "field": "age", "retry": "Please enter age in numbers.",
+            "reject": [(lambda v, E: v < 18 or v > 75, "Not eligible: Age must be between 18 and 75.")],
+            "prompt": "Enter your monthly income (₹): (Minimum ₹25,000 required)"},
+        2: {"parse": number(INCOME), "field": "salary", "retry": "Please enter numeric income. Example: 30000",
+            "reject": [(below(25000), "Not eligible: Minimum income required is ₹25,000/month.")],
+            "prompt": EMP_PROMPT},
+        3: {"parse": choice(EMP_CHOICES), "field": "emp",
+            "retry": "Please select:\n1) Government Employee\n2) Private Employee\n3) Self-Employed",
+            "prompt": "Enter total years of work experience:"},
+        4: {"parse": whole(r'\d{1,2}'), "field": "exp", "retry": "Please enter experience in years (1-30).",
+            "reject": experience_rules(
+                "Not eligible: Government employees need minimum 1 year experience.",
+                "Not eligible: Private employees need minimum 3 years experience.",
+                "Not eligible: Self-employed individuals must have minimum **2 years business stability** "
+                "and valid ITR proof."),
+            "prompt": "Enter your CIBIL score (300–900):"},
+        5: {"parse": whole(r'\d{3,4}'), "field": "cibil", "retry": "Please enter valid CIBIL (300–900).",
+            "reject": [(below(750), "Not eligible: CIBIL score must be 750 or above.")],
+            "prompt": "Enter property value (₹):"},
+        6: {"parse": number(r'\d{5,10}'), "retry": "Please enter property value numeric. Example: 5000000",
+            "finish": home_result},
+    },
+}
+
+LOAN_ELIGIBILITY = {
+    product: Flow(steps, state=lambda m: m["loan"], record=lambda m: m["loan"]["elig"],
+                  intent="loan_eligibility_check", result_intent="loan_eligibility_result",
+                  on_exit=end_loan, on_finish=offer_loan_apply)
+    for product, steps in LOAN_ELIGIBILITY_STEPS.items()
+}
+
+# ----- loan application (after eligibility OK), by category -----
+UPLOAD_PROMPT = ("Please upload documents on Caashmora Official Portal.\n"
+                 "If you need help, type 'what documents'. Once uploaded, type 'done'.")
+
+def parse_name(turn):
+    return turn.raw.title() if re.fullmatch(r'[A-Za-z][A-Za-z .\-]{1,50}', turn.raw) else None
+
+def parse_pan(turn):
+    if re.fullmatch(r'[A-Z]{5}\d{4}[A-Z]', turn.raw, re.I):
+        return turn.raw.upper()
+    if turn.text == "skip":
+        return "Not Provided"
+    return None
+
+def parse_business_name(turn):
+    return turn.raw.title() if re.fullmatch(r'[A-Za-z0-9 &.\-]{2,60}', turn.raw) else None
+
+def parse_gst(turn):
+    return turn.raw.upper() if re.fullmatch(r'\d{2}[A-Z]{5}\d{4}[A-Z]\d[A-Z\d]\d', turn.raw, re.I) else None
+
+def apply_name_step(prompt):
+    return {"parse": parse_name, "field": "name", "retry": "Please provide your full name.",
+            "retry_intent": "loan_apply_start", "prompt": prompt}
+
+def upload_step(docs, summary):
+    def handle(turn):
+        if "documents" in turn.hits:
+            return "loan_required_documents", {}, docs
+        if "done" in turn.hits:
+            reply = summary(turn.memory["loan"]["apply"])
+            end_loan(turn.memory)
+            return "loan_apply_submit", {}, reply
+        return "loan_apply_wait", {}, UPLOAD_PROMPT
+    return {"handle": handle}
+
+PAN_STEP = {"parse": parse_pan, "field": "pan", "retry": "Enter valid PAN (ABCDE1234F) or type 'skip'.",
+            "prompt": UPLOAD_PROMPT, "prompt_intent": "loan_apply_upload"}
+
+LOAN_APPLY_STEPS = {
+    # ================= SECURED LOAN APPLY =================
+    "secured": {
+        10: apply_name_step("Please confirm your monthly salary (₹)."),
+        11: {"parse": number(r'\d{4,9}'), "field": "salary", "retry": "Please enter salary in numbers.",
+             "prompt": "Please enter your PAN (or type 'skip')."},
+        12: PAN_STEP,
+        13: upload_step(DOCS_SECURED, lambda A: (
+            f"Secured Loan Application Submitted.\n"
+            f"Name: {A['name']}\nSalary: ₹{A['salary']:,}\nPAN: {A.get('pan', 'Not Provided')}\n"
+            "Verification will begin shortly. You will get further updates via registered SMS/Email.\n\nWould you like to continue?")),
+    },
+    # ================= UNSECURED LOAN APPLY =================
+    "unsecured": {
+        10: apply_name_step("Please enter your PAN Number (or type 'skip')."),
+        11: PAN_STEP,
+        12: upload_step(DOCS_UNSECURED, lambda A: (
+            f" Unsecured Loan Application Submitted.\n"
+            f"Name: {A['name']}\nPAN: {A.get('pan', 'Not Provided')}\n"
+            "Verification will begin shortly. You will get further updates via registered SMS/Email.\n\nWould you like to continue?")),
+    },
+    # ================= BUSINESS LOAN APPLY =================
+    "business": {
+        10: apply_name_step("Enter your Business / Enterprise Name:"),
+        11: {"parse": parse_business_name, "field": "business_name",
+             "retry": "Enter valid Business / Enterprise Name.",
+             "prompt": "Enter your GST Number (e.g., 33AAAAA1234A1Z5):"},
+        12: {"parse": parse_gst, "field": "gst", "retry": "Invalid GST. Example: 33AAAAA1234A1Z5",
+             "prompt": UPLOAD_PROMPT, "prompt_intent": "loan_apply_upload"},
+        13: upload_step(DOCS_BUSINESS, lambda A: (
+            f"Business Loan Application Submitted.\n"
+            f"Applicant: {A['name']}\nBusiness: {A['business_name']}\nGST: {A['gst']}\n"
+            "Verification will begin shortly. You will get further updates via registered SMS/Email.\n\nWould you like to continue?")),
+    },
+}
+
+LOAN_APPLY = {
+    category: Flow(steps, state=lambda m: m["loan"], record=lambda m: m["loan"]["apply"],
+                   intent="loan_apply_step", on_exit=end_loan)
+    for category, steps in LOAN_APPLY_STEPS.items()
+}
+
+LOAN_CATEGORIES = [
+    ("1", "secured", SECURED_MENU),
+    ("2", "unsecured", UNSEC_MENU),
+    ("3", "business", BUS_MENU),
+]
+
+def loan_flow(turn):
+    memory, raw, text, hits = turn.memory, turn.raw, turn.text, turn.hits
+    L = memory["loan"]
+
+    # Step 1: category
+    if L["category"] is None:
+        for number_choice, category, menu in LOAN_CATEGORIES:
+            if raw==number_choice or category in text:
+                L["category"]=category; return "loan_type_menu", {}, menu
+        return "loan_menu", {}, LOAN_MAIN
+
+    # Step 2: product by category
+    if L["product"] is None:
+        L["product"] = match_loan_product(L["category"], raw, text)
+        if L["product"] is None:
+            menu = {"secured": SECURED_MENU, "unsecured": UNSEC_MENU}.get(L["category"], BUS_MENU)
+            return "loan_type_menu", {}, menu
+
+        return "loan_service_menu", {}, LOAN_SERVICE
+
+    # Step 3: service
+    if L["service"] is None:
+        if raw=="1" or "eligib" in hits:
+            L["service"]="elig"; L["step"]=1
+            return "loan_eligibility_check", {}, "Please enter your age in years."
+        elif raw=="2" or "apply" in hits:
+            # force eligibility first
+            L["service"]="elig"; L["step"]=1
+            return "loan_eligibility_required", {}, "Please check eligibility first. Enter your age in years."
+        elif raw=="3" or "status" in hits:
+            L["service"]="status"; L["step"]=100
+            return "loan_status", {}, "Please enter your application number."
+        else:
+            return "loan_service_menu", {}, LOAN_SERVICE
+
+    # Status
+    if L["service"]=="status" and L["step"]==100:
+        if not re.fullmatch(r'APP[0-9A-Z]{8,}', raw, re.I):
+            return "loan_status", {}, "Please enter a valid application number (e.g., APP12345678)."
+        end_loan(memory)
+        return "loan_status_result", {}, "Your application is under review. You will be notified by SMS/Email."
+
+    if L["service"]=="elig":
+        return LOAN_ELIGIBILITY.get(L["product"], LOAN_ELIGIBILITY["home"]).handle(turn)
+    if L["service"]=="apply":
+        return LOAN_APPLY[L["category"]].handle(turn)
+    return None
+
+# ----- open account -----
+def end_account(memory):
+    memory["menu"]=None; reset_acct(memory)
+
+def parse_account_type(turn):
+    if turn.raw=="1" or "savings" in turn.text:
+        return "Savings Account"
+    if turn.raw=="2" or "current" in turn.text:
+        return "Current Account"
+    return None
+
+def parse_aadhaar(turn):
+    aad = re.sub(r'\D','',turn.raw)
+    return aad if re.fullmatch(r'\d{12}', aad) else None
+
+def confirm_account(turn):
+    if turn.text=="confirm":
+        end_account(turn.memory)
+        return "account_open_submit", {}, "Account opening request submitted. You will receive further updates via SMS/Email.\n\nWould you like to continue?"
+    if turn.text=="edit":
+        end_account(turn.memory); turn.memory["menu"]="account"; turn.memory["acct"]["step"]=1
+        return "account_open_start", {}, "Okay, let's restart. Please provide your full name."
+    return "account_open_step", {}, "Please type 'confirm' to submit or 'edit' to restart."
+
+ACCOUNT_FLOW = Flow({
+    1: {"parse": parse_name, "field": "name", "retry": "Please enter a valid full name.",
+        "retry_intent": "account_open_start", "prompt": "Please enter your age in years."},
+    2: {"parse": digits, "field": "age", "retry": "Please enter a valid age in numbers.",
+        "reject": [(below(18), "Minimum age is 18.")],
+        "prompt": "Please choose account type:\n1) Savings Account\n2) Current Account"},
+    3: {"parse": parse_account_type, "field": "type", "retry": "Please choose 1 for Savings or 2 for Current.",
+        "prompt": "Please enter your full address."},
+    4: {"parse": lambda turn: turn.raw if len(turn.raw) >= 8 else None, "field": "addr",
+        "retry": "Please enter a complete address.",
+        "prompt": "Please enter your 12-digit Aadhaar number."},
+    5: {"parse": parse_aadhaar, "field": "aadhaar", "retry": "Please enter a valid 12-digit Aadhaar number.",
+        "prompt": lambda A: (
+            f"Confirm details:\nName: {A['name']}\nAge: {A['age']}\nAccount Type: {A['type']}\n"
+            f"Address: {A['addr']}\nAadhaar: {mask_aadhaar(A['aadhaar'])}\nType 'confirm' to submit or 'edit' to restart.")},
+    6: {"handle": confirm_account},
+}, state=lambda m: m["acct"], intent="account_open_step", on_exit=end_account)
+
 # ========= Core handler =========
-def handle_user_input(user_input):
+def handle_user_input(user_input, memory=None, inference=None):
+    """
+    Returns (intent, entities, reply, confidence). Pass `inference` (an
+    InferenceResult for this message) to share the single classifier run
+    with the caller. Rule and flow replies are deterministic and report 1.0;
+    replies chosen by the classifier report its real probability, and the
+    "unknown" fallback reports the classifier's (too low) probability, or
+    0.0 when it did not run.
+    """
+    if memory is None:
+        memory = cli_memory
+    if inference is None:
+        inference = InferenceResult(user_input.strip(), active)
+
+    intent, ent, reply = _route(user_input, memory, inference)
+    if inference.computed and intent == inference.intent:
+        return intent, ent, reply, inference.confidence
+    if intent == "unknown":
+        return intent, ent, reply, inference.confidence if inference.computed else 0.0
+    return intent, ent, reply, 1.0
+
+
+def _route(user_input, memory, inference):
     raw = user_input.strip()
     text = normalize_text(raw)
     ent = extract_entities(raw)
+    hits = TEXT_RULES.match(text)
 
 
     # --- after eligibility decision (apply or not now) ---
@@ -309,7 +1231,7 @@ def handle_user_input(user_input):
             return "loan_apply_start", {}, "Please provide your full name."
 
         if text in ["no", "not now", "later", "stop", "cancel"]:
-            reset_loan(); memory["menu"] = None
+            reset_loan(memory); memory["menu"] = None
             return "reject", {}, "No problem, I'm here whenever you're ready."
 
         return "loan_eligibility_result", {}, "Type 'apply' to continue or 'not now' to cancel."
@@ -320,36 +1242,34 @@ def handle_user_input(user_input):
         ent.pop("money", None)
 
     # ===== greetings
-    if re.search(r'\b(hi|hello|hey)\b', text):
+    if "greet" in hits:
         return "greet", ent, "Hello, how may I assist you?"
 
     # ===== quick openers for card types (text OR number)
     # user can say "card", "debit card", "credit card" directly
     if text in ["card","cards"]:
-        memory["menu"]="card"; reset_card()
+        memory["menu"]="card"; reset_card(memory)
         return "card_menu", ent, CARD_ASK
 
-    if re.search(r'\bdebit( card)?\b', text):
-        memory["menu"]="card"; reset_card()
+    if "debit" in hits:
+        memory["menu"]="card"; reset_card(memory)
         memory["card"]["type"]="debit"
         return "debit_menu", ent, DEBIT_MENU
 
-    if re.search(r'\bcredit( card)?\b', text):
-        memory["menu"]="card"; reset_card()
+    if "credit" in hits:
+        memory["menu"]="card"; reset_card(memory)
         memory["card"]["type"]="credit"
         return "credit_menu", ent, CREDIT_MENU
 
     # ===== balance check
-    if re.search(r'\b(balance|check balance|account balance)\b', text):
+    if "balance" in hits:
         memory["last_intent"] = "balance"
         return "balance_enquiry", ent, "Please provide your account number to view the balance."
 
     if memory.get("last_intent") == "balance" and re.fullmatch(r'\d{6,16}', raw):
         memory["last_intent"] = None
 
-        from db import get_balance  # use db version if moved
-
-        balance = get_balance(raw)
+        balance = repo.get_balance(raw)
         if balance is None:
             return "check_balance", {}, "❌ Account not found in records."
 
@@ -360,12 +1280,13 @@ def handle_user_input(user_input):
 
 
     # ================= MONEY TRANSFER (DB CONNECTED) =================
-    if re.search(r'\b(pay|transfer|send)\b', text) and memory.get("flow") != "transfer":
+    if "pay" in hits and memory.get("flow") != "transfer":
         memory["flow"] = "transfer"
         memory["step"] = 1
         memory["receiver_name"] = None
         memory["receiver_account"] = None
         memory["amount"] = None
+        memory["transfer_key"] = uuid.uuid4().hex
         return "transfer_money", {}, "To whom would you like to transfer money?"
 
     if memory.get("flow") == "transfer":
@@ -403,7 +1324,6 @@ def handle_user_input(user_input):
             else:
                 return "transfer_money", {}, "Invalid payment method. Type 'UPI' or 'Bank Transfer'."
 
-            from db import get_balance, update_balance, get_user_by_account, record_transaction
             import random, string
 
             sender_acct = memory.get("current_user_account")
@@ -416,21 +1336,13 @@ def handle_user_input(user_input):
                 memory["flow"] = None
                 return "transfer_money", {}, "❌ You cannot transfer money to your own account."
 
-            # ✅ Check balance
-            sender_balance = get_balance(sender_acct)
-            if sender_balance is None or sender_balance < amount:
+            # ✅ Debit, credit and log in one transaction; payees outside the bank are paid out.
+            # The key is per transfer, so a repeated final message cannot pay twice.
+            ok, message, _ = repo.transfer(sender_acct, receiver_acct, amount, receiver_name, pm,
+                                      idempotency_key=memory.get("transfer_key"), allow_external=True)
+            if not ok:
                 memory["flow"] = None
-                return "transfer_money", {}, "❌ Transaction Failed: Insufficient Balance."
-
-            # ✅ Deduct/credit balances
-            update_balance(sender_acct, sender_balance - amount)
-
-            receiver = get_user_by_account(receiver_acct)
-            if receiver:
-                update_balance(receiver_acct, receiver["balance"] + amount)
-
-            # ✅ Save transaction log
-            record_transaction(sender_acct, receiver_acct, receiver_name, amount, pm, "Success")
+                return "transfer_money", {}, f"❌ Transaction Failed: {message}."
 
             txn = "TXN" + ''.join(random.choices(string.digits, k=6))
 
@@ -442,1611 +1354,50 @@ def handle_user_input(user_input):
             )
 
 
-    # ===== CARD FLOW (fixed: numbers + text, deterministic replies)
+    # ===== flows: one lookup on the current state
+    turn = Turn(memory, raw, text, hits, ent)
     if memory.get("menu")=="card":
-            c = memory["card"]
-
-            # choose type
-            if c["type"] is None:
-                if wants_debit(raw):
-                    c["type"]="debit"
-                    return "debit_menu", {}, DEBIT_MENU
-                if wants_credit(raw):
-                    c["type"]="credit"
-                    return "credit_menu", {}, CREDIT_MENU
-                return "card_menu", {}, "Please choose 1 for Debit or 2 for Credit."
-
-            # ---- Debit actions
-            if c["type"]=="debit":
-                if c["action"] is None:
-                    # by number
-                    if is_number_choice(raw,1,5):
-                        c["action"] = {"1":"block","2":"unblock","3":"status","4":"apply","5":"report"}[raw.strip()]
-                    else:
-                        t = text
-                        if re.search(r'\bblock\b', t): c["action"]="block"
-                        elif re.search(r'\bunblock\b', t): c["action"]="unblock"
-                        elif re.search(r'\b(status|check)\b', t): c["action"]="status"
-                        elif re.search(r'\bapply\b', t): c["action"]="apply"
-                        elif re.search(r'\breport|lost|stolen\b', t): c["action"]="report"
-                    if c["action"] is None:
-                        return "debit_menu", {}, DEBIT_MENU
-
-                # apply does NOT need last4
-                if c["action"]=="apply":
-                    reset_card(); memory["menu"]=None
-                    return "debit_card_replacement", {}, "Your Debit Card request has been submitted successfully.\nFurther application details will be sent to your registered mobile number and email.\n\nWould you like to continue?"
-
-                # other actions need last4
-                if not c["last4"]:
-                    if 'last4' in ent and re.fullmatch(r'\d{4}', ent['last4']):
-                        c["last4"]=ent['last4']
-                    else:
-                        return "ask_card_last4", {}, "For security, please enter the last 4 digits of your debit card."
-
-                # perform
-                last4 = c["last4"]
-                action = c["action"]
-                reset_card(); memory["menu"]=None
-
-                if action=="block":
-                    return "debit_card_block", {}, f"Your Debit Card ending with **** **** **** {last4} has been blocked successfully.\n\nWould you like to continue?"
-                if action=="unblock":
-                    return "debit_card_unblock", {}, f"Your Debit Card ending with **** **** **** {last4} has been unblocked.\n\nWould you like to continue?"
-                if action=="status":
-                    return "debit_card_status", {}, f"Your Debit Card **** **** **** {last4} is active.\n\nWould you like to continue?"
-                if action=="report":
-                    return "debit_card_report_lost", {}, f"Lost/Stolen report filed. Debit Card **** **** **** {last4} is now blocked.\n\nWould you like to continue?"
-
-            # ---- Credit actions
-            if c["type"]=="credit":
-                if c["action"] is None:
-                    if is_number_choice(raw,1,6):
-                        c["action"] = {"1":"block","2":"unblock","3":"status","4":"apply","5":"viewbill","6":"paybill"}[raw.strip()]
-                    else:
-                        t = text
-                        if re.search(r'\bblock\b', t): c["action"]="block"
-                        elif re.search(r'\bunblock\b', t): c["action"]="unblock"
-                        elif re.search(r'\b(status|limit|check)\b', t): c["action"]="status"
-                        elif re.search(r'\bapply\b', t): c["action"]="apply"
-                        elif re.search(r'\bpay bill|bill payment|payment\b', t): c["action"]="paybill"
-                        elif re.search(r'\bview bill|bill\b', t): c["action"]="viewbill"
-                    if c["action"] is None:
-                        return "credit_menu", {}, CREDIT_MENU
-
-                if c["action"]=="apply":
-                    reset_card(); memory["menu"]=None
-                    return "credit_card_application", {}, "Your Credit Card request has been submitted successfully.\nFurther application details will be sent to your registered mobile number and email.\n\nWould you like to continue?"
-
-                # other credit actions need last4
-                if not c["last4"]:
-                    if 'last4' in ent and re.fullmatch(r'\d{4}', ent['last4']):
-                        c["last4"]=ent['last4']
-                    else:
-                        return "ask_card_last4", {}, "For security, please enter the last 4 digits of your credit card."
-
-                last4 = c["last4"]
-                action = c["action"]
-
-                # paybill needs amount
-                if action=="paybill" and not c["amount"]:
-                    if 'money' in ent:
-                        try:
-                            c["amount"] = str(int(float(ent['money'])))
-                        except:
-                            c["amount"] = None
-                    if not c["amount"]:
-                        return "credit_card_payment", {}, "Enter bill amount to pay (e.g., 2500)."
-
-                # finalize actions
-                msg = ""
-                if action=="block":
-                    msg = f"Your Credit Card **** **** **** {last4} has been blocked successfully."
-                elif action=="unblock":
-                    msg = f"Your Credit Card **** **** **** {last4} has been unblocked."
-                elif action=="status":
-                    msg = f"Your Credit Card **** **** **** {last4} is active. Limit changes require KYC."
-                elif action=="viewbill":
-                    msg = f"Latest bill for **** **** **** {last4} is available in your statements."
-                elif action=="paybill":
-                    amt = int(float(c["amount"]))
-                    msg = f"Payment of ₹{amt:,} received for Credit Card **** **** **** {last4}."
-
-                reset_card(); memory["menu"]=None
-                return "credit_card_action", {}, msg + "\n\nWould you like to continue?"
-
-	# ===== ATM FLOW (keep same behavior)
+        return card_flow(turn)
+
+    # ===== ATM FLOW
     if text in ["atm","atms"]:
-        memory["menu"]="atm"; reset_atm()
+        memory["menu"]="atm"; reset_atm(memory)
         return "atm_menu", {}, ATM_MENU
 
     if memory.get("menu")=="atm":
-        a = memory["atm"]
-        if a["action"] is None:
-            # choose by number or text
-            if is_number_choice(raw,1,5):
-                a["action"] = { "1":"locator","2":"limit","3":"issue","4":"not_dispensed","5":"pin_change" }[raw.strip()]
-            else:
-                t = text
-                if re.search(r'nearest|locate|near',t): a["action"]="locator"
-                elif re.search(r'limit|withdrawal',t): a["action"]="limit"
-                elif re.search(r'issue|problem',t): a["action"]="issue"
-                elif re.search(r'not dispensed|card not dispensed',t): a["action"]="not_dispensed"
-                elif re.search(r'pin',t): a["action"]="pin_change"
-            if a["action"] is None: 
-                return "atm_menu", {}, ATM_MENU
-
-        # locator does not need last4
-        if a["action"]=="locator":
-            reset_atm(); memory["menu"]=None
-            return "atm_locator", {}, "Nearest ATMs will be shown based on your location.\n\nWould you like to continue?"
-
-        # others require last4 first
-        if not a["last4"]:
-            if 'last4' in ent and re.fullmatch(r'\d{4}', ent['last4']):
-                a["last4"]=ent['last4']
-            else:
-                return "ask_card_last4", {}, "Please enter the last 4 digits of your card to proceed."
-
-        if a["action"]=="limit":
-            reset_atm(); memory["menu"]=None
-            return "atm_withdrawal_limit", {}, "ATM withdrawal limit is ₹40,000/day.\n\nWould you like to continue?"
-        if a["action"]=="issue":
-            reset_atm(); memory["menu"]=None
-            return "atm_issue_report", {}, "ATM issue reported. Resolution within 48 hours.\n\nWould you like to continue?"
-        if a["action"]=="not_dispensed":
-            reset_atm(); memory["menu"]=None
-            return "atm_card_not_dispensed", {}, "Card not dispensed — amount will be auto-reversed if debited.\n\nWould you like to continue?"
-        if a["action"]=="pin_change":
-            reset_atm(); memory["menu"]=None
-            return "atm_pin_change", {}, "Change your ATM PIN using the mobile app or ATM.\n\nWould you like to continue?"
+        return atm_flow(turn)
 
     # ===== LOAN FLOW
     if text in ["loan","loans"]:
-        memory["menu"]="loan"; reset_loan()
+        memory["menu"]="loan"; reset_loan(memory)
         return "loan_menu", {}, LOAN_MAIN
 
     if memory.get("menu")=="loan":
-        L = memory["loan"]
-
-        # Step 1: category
-        if L["category"] is None:
-            if raw.strip()=="1" or "secured" in text:
-                L["category"]="secured"; return "loan_type_menu", {}, SECURED_MENU
-            if raw.strip()=="2" or "unsecured" in text:
-                L["category"]="unsecured"; return "loan_type_menu", {}, UNSEC_MENU
-            if raw.strip()=="3" or "business" in text:
-                L["category"]="business"; return "loan_type_menu", {}, BUS_MENU
-            return "loan_menu", {}, LOAN_MAIN
-
-        # Step 2: product by category
-        if L["product"] is None:
-            t = raw.strip()
-            if L["category"]=="secured":
-                mapping = {"1":"home","2":"auto","3":"lap","4":"gold","5":"fd"}
-                textmap = [("home","home"),("auto","auto"),("vehicle","auto"),
-                           ("property","lap"),("gold","gold"),("fixed deposit","fd")]
-                if t in mapping: L["product"]=mapping[t]
-                else:
-                    for k,v in textmap:
-                        if k in text: L["product"]=v
-                if L["product"] is None: return "loan_type_menu", {}, SECURED_MENU
-            elif L["category"]=="unsecured":
-                mapping = {"1":"personal","2":"education","3":"credit","4":"debt"}
-                textmap = [("personal","personal"),("education","education"),
-                           ("credit card","credit"),("revolving","credit"),("debt","debt")]
-                if t in mapping: L["product"]=mapping[t]
-                else:
-                    for k,v in textmap:
-                        if k in text: L["product"]=v
-                if L["product"] is None: return "loan_type_menu", {}, UNSEC_MENU
-            else:
-                mapping = {"1":"term","2":"wc","3":"equip","4":"invoice","5":"od"}
-                textmap = [("term","term"),("working","wc"),("equipment","equip"),
-                           ("invoice","invoice"),("overdraft","od")]
-                if t in mapping: L["product"]=mapping[t]
-                else:
-                    for k,v in textmap:
-                        if k in text: L["product"]=v
-                if L["product"] is None: return "loan_type_menu", {}, BUS_MENU
-
-            return "loan_service_menu", {}, LOAN_SERVICE
-
-        # Step 3: service
-        if L["service"] is None:
-            if raw.strip()=="1" or re.search(r'eligib', text):
-                L["service"]="elig"; L["step"]=1
-                return "loan_eligibility_check", {}, "Please enter your age in years."
-            elif raw.strip()=="2" or re.search(r'\bapply\b', text):
-                # force eligibility first
-                L["service"]="elig"; L["step"]=1
-                return "loan_eligibility_required", {}, "Please check eligibility first. Enter your age in years."
-            elif raw.strip()=="3" or re.search(r'status', text):
-                L["service"]="status"; L["step"]=100
-                return "loan_status", {}, "Please enter your application number."
-            else:
-                return "loan_service_menu", {}, LOAN_SERVICE
-
-        # Status
-        if L["service"]=="status" and L["step"]==100:
-            if not re.fullmatch(r'APP[0-9A-Z]{8,}', raw.strip(), re.I):
-                return "loan_status", {}, "Please enter a valid application number (e.g., APP12345678)."
-            reset_loan(); memory["menu"]=None
-            return "loan_status_result", {}, "Your application is under review. You will be notified by SMS/Email."
-
-        # Eligibility
-        if L["service"]=="elig":
-            E = L["elig"]
-
-            # ===== EDUCATION LOAN SPECIAL RULES =====
-            if L["product"] == "education":
-                # Step 1: student age
-                if L["step"] == 1:
-                    if not raw.strip().isdigit():
-                        return "loan_eligibility_check", {}, "Please enter student age."
-                    E["age"] = int(raw.strip())
-                    if E["age"] < 17:
-                        reset_loan(); memory["menu"]=None
-                        return "loan_eligibility_result", {}, "Not eligible: Student must be at least 17 years old."
-                    L["step"] = 2
-                    return "loan_eligibility_check", {}, "Enter parent's monthly income."
-
-                # Step 2: parent income (>=25,000)
-                if L["step"] == 2:
-                    m = re.search(r'(\d{4,9})', raw.replace(',',''))
-                    if not m:
-                        return "loan_eligibility_check", {}, "Please enter numeric income. Example: 30000"
-                    E["salary"] = int(m.group(1))
-                    if E["salary"] < 15000:
-                        reset_loan(); memory["menu"]=None
-                        return "loan_eligibility_result", {}, "Not eligible: Parent income must be at least ₹15,000/month."
-                    L["step"] = 3
-                    return "loan_eligibility_check", {}, "Parent employment type?\n1) Government\n2) Private"
-
-                # Step 3: parent employment
-                if L["step"] == 3:
-                    if raw.strip() == "1":
-                        E["emp"] = "govt"
-                    elif raw.strip() == "2":
-                        E["emp"] = "private"
-                    else:
-                        return "loan_eligibility_check", {}, "Please type 1 for Government or 2 for Private."
-                    L["step"] = 4
-                    return "loan_eligibility_check", {}, "Enter parent CIBIL score."
-
-                # Step 4: parent CIBIL (>=700)
-                if L["step"] == 4:
-
-                    # allow: "what is cibil", "explain cibil", etc.
-                    if re.search(r'what.*cibil|cibil meaning|explain cibil', text):
-                        return "loan_info", {}, (
-                            "CIBIL score shows credit repayment history.\n"
-                            "Range: 300–900. Above 750 is considered good.\n\n"
-                            "Please enter parent CIBIL score (300–900)."
-                        )
-
-                    if not re.fullmatch(r'\d{3,4}', raw.strip()):
-                        return "loan_eligibility_check", {}, "Enter valid CIBIL (300–900)."
-
-                    E["cibil"] = int(raw.strip())
-                    if E["cibil"] < 700:
-                        reset_loan(); memory["menu"]=None
-                        return "loan_eligibility_result", {}, "Not eligible: CIBIL score must be 700 or above."
-
-                    L["step"] = 5
-                    return "loan_eligibility_check", {}, "Is the course in 'India' or 'Abroad'?"
-
-                # Step 5: course location
-                if L["step"] == 5:
-                    if "india" in text:
-                        E["location"] = "India"
-                    elif "abroad" in text:
-                        E["location"] = "Abroad"
-                    else:
-                        return "loan_eligibility_check", {}, "Please type 'India' or 'Abroad'."
-                    L["step"] = 6
-                    return "loan_eligibility_check", {}, "How much loan amount do you need?"
-
-                # Step 6: requested amount + collateral rules + proceed to apply
-                if L["step"] == 6:
-                    amt = re.search(r'\d{4,9}', raw.replace(',',''))
-                    if not amt:
-                        return "loan_eligibility_check", {}, "Please enter amount numeric. Example: 600000"
-                    E["amount"] = int(amt.group(0))
-
-                    if E["amount"] <= 400000:
-                        collateral = "No collateral required (Parent will be co-applicant)"
-                    elif E["amount"] <= 750000:
-                        collateral = "Third party guarantee required"
-                    else:
-                        collateral = "Tangible collateral (Property / Fixed Deposit) required"
-
-                    E["eligible"] = True
-                    # hand off to apply flow like other loans
-                    L["service"] = "apply"
-                    L["step"] = 10  # next prompt asks for full name
-                    memory["loan"]["waiting_apply"] = True
-
-                    return (
-                        "loan_eligibility_result",
-                        {},
-                        f"Education Loan Eligibility Result\n\n"
-                        f"Loan Amount Considered: ₹{E['amount']:,}\n"
-                        f"Course Location: {E['location']}\n"
-                        f"Parent Income: ₹{E['salary']:,}/month\n"
-                        f"CIBIL Score: {E['cibil']} (Good)\n\n"
-                        f"Collateral: {collateral}\n"
-                        f"Co-Applicant: Parent/Guardian mandatory\n"
-                        f"Repayment: After course + job placement\n\n"
-                        f"Type 'apply' to continue with application."
-                    )
-                
-            # ===== PERSONAL LOAN ELIGIBILITY (Central Bank of India Rules) =====
-            if L["product"] == "personal":
-                # Step 1 — Age
-                if L["step"] == 1:
-                    if not raw.strip().isdigit():
-                        return "loan_eligibility_check", {}, "Please enter your age in numbers."
-                    E["age"] = int(raw.strip())
-                    if E["age"] < 21:
-                        reset_loan(); memory["menu"]=None
-                        return "loan_eligibility_result", {}, "Not eligible: Minimum age required is 21."
-                    L["step"] = 2
-                    return "loan_eligibility_check", {}, "Enter your monthly income (₹)."
-
-                # Step 2 — Income (Min ₹15,000 / month)
-                if L["step"] == 2:
-                    m = re.search(r'(\d{4,9})', raw.replace(',',''))
-                    if not m:
-                        return "loan_eligibility_check", {}, "Please enter numeric income, e.g., 25000."
-                    E["salary"] = int(m.group(1))
-                    if E["salary"] < 15000:
-                        reset_loan(); memory["menu"]=None
-                        return "loan_eligibility_result", {}, "Not eligible: Minimum income required is ₹15,000/month."
-                    L["step"] = 3
-                    return "loan_eligibility_check", {}, (
-                        "Select Employment Type:\n"
-                        "1) Government Employee\n"
-                        "2) Private/MNC Employee\n"
-                        "3) Self-Employed"
-                    )
-
-                # Step 3 — Employment Type
-                if L["step"] == 3:
-                    choice = raw.strip()
-                    if choice == "1":
-                        E["emp"] = "govt"
-                    elif choice == "2":
-                        E["emp"] = "private"
-                    elif choice == "3":
-                        E["emp"] = "self"
-                    else:
-                        return "loan_eligibility_check", {}, "Please choose 1, 2, or 3."
-                    L["step"] = 4
-                    return "loan_eligibility_check", {}, "Enter total years of work experience."
-
-                # Step 4 — Experience Rules
-                if L["step"] == 4:
-                    if not re.fullmatch(r'\d{1,2}', raw.strip()):
-                        return "loan_eligibility_check", {}, "Please enter years as a number."
-                    E["exp"] = int(raw.strip())
-
-                    if E["emp"] == "govt" and E["exp"] < 1:
-                        reset_loan(); memory["menu"]=None
-                        return "loan_eligibility_result", {}, "Not eligible: Government employees need at least 1 year of service."
-                    if E["emp"] == "private" and E["exp"] < 3:
-                        reset_loan(); memory["menu"]=None
-                        return "loan_eligibility_result", {}, "Not eligible: Private employees need minimum 3 years service."
-                    if E["emp"] == "self" and E["exp"] < 2:
-                        reset_loan(); memory["menu"]=None
-                        return "loan_eligibility_result", {}, "Not eligible: Self-employed requires minimum 2 years business proof."
-
-                    L["step"] = 5
-                    return "loan_eligibility_check", {}, "Enter your CIBIL score (300–900)."
-
-                # Step 5 — CIBIL Score
-                if L["step"] == 5:
-
-                    if re.search(r'what.*cibil|cibil meaning|explain cibil', text):
-                        return "loan_info", {}, (
-                            "CIBIL score shows how you repaid past loans.\n"
-                            "Range: 300–900. Above 750 is ideal.\n\n"
-                            "Please enter CIBIL score (300–900)."
-                        )
-
-                    if not re.fullmatch(r'\d{3,4}', raw.strip()):
-                        return "loan_eligibility_check", {}, "Please enter a valid CIBIL score (300–900)."
-
-                    E["cibil"] = int(raw.strip())
-                    if E["cibil"] < 700:
-                        reset_loan(); memory["menu"]=None
-                        return "loan_eligibility_result", {}, "Not eligible: CIBIL score must be 700 or above."
-
-                    max_salary_based = E["salary"] * 24
-                    eligible_amount = min(max_salary_based, 2000000)  # 20L max
-
-                    E["eligible"] = True
-                    E["amount"] = eligible_amount
-                    L["service"] = "apply"
-                    L["step"] = 10
-                    memory["loan"]["waiting_apply"] = True
-
-                    return "loan_eligibility_result", {}, (
-                        f"Personal Loan Eligibility Confirmed.\n\n"
-                        f"Eligible Loan Amount: ₹{eligible_amount:,}\n"
-                        f"Tenure: Up to 7 years\n"
-                        f"EMI will be calculated based on your income.\n\n"
-                        f"Type 'apply' to continue or 'not now' to cancel."
-                    )
-
-            # ===== AUTO / VEHICLE LOAN RULES =====
-            if L["product"] == "auto":
-                # Step 1: Age
-                if L["step"] == 1:
-                    if not raw.strip().isdigit():
-                        return "loan_eligibility_check", {}, "Please enter your age in numbers."
-                    E["age"] = int(raw.strip())
-                    if E["age"] < 18:
-                        reset_loan(); memory["menu"]=None
-                        return "loan_eligibility_result", {}, "Not eligible: Minimum age is 18."
-                    L["step"] = 2
-                    return "loan_eligibility_check", {}, "Enter your monthly income (₹)."
-
-                # Step 2: Income
-                if L["step"] == 2:
-                    m = re.search(r'(\d{4,9})', raw.replace(',',''))
-                    if not m:
-                        return "loan_eligibility_check", {}, "Please enter numeric income. Example: 30000"
-                    E["salary"] = int(m.group(1))
-                    if E["salary"] < 20000:
-                        reset_loan(); memory["menu"]=None
-                        return "loan_eligibility_result", {}, "Not eligible: Minimum income must be ₹20,000/month."
-                    L["step"] = 3
-                    return "loan_eligibility_check", {}, "Select Employment Type:\n1) Government Employee\n2) Private Employee\n3) Self-Employed"
-
-                # Step 3: Employment Type
-                if L["step"] == 3:
-                    if raw.strip() == "1":
-                        E["emp"] = "govt"
-                    elif raw.strip() == "2":
-                        E["emp"] = "private"
-                    elif raw.strip() == "3":
-                        E["emp"] = "self"
-                    else:
-                        return "loan_eligibility_check", {}, "Please select 1, 2, or 3."
-                    L["step"] = 4
-                    return "loan_eligibility_check", {}, "Enter total years of work experience."
-
-                # Step 4: Experience rules
-                if L["step"] == 4:
-                    if not re.fullmatch(r'\d{1,2}', raw.strip()):
-                        return "loan_eligibility_check", {}, "Please enter experience in years (e.g., 2)."
-                    E["exp"] = int(raw.strip())
-
-                    if E["emp"] == "govt" and E["exp"] < 1:
-                        reset_loan(); memory["menu"]=None
-                        return "loan_eligibility_result", {}, "Not eligible: Government employees need minimum 1 year experience."
-                    if E["emp"] == "private" and E["exp"] < 3:
-                        reset_loan(); memory["menu"]=None
-                        return "loan_eligibility_result", {}, "Not eligible: Private employees need minimum 3 years experience."
-                    if E["emp"] == "self" and E["exp"] < 2:
-                        reset_loan(); memory["menu"]=None
-                        return "loan_eligibility_result", {}, "Not eligible: Self-employed need minimum 2 years business proof."
-
-                    L["step"] = 5
-                    return "loan_eligibility_check", {}, "Enter your CIBIL score (300–900)."
-
-                # Step 5: CIBIL Score
-                if L["step"] == 5:
-                    if not re.fullmatch(r'\d{3}', raw.strip()):
-                        return "loan_eligibility_check", {}, "Enter valid CIBIL (300–900)."
-                    E["cibil"] = int(raw.strip())
-                    if E["cibil"] < 700:
-                        reset_loan(); memory["menu"]=None
-                        return "loan_eligibility_result", {}, "Not eligible: CIBIL score must be at least 700."
-                    L["step"] = 6
-                    return "loan_eligibility_check", {}, "Select Vehicle Type:\n1) Two-Wheeler\n2) Four-Wheeler (Car)"
-
-                # Step 6: Vehicle Type
-                if L["step"] == 6:
-                    if raw.strip() == "1":
-                        E["vehicle"] = "two"
-                    elif raw.strip() == "2":
-                        E["vehicle"] = "car"
-                    else:
-                        return "loan_eligibility_check", {}, "Please select 1 or 2."
-                    L["step"] = 7
-                    return "loan_eligibility_check", {}, "Enter the on-road vehicle price (₹)."
-
-                # Step 7: Vehicle Price → Calculate LTV & Loan Amount
-                if L["step"] == 7:
-                    amt = re.search(r'\d{4,10}', raw.replace(',',''))
-                    if not amt:
-                        return "loan_eligibility_check", {}, "Please enter price numeric. Example: 85000"
-                    price = int(amt.group(0))
-
-                    if E["vehicle"] == "two":
-                        loan_amt = int(price * 0.90)
-                    else:  # car
-                        if price <= 1200000:
-                            loan_amt = int(price * 0.85)
-                        else:
-                            loan_amt = int(price * 0.80)
-
-                    E["eligible"] = True
-                    E["amount"] = loan_amt
-                    L["service"] = "apply"
-                    L["step"] = 10
-                    memory["loan"]["waiting_apply"] = True
-
-                    return (
-                        "loan_eligibility_result",
-                        {},
-                        f"Auto Loan Eligibility Confirmed.\n\n"
-                        f"Vehicle Price: ₹{price:,}\n"
-                        f"Eligible Loan Amount: ₹{loan_amt:,}\n"
-                        f"Repayment Tenure: Up to 5–7 years based on vehicle type.\n\n"
-                        f"Type 'apply' to continue or 'not now' to cancel."
-                    )
-
-            # ===== LOAN AGAINST PROPERTY (LAP) RULES =====
-            if L["product"] == "lap":
-                # Step 1: Age
-                if L["step"] == 1:
-                    if not raw.strip().isdigit():
-                        return "loan_eligibility_check", {}, "Please enter age in numbers."
-                    E["age"] = int(raw.strip())
-                    if E["age"] < 21 or E["age"] > 70:
-                        reset_loan(); memory["menu"]=None
-                        return "loan_eligibility_result", {}, "Not eligible: Age must be between 21 and 70."
-                    L["step"] = 2
-                    return "loan_eligibility_check", {}, "Enter your monthly income (₹)."
-
-                # Step 2: Income requirement (>= 18,000/month)
-                if L["step"] == 2:
-                    m = re.search(r'(\d{4,9})', raw.replace(',',''))
-                    if not m:
-                        return "loan_eligibility_check", {}, "Please enter numeric income. Example: 22000"
-                    E["salary"] = int(m.group(1))
-                    if E["salary"] < 18000:
-                        reset_loan(); memory["menu"]=None
-                        return "loan_eligibility_result", {}, "Not eligible: Minimum income must be ₹18,000/month."
-                    L["step"] = 3
-                    return "loan_eligibility_check", {}, "Select Employment Type:\n1) Government Employee\n2) Private Employee\n3) Self-Employed"
-
-                # Step 3: Employment Type
-                if L["step"] == 3:
-                    if raw.strip() == "1":
-                        E["emp"] = "govt"
-                    elif raw.strip() == "2":
-                        E["emp"] = "private"
-                    elif raw.strip() == "3":
-                        E["emp"] = "self"
-                    else:
-                        return "loan_eligibility_check", {}, "Please select 1, 2, or 3."
-                    L["step"] = 4
-                    return "loan_eligibility_check", {}, "Enter total years of work/business experience."
-
-                # Step 4: Experience validation
-                if L["step"] == 4:
-                    if not re.fullmatch(r'\d{1,2}', raw.strip()):
-                        return "loan_eligibility_check", {}, "Please enter experience in years (e.g., 2)."
-                    E["exp"] = int(raw.strip())
-
-                    if E["emp"] == "govt" and E["exp"] < 1:
-                        reset_loan(); memory["menu"]=None
-                        return "loan_eligibility_result", {}, "Not eligible: Government employees need minimum 1 year experience."
-                    if E["emp"] == "private" and E["exp"] < 3:
-                        reset_loan(); memory["menu"]=None
-                        return "loan_eligibility_result", {}, "Not eligible: Private employees need minimum 3 years experience."
-                    if E["emp"] == "self" and E["exp"] < 2:
-                        reset_loan(); memory["menu"]=None
-                        return "loan_eligibility_result", {}, "Not eligible: Self-employed need minimum 2 years business proof."
-
-                    L["step"] = 5
-                    return "loan_eligibility_check", {}, "Enter your CIBIL score (300–900)."
-
-                # Step 5: CIBIL
-                if L["step"] == 5:
-                    if not re.fullmatch(r'\d{3}', raw.strip()):
-                        return "loan_eligibility_check", {}, "Enter a valid CIBIL score (300–900)."
-                    E["cibil"] = int(raw.strip())
-                    if E["cibil"] < 700:
-                        reset_loan(); memory["menu"]=None
-                        return "loan_eligibility_result", {}, "Not eligible: CIBIL score must be 700 or above."
-                    L["step"] = 6
-                    return "loan_eligibility_check", {}, "Enter your property market value (₹)."
-
-                # Step 6: Property Value → Calculate Max Loan (LTV ≈ 50%)
-                if L["step"] == 6:
-                    amt = re.search(r'\d{5,12}', raw.replace(',', ''))
-                    if not amt:
-                        return "loan_eligibility_check", {}, "Please enter property value numeric. Example: 3500000"
-                    prop_value = int(amt.group(0))
-
-                    loan_amt = int(prop_value * 0.50)
-
-                    E["eligible"] = True
-                    E["amount"] = loan_amt
-                    L["service"] = "apply"
-                    L["step"] = 10
-                    memory["loan"]["waiting_apply"] = True
-
-                    return (
-                        "loan_eligibility_result",
-                        {},
-                        f"Loan Against Property Eligibility Confirmed.\n\n"
-                        f"Property Value: ₹{prop_value:,}\n"
-                        f"Eligible Loan Amount (50% LTV): ₹{loan_amt:,}\n"
-                        f"Repayment Tenure: Up to 15 years\n\n"
-                        f"Type 'apply' to continue or 'not now' to cancel."
-                    )
-
-            # ===== GOLD LOAN RULES =====
-            if L["product"] == "gold":
-                # Step 1: Age
-                if L["step"] == 1:
-                    if not raw.strip().isdigit():
-                        return "loan_eligibility_check", {}, "Please enter age in numbers."
-                    E["age"] = int(raw.strip())
-                    if E["age"] < 18:
-                        reset_loan(); memory["menu"]=None
-                        return "loan_eligibility_result", {}, "Not eligible: Minimum age is 18."
-                    L["step"] = 2
-                    return "loan_eligibility_check", {}, "Enter gold weight in grams (e.g., 25)."
-
-                # Step 2: Gold Weight
-                if L["step"] == 2:
-                    w = re.search(r'(\d{1,4})', raw.strip())
-                    if not w:
-                        return "loan_eligibility_check", {}, "Please enter a valid weight in grams."
-                    E["weight"] = int(w.group(1))
-                    if E["weight"] < 5:
-                        reset_loan(); memory["menu"]=None
-                        return "loan_eligibility_result", {}, "Not eligible: Minimum 5 grams required."
-                    L["step"] = 3
-                    return "loan_eligibility_check", {}, "Enter gold purity (carat) e.g., 22 or 24."
-
-                # Step 3: Purity
-                if L["step"] == 3:
-                    if raw.strip() not in ["22", "23", "24"]:
-                        return "loan_eligibility_check", {}, "Gold must be at least 22 carat. Please enter 22, 23, or 24."
-                    E["purity"] = int(raw.strip())
-
-                    L["step"] = 4
-                    return "loan_eligibility_check", {}, "Enter today's approximate gold market price per gram (₹). Example: 5800"
-
-                # Step 4: Calculate Loan
-                if L["step"] == 4:
-                    price = re.search(r'(\d{3,6})', raw.replace(',', ''))
-                    if not price:
-                        return "loan_eligibility_check", {}, "Enter numeric price per gram. Example: 5800"
-                    price_per_gram = int(price.group(1))
-
-                    # Calculate value and loan LTV
-                    gold_value = E["weight"] * price_per_gram
-                    loan_amt = int(gold_value * 0.75)  # 75% LTV
-
-                    E["eligible"] = True
-                    E["amount"] = loan_amt
-                    L["service"] = "apply"
-                    L["step"] = 10
-                    memory["loan"]["waiting_apply"] = True
-
-                    return (
-                        "loan_eligibility_result",
-                        {},
-                        f"Gold Loan Eligibility Confirmed.\n\n"
-                        f"Gold Weight: {E['weight']} g\n"
-                        f"Purity: {E['purity']} Carat\n"
-                        f"Estimated Gold Value: ₹{gold_value:,}\n"
-                        f"Eligible Loan Amount (75% LTV): ₹{loan_amt:,}\n"
-                        f"Tenure: Up to 12 months\n\n"
-                        f"Type 'apply' to continue or 'not now' to cancel."
-                    )
-            # ===== LOAN AGAINST FIXED DEPOSIT (FD LOAN) =====
-            if L["product"] == "fd":
-                # Step 1: Age
-                if L["step"] == 1:
-                    if not raw.strip().isdigit():
-                        return "loan_eligibility_check", {}, "Please enter age in numbers."
-                    E["age"] = int(raw.strip())
-                    if E["age"] < 18:
-                        reset_loan(); memory["menu"]=None
-                        return "loan_eligibility_result", {}, "Not eligible: Minimum age is 18."
-                    L["step"] = 2
-                    return "loan_eligibility_check", {}, "Enter your Fixed Deposit amount (₹)."
-
-                # Step 2: FD Amount
-                if L["step"] == 2:
-                    amt = re.search(r'(\d{4,9})', raw.replace(',', ''))
-                    if not amt:
-                        return "loan_eligibility_check", {}, "Please enter a valid deposit amount (e.g., 50000)."
-                    fd_amt = int(amt.group(1))
-                    if fd_amt < 10000:
-                        reset_loan(); memory["menu"]=None
-                        return "loan_eligibility_result", {}, "Not eligible: FD amount must be at least ₹10,000."
-                    
-                    # Calculate eligible loan (90% of FD)
-                    loan_amt = int(fd_amt * 0.90)
-
-                    E["eligible"] = True
-                    E["amount"] = loan_amt
-                    L["service"] = "apply"
-                    L["step"] = 10
-                    memory["loan"]["waiting_apply"] = True
-
-                    return (
-                        "loan_eligibility_result",
-                        {},
-                        f"Loan Against FD Eligibility Confirmed.\n\n"
-                        f"FD Amount: ₹{fd_amt:,}\n"
-                        f"Eligible Loan Amount (90% of FD): ₹{loan_amt:,}\n"
-                        f"Tenure: Up to remaining FD maturity\n"
-                        f"Interest Rate: FD rate + ~1%\n\n"
-                        f"Type 'apply' to continue or 'not now' to cancel."
-                    )
-            
-            # ===== CREDIT CARD (Revolving Loan) Eligibility (CBI Rules) =====
-            if L["product"] == "credit":
-
-                # Step 1 — Age
-                if L["step"] == 1:
-                    if not raw.strip().isdigit():
-                        return "loan_eligibility_check", {}, "Please enter your age in numbers."
-                    E["age"] = int(raw.strip())
-                    if E["age"] < 21:
-                        reset_loan(); memory["menu"]=None
-                        return "loan_eligibility_result", {}, "Not eligible: Minimum age for Credit Card is 21."
-                    L["step"] = 2
-                    return "loan_eligibility_check", {}, "Enter your monthly income (₹). Minimum ₹20,000 required."
-
-                # Step 2 — Income
-                if L["step"] == 2:
-                    m = re.search(r'(\d{4,9})', raw.replace(",", ""))
-                    if not m:
-                        return "loan_eligibility_check", {}, "Please enter numeric income, e.g., 25000."
-                    E["salary"] = int(m.group(1))
-                    if E["salary"] < 20000:
-                        reset_loan(); memory["menu"]=None
-                        return "loan_eligibility_result", {}, "Not eligible: Minimum monthly income is ₹20,000."
-                    L["step"] = 3
-                    return "loan_eligibility_check", {}, "Employment type?\n1) Government\n2) Private\n3) Self-Employed"
-
-                # Step 3 — Employment Type
-                if L["step"] == 3:
-                    if raw.strip() == "1":
-                        E["emp"] = "govt"
-                    elif raw.strip() == "2":
-                        E["emp"] = "private"
-                    elif raw.strip() == "3":
-                        E["emp"] = "self"
-                    else:
-                        return "loan_eligibility_check", {}, "Please choose 1 for Government, 2 for Private, 3 for Self-Employed."
-                    L["step"] = 4
-                    return "loan_eligibility_check", {}, "Enter your CIBIL score (300–900). Must be 750+."
-
-                # Step 4 — CIBIL Score
-                if L["step"] == 4:
-
-                    if re.search(r'what.*cibil|cibil meaning|explain cibil', text):
-                        return "loan_info", {}, (
-                            "CIBIL score is your credit repayment history rating.\n"
-                            "Range: 300–900. Score above 750 is considered good.\n\n"
-                            "Please enter your CIBIL score (300–900)."
-                        )
-
-                    if not re.fullmatch(r'\d{3,4}', raw.strip()):
-                        return "loan_eligibility_check", {}, "Enter a valid CIBIL score (300–900)."
-
-                    E["cibil"] = int(raw.strip())
-                    if E["cibil"] < 750:
-                        reset_loan(); memory["menu"]=None
-                        return "loan_eligibility_result", {}, "Not eligible: CIBIL must be 750+ for Credit Card."
-
-                    # Calculate Credit Limit (2x to 4x salary)
-                    limit = E["salary"] * 3
-
-                    E["eligible"] = True
-                    E["amount"] = limit
-                    L["service"] = "apply"
-                    L["step"] = 10
-                    memory["loan"]["waiting_apply"] = True
-
-                    return "loan_eligibility_result", {}, (
-                        f"Credit Card Eligibility Confirmed.\n\n"
-                        f"Estimated Credit Limit: ₹{limit:,}\n"
-                        f"CIBIL Score Verified: {E['cibil']}\n"
-                        f"Interest on Revolving Balance: ~2.50% per month (approx. 34% annually)\n"
-                        f"Minimum Due Each Month: 5% of outstanding billing amount\n\n"
-                        f"Note: If full bill is not paid, interest applies from the transaction date.\n\n"
-                        f"Type 'apply' to continue or 'not now' to cancel."
-                    )
-
-            # ===== DEBT CONSOLIDATION LOAN ELIGIBILITY (CBI Rules) =====
-            if L["product"] == "debt":
-
-                # Step 1 — Age
-                if L["step"] == 1:
-                    if not raw.strip().isdigit():
-                        return "loan_eligibility_check", {}, "Enter your age in numbers."
-                    E["age"] = int(raw.strip())
-                    if E["age"] < 21:
-                        reset_loan(); memory["menu"]=None
-                        return "loan_eligibility_result", {}, "Not eligible: Minimum age is 21."
-                    L["step"] = 2
-                    return "loan_eligibility_check", {}, "Enter your monthly income (₹). Minimum ₹25,000 required."
-
-                # Step 2 — Monthly Income
-                if L["step"] == 2:
-                    m = re.search(r'(\d{4,9})', raw.replace(",", ""))
-                    if not m:
-                        return "loan_eligibility_check", {}, "Please enter numeric income, e.g., 30000."
-                    E["salary"] = int(m.group(1))
-                    if E["salary"] < 25000:
-                        reset_loan(); memory["menu"]=None
-                        return "loan_eligibility_result", {}, "Not eligible: Minimum monthly income is ₹25,000."
-                    L["step"] = 3
-                    return "loan_eligibility_check", {}, "Employment Type?\n1) Government\n2) Private\n3) Self-Employed"
-
-                # Step 3 — Employment Type
-                if L["step"] == 3:
-                    if raw.strip() == "1":
-                        E["emp"] = "govt"
-                    elif raw.strip() == "2":
-                        E["emp"] = "private"
-                    elif raw.strip() == "3":
-                        E["emp"] = "self"
-                    else:
-                        return "loan_eligibility_check", {}, "Choose 1 for Government, 2 for Private, 3 for Self-Employed."
-                    L["step"] = 4
-                    return "loan_eligibility_check", {}, "How many years of work experience?"
-
-                # Step 4 — Experience Check
-                if L["step"] == 4:
-                    if not re.fullmatch(r'\d{1,2}', raw.strip()):
-                        return "loan_eligibility_check", {}, "Enter years as a number."
-                    E["exp"] = int(raw.strip())
-
-                    if E["emp"] == "govt" and E["exp"] < 1:
-                        reset_loan(); memory["menu"]=None
-                        return "loan_eligibility_result", {}, "Not eligible: Government employees need at least 1 year experience."
-
-                    if E["emp"] == "private" and E["exp"] < 3:
-                        reset_loan(); memory["menu"]=None
-                        return "loan_eligibility_result", {}, "Not eligible: Private employees need at least 3 years experience."
-
-                    if E["emp"] == "self" and E["exp"] < 2:
-                        reset_loan(); memory["menu"]=None
-                        return "loan_eligibility_result", {}, "Not eligible: Self-employed need minimum 2 years experience + ITR."
-
-                    L["step"] = 5
-                    return "loan_eligibility_check", {}, "Enter your CIBIL score (300–900). Minimum 700 required."
-
-                # Step 5 — CIBIL Score
-                if L["step"] == 5:
-
-                    if re.search(r'what.*cibil|explain cibil|cibil meaning', text):
-                        return "loan_info", {}, (
-                            "CIBIL score represents your credit repayment history.\n"
-                            "Range: 300–900. Higher score = easier loan approvals.\n\n"
-                            "Enter your CIBIL score now (300–900)."
-                        )
-
-                    if not re.fullmatch(r'\d{3,4}', raw.strip()):
-                        return "loan_eligibility_check", {}, "Please enter a valid CIBIL score (300–900)."
-
-                    E["cibil"] = int(raw.strip())
-                    if E["cibil"] < 700:
-                        reset_loan(); memory["menu"]=None
-                        return "loan_eligibility_result", {}, "Not eligible: CIBIL score must be 700+ for Debt Consolidation."
-
-                    # Calculate Eligible Loan
-                    amount = E["salary"] * 20
-                    E["eligible"] = True
-                    E["amount"] = amount
-                    L["service"] = "apply"
-                    L["step"] = 10
-                    memory["loan"]["waiting_apply"] = True
-
-                    return "loan_eligibility_result", {}, (
-                        f"Debt Consolidation Loan Eligibility Confirmed.\n\n"
-                        f"Maximum Eligible Loan Amount: ₹{amount:,}\n"
-                        f"CIBIL Score Verified: {E['cibil']}\n"
-                        f"Tenure: Up to 7 years\n\n"
-                        f"This loan will combine your existing EMIs into one single payment.\n\n"
-                        f"Type 'apply' to continue or 'not now' to cancel."
-                    )
-
-
-            # ===== TERM LOAN ELIGIBILITY =====
-            if L["product"] == "term":
-                E = L["elig"]
-
-                # Step 1: Age
-                if L["step"] == 1:
-                    if not raw.strip().isdigit():
-                        return "loan_eligibility_check", {}, "Please enter age in numbers."
-                    E["age"] = int(raw.strip())
-                    if E["age"] < 21:
-                        reset_loan(); memory["menu"]=None
-                        return "loan_eligibility_result", {}, "Not eligible: Minimum age is 21."
-                    L["step"] = 2
-                    return "loan_eligibility_check", {}, "How many years has your business been running?"
-
-                # Step 2: Business Vintage
-                if L["step"] == 2:
-                    if not raw.strip().isdigit():
-                        return "loan_eligibility_check", {}, "Enter years in numbers."
-                    E["exp"] = int(raw.strip())
-                    if E["exp"] < 2:
-                        reset_loan(); memory["menu"]=None
-                        return "loan_eligibility_result", {}, "Not eligible: Business must run for at least 2 years."
-                    L["step"] = 3
-                    return "loan_eligibility_check", {}, "Enter your annual business turnover (₹)."
-
-                # Step 3: Turnover
-                if L["step"] == 3:
-                    m = re.search(r'\d{4,10}', raw.replace(',',''))
-                    if not m:
-                        return "loan_eligibility_check", {}, "Enter numeric amount, example: 350000"
-                    E["turnover"] = int(m.group())
-                    if E["turnover"] < 300000:
-                        reset_loan(); memory["menu"]=None
-                        return "loan_eligibility_result", {}, "Not eligible: Minimum turnover should be ₹3,00,000/year."
-                    L["step"] = 4
-                    return "loan_eligibility_check", {}, "Enter your CIBIL score (300–900)."
-
-                # Step 4: CIBIL Check
-                if L["step"] == 4:
-                    if not re.fullmatch(r'\d{3}', raw.strip()):
-                        return "loan_eligibility_check", {}, "Enter valid CIBIL score (300–900)."
-                    E["cibil"] = int(raw.strip())
-                    if E["cibil"] < 700:
-                        reset_loan(); memory["menu"]=None
-                        return "loan_eligibility_result", {}, "Not eligible: CIBIL must be 700 or above."
-                    L["step"] = 5
-                    return "loan_eligibility_check", {}, "Loan Purpose?\n1) Business Expansion\n2) Machinery / Equipment\n3) Office/Shop Renovation"
-
-                # Step 5: Purpose + Final Output
-                if L["step"] == 5:
-                    E["purpose"] = raw.strip()
-                    amount = max(150000, int(E["turnover"] * 0.4))  # approx formula
-                    E["eligible"] = True
-                    L["service"] = "apply"
-                    L["step"] = 10
-                    memory["loan"]["waiting_apply"] = True
-
-                    if E["cibil"] >= 800:
-                        guarantor_msg = "Not required (Strong CIBIL)"
-                    else:
-                        guarantor_msg = "1 guarantor recommended"
-
-                    return "loan_eligibility_result", {}, (
-                        f"Term Loan Eligibility Confirmed.\n\n"
-                        f"Estimated Eligible Loan Amount: ₹{amount:,}\n"
-                        f"Guarantor Requirement: {guarantor_msg}\n"
-                        f"Repayment Tenure: Up to 7 years\n\n"
-                        "Type 'apply' to continue or 'not now' to cancel."
-                    )
-   
-            # ===== WORKING CAPITAL LOAN (WC LOAN) =====
-            if L["product"] == "wc":
-                E = L["elig"]
-
-                # Step 1: Age
-                if L["step"] == 1:
-                    if not raw.strip().isdigit():
-                        return "loan_eligibility_check", {}, "Please enter age in numbers."
-                    E["age"] = int(raw.strip())
-                    if E["age"] < 21:
-                        reset_loan(); memory["menu"]=None
-                        return "loan_eligibility_result", {}, "Not eligible: Minimum age is 21."
-                    L["step"] = 2
-                    return "loan_eligibility_check", {}, "How many years has your business been running?"
-
-                # Step 2: Business Vintage (Minimum 1 year)
-                if L["step"] == 2:
-                    if not raw.strip().isdigit():
-                        return "loan_eligibility_check", {}, "Enter years as a number."
-                    E["exp"] = int(raw.strip())
-                    if E["exp"] < 1:
-                        reset_loan(); memory["menu"]=None
-                        return "loan_eligibility_result", {}, "Not eligible: Business must run for at least 1 year."
-                    L["step"] = 3
-                    return "loan_eligibility_check", {}, "Enter your annual business turnover (₹)."
-
-                # Step 3: Turnover
-                if L["step"] == 3:
-                    m = re.search(r'\d{4,10}', raw.replace(',',''))
-                    if not m:
-                        return "loan_eligibility_check", {}, "Enter numeric amount, example: 350000"
-                    E["turnover"] = int(m.group())
-                    if E["turnover"] < 300000:
-                        reset_loan(); memory["menu"]=None
-                        return "loan_eligibility_result", {}, "Not eligible: Minimum turnover should be ₹3,00,000/year."
-                    L["step"] = 4
-                    return "loan_eligibility_check", {}, "Enter your Business Credit Score (CIBIL / Commercial Score)."
-
-                # Step 4: Credit Score
-                if L["step"] == 4:
-                    if not re.fullmatch(r'\d{3}', raw.strip()):
-                        return "loan_eligibility_check", {}, "Enter valid score (300–900)."
-                    E["cibil"] = int(raw.strip())
-                    if E["cibil"] < 600:
-                        reset_loan(); memory["menu"]=None
-                        return "loan_eligibility_result", {}, "Not eligible: Business credit score must be at least 600."
-                    L["step"] = 5
-                    return "loan_eligibility_check", {}, "Business Type?\n1) Trading\n2) Manufacturing\n3) Services"
-
-                # Step 5: Final Calculation
-                if L["step"] == 5:
-                    E["type"] = raw.strip()
-                    amount = max(100000, int(E["turnover"] * 0.20))  # 20% of turnover
-
-                    if amount > 2500000:
-                        amount = 2500000
-
-                    E["eligible"] = True
-                    L["service"] = "apply"
-                    L["step"] = 10
-                    memory["loan"]["waiting_apply"] = True
-
-                    return "loan_eligibility_result", {}, (
-                        f"Working Capital Loan Eligibility Confirmed.\n\n"
-                        f"Eligible Loan Limit: ₹{amount:,}\n"
-                        f"Repayment: Renewable every 12 months\n"
-                        f"Security: May require property/business collateral\n\n"
-                        "Type 'apply' to continue or 'not now' to cancel."
-                    )
-
-            # ===== EQUIPMENT FINANCING LOAN =====
-            if L["product"] == "equip":
-                E = L["elig"]
-
-                # Step 1: Age
-                if L["step"] == 1:
-                    if not raw.strip().isdigit():
-                        return "loan_eligibility_check", {}, "Please enter age in numbers."
-                    E["age"] = int(raw.strip())
-                    if E["age"] < 21:
-                        reset_loan(); memory["menu"]=None
-                        return "loan_eligibility_result", {}, "Not eligible: Minimum age is 21."
-                    L["step"] = 2
-                    return "loan_eligibility_check", {}, "How many years has your business been running?"
-
-                # Step 2: Business Vintage (≥ 3 years)
-                if L["step"] == 2:
-                    if not raw.strip().isdigit():
-                        return "loan_eligibility_check", {}, "Enter number of years."
-                    E["exp"] = int(raw.strip())
-                    if E["exp"] < 3:
-                        reset_loan(); memory["menu"]=None
-                        return "loan_eligibility_result", {}, "Not eligible: Business must be running for at least 3 years."
-                    L["step"] = 3
-                    return "loan_eligibility_check", {}, "Enter your annual business turnover (₹)."
-
-                # Step 3: Turnover
-                if L["step"] == 3:
-                    m = re.search(r'\d{4,10}', raw.replace(',',''))
-                    if not m:
-                        return "loan_eligibility_check", {}, "Enter numeric turnover, example: 1200000"
-                    E["turnover"] = int(m.group())
-                    if E["turnover"] < 500000:
-                        reset_loan(); memory["menu"]=None
-                        return "loan_eligibility_result", {}, "Not eligible: Minimum turnover required is ₹5,00,000 per year."
-                    L["step"] = 4
-                    return "loan_eligibility_check", {}, "Enter your Credit Score (300–900)."
-
-                # Step 4: Credit Score
-                if L["step"] == 4:
-                    if not re.fullmatch(r'\d{3}', raw.strip()):
-                        return "loan_eligibility_check", {}, "Enter valid score (300–900)."
-                    E["cibil"] = int(raw.strip())
-                    if E["cibil"] < 750:
-                        reset_loan(); memory["menu"]=None
-                        return "loan_eligibility_result", {}, "Not eligible: Credit Score must be 750 or above."
-                    L["step"] = 5
-                    return "loan_eligibility_check", {}, "Do you have GST & Udyam Registration? (yes/no)"
-
-                # Step 5: Registration Confirmation
-                if L["step"] == 5:
-                    if "yes" in text:
-                        # Calculate eligible loan
-                        amount = int(E["turnover"] * 0.20)
-                        if amount < 100000:
-                            amount = 100000
-                        if amount > 5000000:
-                            amount = 5000000
-
-                        E["eligible"] = True
-                        L["service"] = "apply"
-                        L["step"] = 10
-                        memory["loan"]["waiting_apply"] = True
-
-                        return "loan_eligibility_result", {}, (
-                            f"Equipment Financing Loan Eligibility Confirmed.\n\n"
-                            f"Eligible Loan Amount: ₹{amount:,}\n"
-                            f"Repayment Tenure: Up to 7 years\n"
-                            f"Margin Requirement: 25%\n"
-                            f"Security: Hypothecation of Equipment + Business Collateral if required\n\n"
-                            "Type 'apply' to continue or 'not now' to cancel."
-                        )
-                    else:
-                        reset_loan(); memory["menu"]=None
-                        return "loan_eligibility_result", {}, "Not eligible: GST & Udyam registration are mandatory."
-                    
-            # ===== INVOICE FINANCING (CENT TReDS) =====
-            if L["product"] == "invoice":
-                E = L["elig"]
-
-                # Step 1: Business vintage
-                if L["step"] == 1:
-                    if not raw.strip().isdigit():
-                        return "loan_eligibility_check", {}, "Please enter business age in years."
-                    E["exp"] = int(raw.strip())
-                    if E["exp"] < 2:
-                        reset_loan(); memory["menu"]=None
-                        return "loan_eligibility_result", {}, "Not eligible: Business must be running for at least 2 years."
-                    L["step"] = 2
-                    return "loan_eligibility_check", {}, "Do you have Udyam (MSME) Registration? (yes/no)"
-
-                # Step 2: Udyam check
-                if L["step"] == 2:
-                    if "yes" not in text:
-                        reset_loan(); memory["menu"]=None
-                        return "loan_eligibility_result", {}, "Not eligible: MSME (Udyam) registration is required."
-                    L["step"] = 3
-                    return "loan_eligibility_check", {}, "Enter your Credit Score (300–900)."
-
-                # Step 3: CIBIL Score
-                if L["step"] == 3:
-                    if not re.fullmatch(r'\d{3}', raw.strip()):
-                        return "loan_eligibility_check", {}, "Enter valid credit score."
-                    E["cibil"] = int(raw.strip())
-                    if E["cibil"] < 700:
-                        reset_loan(); memory["menu"]=None
-                        return "loan_eligibility_result", {}, "Not eligible: Credit Score must be 700 or above."
-                    L["step"] = 4
-                    return "loan_eligibility_check", {}, "Enter invoice amount (₹)."
-
-                # Step 4: Invoice amount
-                if L["step"] == 4:
-                    amt = re.search(r'\d{4,12}', raw.replace(',',''))
-                    if not amt:
-                        return "loan_eligibility_check", {}, "Enter numeric invoice amount. Example: 250000"
-                    invoice = int(amt.group())
-                    if invoice < 25000:
-                        reset_loan(); memory["menu"]=None
-                        return "loan_eligibility_result", {}, "Not eligible: Minimum invoice value is ₹25,000."
-                    if invoice > 10000000:
-                        reset_loan(); memory["menu"]=None
-                        return "loan_eligibility_result", {}, "Not eligible: Maximum invoice allowed is ₹1,00,00,000 per invoice."
-
-                    E["amount"] = invoice
-                    finance = int(invoice * 0.80)
-
-                    E["eligible"] = True
-                    L["service"] = "apply"
-                    L["step"] = 10
-                    memory["loan"]["waiting_apply"] = True
-
-                    return "loan_eligibility_result", {}, (
-                        f"Invoice Financing Eligibility Confirmed.\n\n"
-                        f"Invoice Value: ₹{invoice:,}\n"
-                        f"Eligible Finance: ₹{finance:,}\n"
-                        f"Repayment: 30–90 days (Buyer pays bank)\n"
-                        f"Platform: CENT TReDS (RXIL)\n\n"
-                        "Type 'apply' to continue or 'not now' to cancel."
-                    )
-        
-            # ===== OVERDRAFT FACILITY (OD) =====
-            if L["product"] == "od":
-                E = L["elig"]
-
-                # Step 1: Personal vs Business
-                if L["step"] == 1:
-                    if raw.strip() == "1":
-                        E["type"] = "personal"
-                        L["step"] = 2
-                        return "loan_eligibility_check", {}, "Has your savings account been active for at least 6 months? (yes/no)"
-                    elif raw.strip() == "2":
-                        E["type"] = "business"
-                        L["step"] = 5
-                        return "loan_eligibility_check", {}, "How old is your business? (years)"
-                    return "loan_eligibility_check", {}, "Please choose 1 for Personal or 2 for Business."
-
-                # ----- PERSONAL OD -----
-                if E.get("type") == "personal":
-                    if L["step"] == 2:
-                        if "yes" not in text:
-                            reset_loan(); memory["menu"]=None
-                            return "loan_eligibility_result", {}, "Not eligible: Account must be active for 6+ months."
-                        L["step"] = 3
-                        return "loan_eligibility_check", {}, "Is your Aadhaar linked to this account? (yes/no)"
-                    if L["step"] == 3:
-                        if "yes" not in text:
-                            reset_loan(); memory["menu"]=None
-                            return "loan_eligibility_result", {}, "Not eligible: Aadhaar linking is mandatory."
-                        L["step"] = 4
-                        return "loan_eligibility_check", {}, "Enter your average monthly balance (₹)."
-                    if L["step"] == 4:
-                        m = re.search(r'\d{3,9}', raw.replace(',',''))
-                        if not m:
-                            return "loan_eligibility_check", {}, "Enter numeric balance, e.g., 1500"
-                        bal = int(m.group())
-                        od_limit = min(bal * 4, 5000)
-                        E["eligible"] = True
-                        L["service"] = "apply"; L["step"] = 10; memory["loan"]["waiting_apply"] = True
-                        return "loan_eligibility_result", {}, (
-                            f"Overdraft Eligibility Confirmed.\n\n"
-                            f"Eligible Limit: ₹{od_limit:,}\n"
-                            f"Interest: Base Rate + 2%\n"
-                            f"Tenure: Up to 36 months (with review)\n\n"
-                            "Type 'apply' to continue or 'not now' to cancel."
-                        )
-
-                # ----- BUSINESS OD -----
-                if E.get("type") == "business":
-                    if L["step"] == 5:
-                        if not raw.strip().isdigit() or int(raw.strip()) < 2:
-                            reset_loan(); memory["menu"]=None
-                            return "loan_eligibility_result", {}, "Not eligible: Business must be running for at least 2 years."
-                        L["step"] = 6
-                        return "loan_eligibility_check", {}, "Enter Credit Score (300–900)."
-                    if L["step"] == 6:
-                        if not re.fullmatch(r'\d{3}', raw.strip()):
-                            return "loan_eligibility_check", {}, "Enter valid credit score."
-                        score = int(raw.strip())
-                        if score < 700:
-                            reset_loan(); memory["menu"]=None
-                            return "loan_eligibility_result", {}, "Not eligible: Credit score must be 700+."
-                        L["step"] = 7
-                        return "loan_eligibility_check", {}, "Enter annual turnover (₹)."
-                    if L["step"] == 7:
-                        amt = re.search(r'\d{4,12}', raw.replace(',',''))
-                        if not amt:
-                            return "loan_eligibility_check", {}, "Enter numeric turnover, e.g., 1200000"
-                        turnover = int(amt.group())
-                        od_limit = int(turnover * 0.20)
-                        E["eligible"] = True
-                        L["service"] = "apply"; L["step"] = 10; memory["loan"]["waiting_apply"] = True
-                        return "loan_eligibility_result", {}, (
-                            f"Business OD Eligibility Confirmed.\n\n"
-                            f"Annual Turnover: ₹{turnover:,}\n"
-                            f"Eligible OD Limit: ₹{od_limit:,} (20% of turnover)\n\n"
-                            "Type 'apply' to continue or 'not now' to cancel."
-                        )
-
-
-            # ===== (Default) Non-education loans =====
-            if L["step"] == 1:
-                if not raw.strip().isdigit():
-                    return "loan_eligibility_check", {}, "Please enter age in numbers."
-                E["age"] = int(raw.strip())
-
-                if E["age"] < 18 or E["age"] > 75:
-                    reset_loan(); memory["menu"] = None
-                    return "loan_eligibility_result", {}, "Not eligible: Age must be between 18 and 75."
-
-                L["step"] = 2
-                return "loan_eligibility_check", {}, "Enter your monthly income (₹): (Minimum ₹25,000 required)"
-
-            if L["step"] == 2:
-                m = re.search(r'(\d{4,9})', raw.replace(',', ''))
-                if not m:
-                    return "loan_eligibility_check", {}, "Please enter numeric income. Example: 30000"
-                E["salary"] = int(m.group(1))
-
-                if E["salary"] < 25000:
-                    reset_loan(); memory["menu"] = None
-                    return "loan_eligibility_result", {}, "Not eligible: Minimum income required is ₹25,000/month."
-
-                L["step"] = 3
-                return "loan_eligibility_check", {}, (
-                    "Select Employment Type:\n"
-                    "1) Government Employee\n"
-                    "2) Private Employee\n"
-                    "3) Self-Employed"
-                )
-
-            if L["step"] == 3:
-                if raw.strip() == "1":
-                    E["emp"] = "govt"
-                elif raw.strip() == "2":
-                    E["emp"] = "private"
-                elif raw.strip() == "3":
-                    E["emp"] = "self"
-                else:
-                    return "loan_eligibility_check", {}, (
-                        "Please select:\n1) Government Employee\n2) Private Employee\n3) Self-Employed"
-                    )
-                L["step"] = 4
-                return "loan_eligibility_check", {}, "Enter total years of work experience:"
-
-            if L["step"] == 4:
-                if not re.fullmatch(r'\d{1,2}', raw.strip()):
-                    return "loan_eligibility_check", {}, "Please enter experience in years (1-30)."
-
-                E["exp"] = int(raw.strip())
-                
-                # Employment-based experience rules
-                if E["emp"] == "govt" and E["exp"] < 1:
-                    reset_loan(); memory["menu"] = None
-                    return "loan_eligibility_result", {}, "Not eligible: Government employees need minimum 1 year experience."
-                if E["emp"] == "private" and E["exp"] < 3:
-                    reset_loan(); memory["menu"] = None
-                    return "loan_eligibility_result", {}, "Not eligible: Private employees need minimum 3 years experience."
-                if E["emp"] == "self" and E["exp"] < 2:
-                    reset_loan(); memory["menu"] = None
-                    return "loan_eligibility_result", {}, (
-                        "Not eligible: Self-employed individuals must have minimum **2 years business stability** "
-                        "and valid ITR proof."
-                    )
-
-                L["step"] = 5
-                return "loan_eligibility_check", {}, "Enter your CIBIL score (300–900):"
-
-            if L["step"] == 5:
-                if not re.fullmatch(r'\d{3,4}', raw.strip()):
-                    return "loan_eligibility_check", {}, "Please enter valid CIBIL (300–900)."
-
-                E["cibil"] = int(raw.strip())
-
-                if E["cibil"] < 750:
-                    reset_loan(); memory["menu"] = None
-                    return "loan_eligibility_result", {}, "Not eligible: CIBIL score must be 750 or above."
-
-                L["step"] = 6
-                return "loan_eligibility_check", {}, "Enter property value (₹):"
-
-            if L["step"] == 6:
-                p = re.search(r'\d{5,10}', raw.replace(',', ''))
-                if not p:
-                    return "loan_eligibility_check", {}, "Please enter property value numeric. Example: 5000000"
-                property_value = int(p.group(0))
-
-                # LTV Calculation
-                if property_value <= 3000000:
-                    loan_amount = int(property_value * 0.90)
-                elif property_value <= 7500000:
-                    loan_amount = int(property_value * 0.80)
-                else:
-                    loan_amount = int(property_value * 0.75)
-
-                E["eligible"] = True
-                E["amount"] = loan_amount
-
-                L["service"] = "apply"
-                L["step"] = 10
-                memory["loan"]["waiting_apply"] = True
-
-                return "loan_eligibility_result", {}, (
-                    f"Home Loan Eligibility Confirmed.\n\n"
-                    f"Maximum Eligible Loan Amount: ₹{loan_amount:,}\n"
-                    f"Co-Borrower Recommended: Yes (Parent/Spouse)\n"
-                    f"Repayment Tenure: Up to 30 years (subject to retirement age)\n\n"
-                    f"Type 'apply' to continue with application or 'not now' to exit."
-                )
-
-        # Apply (after eligibility OK)
-                # Apply (after eligibility OK)
-        # ================= APPLY SECTION (Separated for Secured / Unsecured / Business) =================
-        if L["service"] == "apply":
-            A = memory["loan"]["apply"]
-
-            # --- Step 10: Full Name ---
-            if L["step"] == 10:
-                if re.fullmatch(r'[A-Za-z][A-Za-z .\-]{1,50}', raw):
-                    A["name"] = raw.strip().title()
-
-                    # Secured Loan (Home/Auto/LAP/Gold/FD)
-                    if L["category"] == "secured":
-                        L["step"] = 11
-                        return "loan_apply_step", {}, "Please confirm your monthly salary (₹)."
-
-                    # Unsecured Loan (Personal/Edu/Credit/Debt)
-                    if L["category"] == "unsecured":
-                        L["step"] = 11
-                        return "loan_apply_step", {}, "Please enter your PAN Number (or type 'skip')."
-
-                    # Business Loan
-                    if L["category"] == "business":
-                        L["step"] = 11
-                        return "loan_apply_step", {}, "Enter your Business / Enterprise Name:"
-
-                return "loan_apply_start", {}, "Please provide your full name."
-
-            # ================= SECURED LOAN APPLY =================
-            if L["category"] == "secured":
-
-                # Step 11 — Salary
-                if L["step"] == 11:
-                    m = re.search(r'(\d{4,9})', raw.replace(',', ''))
-                    if not m:
-                        return "loan_apply_step", {}, "Please enter salary in numbers."
-                    A["salary"] = int(m.group(1))
-                    L["step"] = 12
-                    return "loan_apply_step", {}, "Please enter your PAN (or type 'skip')."
-
-                # Step 12 — PAN
-                if L["step"] == 12:
-                    if re.fullmatch(r'[A-Z]{5}\d{4}[A-Z]', raw.strip(), re.I):
-                        A["pan"] = raw.strip().upper()
-                    elif normalize_text(raw) == "skip":
-                        A["pan"] = "Not Provided"
-                    else:
-                        return "loan_apply_step", {}, "Enter valid PAN (ABCDE1234F) or type 'skip'."
-
-                    L["step"] = 13
-                    return "loan_apply_upload", {}, (
-                        "Please upload documents on Caashmora Official Portal.\n"
-                        "If you need help, type 'what documents'. Once uploaded, type 'done'."
-                    )
-
-                # Step 13 — Upload + WHAT DOCUMENTS
-                if L["step"] == 13:
-
-                    if re.search(r'what.*document|document[s]?\??', text):
-                        return "loan_required_documents", {}, DOCS_SECURED
-
-                    if re.search(r'\b(done|submitted|uploaded)\b', text):
-                        name = A["name"]; sal = A["salary"]; pan = A.get("pan", "Not Provided")
-                        reset_loan(); memory["menu"] = None
-                        return ("loan_apply_submit", {},
-                                f"Secured Loan Application Submitted.\n"
-                                f"Name: {name}\nSalary: ₹{sal:,}\nPAN: {pan}\n"
-                                "Verification will begin shortly. You will get further updates via registered SMS/Email.\n\nWould you like to continue?")
-                    
-                    return "loan_apply_wait", {}, (
-                        "Please upload documents on Caashmora Official Portal.\n"
-                        "If you need help, type 'what documents'. Once uploaded, type 'done'."
-                    )
-
-            # ================= UNSECURED LOAN APPLY =================
-            if L["category"] == "unsecured":
-
-                # Step 11 — PAN
-                if L["step"] == 11:
-                    if re.fullmatch(r'[A-Z]{5}\d{4}[A-Z]', raw.strip(), re.I):
-                        A["pan"] = raw.strip().upper()
-                    elif normalize_text(raw) == "skip":
-                        A["pan"] = "Not Provided"
-                    else:
-                        return "loan_apply_step", {}, "Enter valid PAN (ABCDE1234F) or type 'skip'."
-
-                    L["step"] = 12
-                    return "loan_apply_upload", {}, (
-                        "Please upload documents on Caashmora Official Portal.\n"
-                        "If you need help, type 'what documents'. Once uploaded, type 'done'."
-                    )
-
-                # Step 12 — Upload + WHAT DOCUMENTS
-                if L["step"] == 12:
-
-                    if re.search(r'what.*document|document[s]?\??', text):
-                        return "loan_required_documents", {}, DOCS_UNSECURED
-
-                    if re.search(r'\b(done|submitted|uploaded)\b', text):
-                        name = A["name"]; pan = A.get("pan", "Not Provided")
-                        reset_loan(); memory["menu"] = None
-                        return ("loan_apply_submit", {},
-                                f" Unsecured Loan Application Submitted.\n"
-                                f"Name: {name}\nPAN: {pan}\n"
-                                "Verification will begin shortly. You will get further updates via registered SMS/Email.\n\nWould you like to continue?")
-                    
-                    return "loan_apply_wait", {}, (
-                        "Please upload documents on Caashmora Official Portal.\n"
-                        "If you need help, type 'what documents'. Once uploaded, type 'done'."
-                    )
-
-            # ================= BUSINESS LOAN APPLY =================
-            if L["category"] == "business":
-
-                # Step 11 — Business Name
-                if L["step"] == 11:
-                    if re.fullmatch(r'[A-Za-z0-9 &.\-]{2,60}', raw):
-                        A["business_name"] = raw.strip().title()
-                        L["step"] = 12
-                        return "loan_apply_step", {}, "Enter your GST Number (e.g., 33AAAAA1234A1Z5):"
-                    return "loan_apply_step", {}, "Enter valid Business / Enterprise Name."
-
-                # Step 12 — GST Number
-                if L["step"] == 12:
-                    if re.fullmatch(r'\d{2}[A-Z]{5}\d{4}[A-Z]\d[A-Z\d]\d', raw.strip(), re.I):
-                        A["gst"] = raw.strip().upper()
-                        L["step"] = 13
-                        return "loan_apply_upload", {}, (
-                            "Please upload documents on Caashmora Official Portal.\n"
-                            "If you need help, type 'what documents'. Once uploaded, type 'done'."
-                        )
-                    return "loan_apply_step", {}, "Invalid GST. Example: 33AAAAA1234A1Z5"
-
-                # Step 13 — Upload + WHAT DOCUMENTS
-                if L["step"] == 13:
-
-                    if re.search(r'what.*document|document[s]?\??', text):
-                        return "loan_required_documents", {}, DOCS_BUSINESS
-
-                    if re.search(r'\b(done|submitted|uploaded)\b', text):
-                        name = A["name"]; biz = A["business_name"]; gst = A["gst"]
-                        reset_loan(); memory["menu"] = None
-                        return ("loan_apply_submit", {},
-                                f"Business Loan Application Submitted.\n"
-                                f"Applicant: {name}\nBusiness: {biz}\nGST: {gst}\n"
-                                "Verification will begin shortly. You will get further updates via registered SMS/Email.\n\nWould you like to continue?")
-                    
-                    return "loan_apply_wait", {}, (
-                        "Please upload documents on Caashmora Official Portal.\n"
-                        "If you need help, type 'what documents'. Once uploaded, type 'done'."
-                    )
-
-
+        result = loan_flow(turn)
+        if result:
+            return result
 
     # ===== OPEN ACCOUNT
-    if re.search(r'\b(open account|create account|new account|open an account)\b', text) or text=="create account":
-        memory["menu"]="account"; reset_acct()
+    if "open_account" in hits or text=="create account":
+        memory["menu"]="account"; reset_acct(memory)
         memory["acct"]["step"]=1
         return "account_open_start", {}, "Sure. Please provide your full name."
 
     if memory.get("menu")=="account":
-        A = memory["acct"]
-        if A["step"]==1:
-            if not re.fullmatch(r'[A-Za-z][A-Za-z .\-]{1,50}', raw):
-                return "account_open_start", {}, "Please enter a valid full name."
-            A["name"]=raw.strip().title(); A["step"]=2
-            return "account_open_step", {}, "Please enter your age in years."
-        if A["step"]==2:
-            if not raw.strip().isdigit():
-                return "account_open_step", {}, "Please enter a valid age in numbers."
-            age=int(raw.strip())
-            if age<18:
-                memory["menu"]=None; reset_acct()
-                return "account_open_step", {}, "Minimum age is 18."
-            A["age"]=age; A["step"]=3
-            return "account_open_step", {}, "Please choose account type:\n1) Savings Account\n2) Current Account"
-        if A["step"]==3:
-            if raw.strip()=="1" or "savings" in text:
-                A["type"]="Savings Account"
-            elif raw.strip()=="2" or "current" in text:
-                A["type"]="Current Account"
-            else:
-                return "account_open_step", {}, "Please choose 1 for Savings or 2 for Current."
-            A["step"]=4
-            return "account_open_step", {}, "Please enter your full address."
-        if A["step"]==4:
-            if len(raw)<8:
-                return "account_open_step", {}, "Please enter a complete address."
-            A["addr"]=raw.strip(); A["step"]=5
-            return "account_open_step", {}, "Please enter your 12-digit Aadhaar number."
-        if A["step"]==5:
-            aad = re.sub(r'\D','',raw)
-            if not re.fullmatch(r'\d{12}', aad):
-                return "account_open_step", {}, "Please enter a valid 12-digit Aadhaar number."
-            A["aadhaar"]=aad; A["step"]=6
-            masked = mask_aadhaar(aad)
-            return ("account_open_step", {},
-                    f"Confirm details:\nName: {A['name']}\nAge: {A['age']}\nAccount Type: {A['type']}\n"
-                    f"Address: {A['addr']}\nAadhaar: {masked}\nType 'confirm' to submit or 'edit' to restart.")
-        if A["step"]==6:
-            if normalize_text(raw)=="confirm":
-                reset_acct(); memory["menu"]=None
-                return "account_open_submit", {}, "Account opening request submitted. You will receive further updates via SMS/Email.\n\nWould you like to continue?"
-            if normalize_text(raw)=="edit":
-                reset_acct(); memory["menu"]="account"; memory["acct"]["step"]=1
-                return "account_open_start", {}, "Okay, let's restart. Please provide your full name."
-            return "account_open_step", {}, "Please type 'confirm' to submit or 'edit' to restart."
+        result = ACCOUNT_FLOW.handle(turn)
+        if result:
+            return result
 
     # ===== EMI quick calc
-    if re.search(r'\b(emi|emi calculator)\b', text):
+    if "emi" in hits:
         return "emi_calculator", {}, ("EMI Calculator:\nChoose type: monthly/quarterly/yearly\n"
                                       "Or enter like: '400000 48 months'.")
 
-    if re.search(r'\bmonthly|quarterly|yearly\b', text) or re.search(r'\d+\s+(months?|years?|quarters?)', text):
+    if "emi_period" in hits or "emi_duration" in hits:
         nums = re.findall(r'(\d{1,12})', raw)
-        unit_m = bool(re.search(r'month', text))
-        unit_y = bool(re.search(r'year', text))
-        unit_q = bool(re.search(r'quarter', text))
+        unit_m = "month" in hits
+        unit_y = "year" in hits
+        unit_q = "quarter" in hits
         if len(nums)>=2:
             P = float(nums[0]); t = int(nums[1])
             if unit_y:
@@ -2062,9 +1413,9 @@ def handle_user_input(user_input):
                 pass
 
     # ===== generic info
-    if re.search(r'cibil', text):
+    if "cibil" in hits:
         return "loan_info", {}, "CIBIL score is a credit score from 300–900 that reflects your repayment history. Banks usually require 750+."
-    if re.search(r'what document|which document|required document|document list', text):
+    if "doc_question" in hits:
         cat = memory["loan"]["category"]
 
         if cat == "secured":
@@ -2083,15 +1434,12 @@ def handle_user_input(user_input):
 
                 
     # ===== dataset fallback if confident (safe; doesn't touch card actions)
-    if has_data and model is not None:
-        try:
-            probs = model.predict_proba([raw])[0]
-            pred = model.classes_[probs.argmax()]
-            conf = probs.max()
-        except Exception:
-            pred, conf = "unknown", 0.0
+    current = inference.current
+    if current["responses"] and inference.available:
+        inference.run()
+        pred, conf = inference.intent, inference.confidence
         if conf >= CONFIDENCE_THRESHOLD:
-            resp = dataset_response_for_intent(pred, raw)
+            resp = dataset_response_for_intent(pred, raw, current)
             if resp:
                 return pred, ent, resp
     
@@ -2112,6 +1460,8 @@ def handle_user_input(user_input):
 
 # ========= CLI =========
 def main():
+    repo.init_schema()
+    load_model()
     print("Welcome to CAASHMORA Bank Virtual Assistant (Milestone 2).\n")
     print("Type 'exit' to end the chat.\n")
     while True:
@@ -2130,8 +1480,8 @@ def main():
             print("🤖 Bot: Thank you for using CAASHMORA Bank. Goodbye!")
             break
 
-        intent, entities, reply = handle_user_input(msg)
-        print(f"\n🎯 Predicted Intent: {intent}")
+        intent, entities, reply, confidence = handle_user_input(msg)
+        print(f"\n🎯 Predicted Intent: {intent} ({confidence:.0%})")
         print(f"📎 Extracted Entities: {entities if entities else {}}")
         print(f"🤖 Bot: {reply}\n")
 
@@ -0,0 +1,215 @@
+import hashlib
+import json
+import os
+import re
+import tempfile
+from datetime import datetime
+
+# Fitted models live next to app.py so every worker shares the same store
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+MODEL_DIR = os.environ.get("BANKBOT_MODEL_DIR", os.path.join(BASE_DIR, "models"))
+
+ARTIFACT_FORMAT = 2      # bump when the artifact layout changes
+KEEP_ARTIFACTS = 3       # older versions are pruned after each save
+
+_NAME_RE = re.compile(r"^model_v(\d+)_([0-9a-f]{12})\.joblib$")
+
+
+# ---------------- DATASET FINGERPRINT ----------------
+def dataset_fingerprint(data_file, params=None):
+    """
+    SHA-256 of the training CSV (streamed) plus the training parameters,
+    so a changed dataset OR a changed pipeline config forces a retrain.
+    """
+    h = hashlib.sha256()
+    with open(data_file, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    if params:
+        h.update(repr(sorted(params.items())).encode("utf-8"))
+    return h.hexdigest()
+
+
+# ---------------- ARTIFACT FILES ----------------
+def _artifact_files():
+    """[(version, short_fingerprint, path), ...] newest first."""
+    if not os.path.isdir(MODEL_DIR):
+        return []
+    found = []
+    for name in os.listdir(MODEL_DIR):
+        m = _NAME_RE.match(name)
+        if m:
+            found.append((int(m.group(1)), m.group(2), os.path.join(MODEL_DIR, name)))
+    found.sort(reverse=True)
+    return found
+
+
+def latest_version():
+    files = _artifact_files()
+    return files[0][0] if files else 0
+
+
+def _read(path):
+    import joblib   # pulls in numpy; deferred so importing the app stays cheap
+    try:
+        artifact = joblib.load(path)
+    except Exception as e:
+        print("MODEL LOAD ERROR:", path, e)
+        return None
+    if not isinstance(artifact, dict) or artifact.get("format") != ARTIFACT_FORMAT:
+        return None
+    return artifact
+
+
+def load_latest(fingerprint=None):
+    """
+    Newest readable artifact; if a fingerprint is given, the newest one
+    trained on exactly that dataset (filename carries the short hash, so
+    non-matching files are never unpickled).
+    """
+    for _, short_fp, path in _artifact_files():
+        if fingerprint and short_fp != fingerprint[:12]:
+            continue
+        artifact = _read(path)
+        if artifact and (not fingerprint or artifact["fingerprint"] == fingerprint):
+            return artifact
+    return None
+
+
+def save_artifact(pipeline, fingerprint, **extra):
+    """Write a new versioned artifact atomically and return it."""
+    os.makedirs(MODEL_DIR, exist_ok=True)
+    version = latest_version() + 1
+    artifact = {
+        "format": ARTIFACT_FORMAT,
+        "version": version,
+        "fingerprint": fingerprint,
+        "trained_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "classes": [str(c) for c in getattr(pipeline, "classes_", [])],
+        "pipeline": pipeline,
+    }
+    artifact.update(extra)
+
+    final_path = _artifact_path(version, fingerprint)
+    fd, tmp_path = tempfile.mkstemp(dir=MODEL_DIR, suffix=".tmp")
+    os.close(fd)
+    import joblib
+    try:
+        joblib.dump(artifact, tmp_path, compress=3)
+        os.replace(tmp_path, final_path)   # readers never see a half-written file
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+    prune_artifacts()
+    return artifact
+
+
+def prune_artifacts(keep=KEEP_ARTIFACTS):
+    live = published()
+    live_path = _artifact_path(live["version"], live["fingerprint"]) if live else None
+    for _, _, path in _artifact_files()[keep:]:
+        if path == live_path:
+            continue
+        for stale in (path, _metrics_path(path)):
+            try:
+                os.remove(stale)
+            except OSError:
+                pass
+
+
+# ---------------- EVALUATION METRICS ----------------
+# Stored as JSON beside the artifact (model_vNNNN_<hash>.metrics.json), so
+# reading them needs neither joblib nor the model.
+
+def _metrics_path(artifact_path):
+    return artifact_path[:-len(".joblib")] + ".metrics.json"
+
+
+def _artifact_path(version, fingerprint):
+    return os.path.join(MODEL_DIR, f"model_v{version:04d}_{fingerprint[:12]}.joblib")
+
+
+def save_metrics(artifact, metrics):
+    path = _metrics_path(_artifact_path(artifact["version"], artifact["fingerprint"]))
+    fd, tmp_path = tempfile.mkstemp(dir=MODEL_DIR, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(metrics, f)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def load_metrics(artifact=None):
+    """Metrics of this artifact (default: the newest version that has some), or None."""
+    if artifact is not None:
+        paths = [_metrics_path(_artifact_path(artifact["version"], artifact["fingerprint"]))]
+    else:
+        paths = [_metrics_path(path) for _, _, path in _artifact_files()]
+    for path in paths:
+        try:
+            with open(path, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            continue
+    return None
+
+
+# ---------------- PUBLISHED VERSION ----------------
+# The model a retrain put live, recorded in MODEL_DIR/LIVE so every worker
+# process -- not only the one that ran the retrain -- can switch to it.
+
+def _live_path():
+    return os.path.join(MODEL_DIR, "LIVE")
+
+
+def publish(artifact):
+    os.makedirs(MODEL_DIR, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=MODEL_DIR, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump({"version": artifact["version"], "fingerprint": artifact["fingerprint"]}, f)
+        os.replace(tmp_path, _live_path())
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def published():
+    """{"version", "fingerprint"} of the published model, or None."""
+    try:
+        with open(_live_path(), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def load_published(live=None):
+    live = live or published()
+    if not live:
+        return None
+    return _read(_artifact_path(live["version"], live["fingerprint"]))
+
+
+# ---------------- LOAD OR TRAIN ----------------
+def load_or_train(data_file, train_fn, params=None):
+    """
+    Return the artifact matching the current dataset, training (and
+    persisting) a new one via train_fn() only when no artifact matches.
+    train_fn() returns the artifact fields: {"pipeline": ..., **extras};
+    an optional "metrics" field is stored beside the artifact instead.
+    """
+    fingerprint = dataset_fingerprint(data_file, params)
+    artifact = load_latest(fingerprint)
+    if artifact is not None:
+        return artifact
+
+    print("🤖 Training intent model (dataset changed or no saved model)...")
+    fields = train_fn()
+    metrics = fields.pop("metrics", None)
+    artifact = save_artifact(fields.pop("pipeline"), fingerprint, **fields)
+    if metrics is not None:
+        save_metrics(artifact, dict(metrics, model_version=artifact["version"]))
+    return artifact
@@ -0,0 +1,81 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+# Replies to messages sent while no dialog flow is active depend only on the
+# message and the model, so repeats ("check balance", "bank timings", ...)
+# can skip entity extraction, the rule router and the classifier.
+#
+# Keys are (normalized message, model version): a retrain changes the
+# version, and clear() drops everything when the model or training data
+# is edited.
+
+RESPONSE_CACHE_SIZE = int(os.environ.get("BANKBOT_RESPONSE_CACHE_SIZE", 2048))    # 0 disables
+RESPONSE_CACHE_TTL = int(os.environ.get("BANKBOT_RESPONSE_CACHE_TTL", 10 * 60))   # seconds
+
+
+class ResponseCache:
+
+    def __init__(self, max_entries=RESPONSE_CACHE_SIZE, ttl=RESPONSE_CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._data = OrderedDict()      # (text, version) -> (expires_at, reply tuple)
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._invalidations = 0
+
+    @property
+    def enabled(self):
+        return self.max_entries > 0
+
+    def get(self, text, version):
+        """Cached (intent, entities, reply, confidence) or None."""
+        if not self.enabled:
+            return None
+        key = (text, version)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry and entry[0] > now:
+                self._data.move_to_end(key)
+                self._hits += 1
+                intent, entities, reply, confidence = entry[1]
+                return intent, dict(entities), reply, confidence
+            if entry:
+                del self._data[key]
+            self._misses += 1
+        return None
+
+    def put(self, text, version, intent, entities, reply, confidence):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._data[(text, version)] = (
+                time.monotonic() + self.ttl, (intent, dict(entities), reply, confidence))
+            self._data.move_to_end((text, version))
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self._evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._invalidations += 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "enabled": self.enabled,
+                "size": len(self._data),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_ratio": round(self._hits / lookups, 4) if lookups else 0.0,
+                "evictions": self._evictions,
+                "invalidations": self._invalidations,
+            }
@@ -0,0 +1,137 @@
+import itertools
+import json
+import os
+import subprocess
+import sys
+import threading
+import traceback
+from datetime import datetime
+
+import model_store
+
+# A retrain fits the new pipeline in a child process (`python trainer.py`,
+# so no GIL contention with the request threads), validates it here, then
+# hands it to `install` which swaps the live model reference. Until that
+# swap, traffic keeps using the old model untouched.
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+TRAINER_SCRIPT = os.path.join(BASE_DIR, "trainer.py")
+
+MIN_VALIDATION_ACCURACY = 0.80   # reject a model worse than this on a data sample
+VALIDATION_SAMPLE = 1000
+
+_jobs = {}
+_job_ids = itertools.count(1)
+_lock = threading.Lock()
+_running_id = None
+
+
+# ---------------- CHILD PROCESS ----------------
+def _fit_artifact(job_id, data_file):
+    """Run the trainer CLI, relaying its JSON progress lines into the job."""
+    proc = subprocess.Popen(
+        [sys.executable, TRAINER_SCRIPT, os.path.abspath(data_file)],
+        cwd=BASE_DIR, stdout=subprocess.PIPE, text=True,
+    )
+    result = None
+    for line in proc.stdout:
+        try:
+            msg = json.loads(line)
+        except ValueError:
+            continue        # plain log output from the trainer
+        _update(job_id, stage=msg["stage"], progress=msg["progress"])
+        if "fingerprint" in msg:
+            result = msg
+    if proc.wait() != 0 or result is None:
+        raise RuntimeError(f"trainer exited with code {proc.returncode}")
+    return result
+
+
+# ---------------- VALIDATION ----------------
+def validate_artifact(artifact, data):
+    """Accuracy on a fixed sample of the training data; raises if too low."""
+    pipeline = artifact["pipeline"]
+    if not artifact.get("classes"):
+        raise ValueError("model has no classes")
+
+    sample = data.sample(min(len(data), VALIDATION_SAMPLE), random_state=0)
+    preds = pipeline.predict(sample["text"].astype(str))
+    accuracy = float((preds == sample["intent"].astype(str)).mean())
+    if accuracy < MIN_VALIDATION_ACCURACY:
+        raise ValueError(f"validation accuracy {accuracy:.3f} below {MIN_VALIDATION_ACCURACY}")
+    return accuracy
+
+
+# ---------------- JOB STATE ----------------
+def _update(job_id, **fields):
+    with _lock:
+        _jobs[job_id].update(fields)
+
+
+def get_job(job_id=None):
+    """Copy of one job (default: the most recent), or None."""
+    with _lock:
+        if job_id is None:
+            job_id = max(_jobs) if _jobs else None
+        job = _jobs.get(job_id)
+        return dict(job) if job else None
+
+
+# ---------------- RUNNER ----------------
+def _run(job_id, data_file, install, on_success):
+    global _running_id
+    from trainer import load_training_data   # pandas: only needed once a job runs
+    try:
+        _update(job_id, status="running", stage="starting", progress=10)
+        info = _fit_artifact(job_id, data_file)
+
+        _update(job_id, stage="validating", progress=70, version=info["version"])
+        artifact = model_store.load_latest(info["fingerprint"])
+        if artifact is None:
+            raise RuntimeError("trained artifact could not be loaded")
+        data, _ = load_training_data(data_file)
+        accuracy = validate_artifact(artifact, data)
+
+        _update(job_id, stage="swapping", progress=90, accuracy=round(accuracy * 100.0, 1))
+        install(artifact)
+        if on_success:
+            on_success(artifact)
+
+        _update(job_id, status="done", stage="done", progress=100,
+                finished_at=datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
+    except Exception as e:
+        traceback.print_exc()
+        _update(job_id, status="failed", stage="failed", error=str(e),
+                finished_at=datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
+    finally:
+        with _lock:
+            _running_id = None
+
+
+def start_job(data_file, install, on_success=None):
+    """
+    Start a background retrain and return its job dict. Only one job runs
+    at a time; asking again while one is running returns that job.
+    """
+    global _running_id
+    with _lock:
+        if _running_id is not None:
+            return dict(_jobs[_running_id])
+        job_id = next(_job_ids)
+        _jobs[job_id] = {
+            "id": job_id,
+            "status": "queued",
+            "stage": "queued",
+            "progress": 0,
+            "version": None,
+            "accuracy": None,
+            "error": None,
+            "started_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "finished_at": None,
+        }
+        _running_id = job_id
+        job = dict(_jobs[job_id])
+
+    threading.Thread(target=_run, args=(job_id, data_file, install, on_success),
+                     name=f"retrain-{job_id}", daemon=True).start()
+    return job
@@ -0,0 +1,53 @@
+import re
+
+# Keyword rules compiled once, instead of re.search(pattern, text) per rule
+# on every message (a regex-cache lookup plus a scan each time).
+#
+#   - one combined alternation (p0)|(p1)|... is searched first: if it finds
+#     nothing, no rule can fire and the whole cascade is skipped in one pass
+#   - otherwise rules are tested lazily, in whatever order the caller asks,
+#     with their precompiled patterns, and each answer is memoized
+#
+# A rule fires exactly when re.search(pattern, text) would, so callers keep
+# their own priority order and the old semantics.
+
+
+class RuleHits:
+    """Which rules fire for one message; supports `name in hits`."""
+
+    def __init__(self, router, text):
+        self._router = router
+        self._text = text
+        self._any = router._combined.search(text) is not None
+        self._seen = {}
+
+    def __contains__(self, name):
+        if not self._any:
+            return False
+        hit = self._seen.get(name)
+        if hit is None:
+            hit = self._seen[name] = self._router._rules[name].search(self._text) is not None
+        return hit
+
+    def __bool__(self):
+        return self._any
+
+
+class RuleRouter:
+
+    def __init__(self, rules, flags=0):
+        """rules: [(name, pattern), ...]; names can be any hashable."""
+        self.names = [name for name, _ in rules]
+        self._compiled = [(name, re.compile(pattern, flags)) for name, pattern in rules]
+        self._rules = dict(self._compiled)
+        self._combined = re.compile("|".join(f"(?:{p})" for _, p in rules), flags)
+
+    def match(self, text):
+        """Lazy RuleHits for text."""
+        return RuleHits(self, text)
+
+    def all(self, text):
+        """Names of every rule that fires, in rule order."""
+        if self._combined.search(text) is None:
+            return []
+        return [name for name, regex in self._compiled if regex.search(text)]
@@ -0,0 +1,164 @@
+import json
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+
+# Per-user conversation state for the chatbot. A state is the plain dict
+# built by milestone_two.new_state(); stores only need it to be JSON-safe.
+#
+#   memory  -> in-process LRU + TTL (one worker, any number of threads)
+#   shared  -> rows in the storage backend, bank.db or PostgreSQL (shared by
+#              every worker process and app server); "sqlite" is an alias
+
+SESSION_BACKEND = os.environ.get("BANKBOT_SESSION_BACKEND", "memory")
+SESSION_TTL = int(os.environ.get("BANKBOT_SESSION_TTL", 30 * 60))        # seconds idle
+SESSION_MAX_ENTRIES = int(os.environ.get("BANKBOT_SESSION_MAX", 10000))
+# longest one request may hold a shared session before another may take it
+SESSION_LEASE = float(os.environ.get("BANKBOT_SESSION_LEASE", 30))
+
+
+class _KeyLocks:
+    """One lock per session key, so one user's requests run one at a time."""
+
+    def __init__(self):
+        self._locks = {}
+        self._guard = threading.Lock()
+
+    @contextmanager
+    def hold(self, key):
+        with self._guard:
+            entry = self._locks.setdefault(key, [threading.Lock(), 0])
+            entry[1] += 1
+        try:
+            with entry[0]:
+                yield
+        finally:
+            with self._guard:
+                entry[1] -= 1
+                if entry[1] == 0:
+                    self._locks.pop(key, None)
+
+
+class StateStore:
+    """Base API: load/save/delete plus session() for a locked load-modify-save."""
+
+    def __init__(self, factory):
+        self.factory = factory
+        self._key_locks = _KeyLocks()
+
+    def load(self, key):
+        raise NotImplementedError
+
+    def save(self, key, state):
+        raise NotImplementedError
+
+    def delete(self, key):
+        raise NotImplementedError
+
+    @contextmanager
+    def session(self, key):
+        with self._key_locks.hold(key):
+            state = self.load(key)
+            yield state
+            self.save(key, state)
+
+
+# ---------------- IN-PROCESS LRU + TTL ----------------
+class MemoryStateStore(StateStore):
+
+    def __init__(self, factory, ttl=SESSION_TTL, max_entries=SESSION_MAX_ENTRIES):
+        super().__init__(factory)
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._data = OrderedDict()      # key -> (expires_at, state)
+        self._lock = threading.Lock()
+
+    def load(self, key):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry and entry[0] > now:
+                self._data.move_to_end(key)
+                return entry[1]
+            self._data.pop(key, None)
+        return self.factory()
+
+    def save(self, key, state):
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, state)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+
+# ---------------- SHARED (every worker process) ----------------
+class SharedStateStore(StateStore):
+    """
+    Sessions in the storage backend (`storage.repo`: bank.db or PostgreSQL).
+    session() holds the key's lease in the database (db.py, CHAT SESSIONS)
+    from load to save, so the same user is serialized across processes too;
+    the in-process key lock keeps this worker's own threads from polling.
+    """
+
+    PURGE_EVERY = 500   # saves between sweeps of expired rows
+
+    def __init__(self, factory, repo=None, ttl=SESSION_TTL, lease=SESSION_LEASE):
+        super().__init__(factory)
+        if repo is None:
+            from storage import repo
+        self.repo = repo
+        self.ttl = ttl
+        self.lease = lease
+        self._saves = 0
+
+    def _claim(self, key):
+        owner = uuid.uuid4().hex
+        delay = 0.005
+        # ends at the latest when the holder's lease runs out
+        while not self.repo.claim_session(key, owner, time.time(), self.lease):
+            time.sleep(delay)
+            delay = min(delay * 2, 0.1)
+        return owner
+
+    @contextmanager
+    def session(self, key):
+        with self._key_locks.hold(key):
+            owner = self._claim(key)
+            saved = False
+            try:
+                state = self.load(key)
+                yield state
+                saved = True
+                if not self.save(key, state, owner):
+                    print(f"SESSION WARNING: lease on {key} expired mid-request; state not saved")
+            finally:
+                if not saved:
+                    self.repo.release_session(key, owner)
+
+    def load(self, key):
+        state = self.repo.load_session(key, time.time() - self.ttl)
+        return json.loads(state) if state is not None else self.factory()
+
+    def save(self, key, state, owner=None):
+        self._saves += 1
+        now = time.time()
+        purge_before = now - self.ttl if self._saves % self.PURGE_EVERY == 0 else None
+        return self.repo.save_session(key, json.dumps(state), now, owner, purge_before)
+
+    def delete(self, key):
+        self.repo.delete_session(key)
+
+
+def create_store(factory, backend=SESSION_BACKEND):
+    if backend in ("shared", "sqlite"):     # "sqlite" from before it followed the storage backend
+        return SharedStateStore(factory)
+    if backend == "memory":
+        return MemoryStateStore(factory)
+    raise ValueError(f"Unknown session backend: {backend}")
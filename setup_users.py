@@ -1,22 +1,7 @@
-import sqlite3
+from storage import repo
 
-DB_PATH = "bank.db"  # database file
-
-conn = sqlite3.connect(DB_PATH)
-c = conn.cursor()
-
-# Create users table if not exists
-c.execute("""
-CREATE TABLE IF NOT EXISTS users (
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
-    account_number TEXT UNIQUE NOT NULL,
-    password TEXT NOT NULL,
-    name TEXT NOT NULL,
-    email TEXT,
-    phone TEXT,
-    balance INTEGER DEFAULT 0
-)
-""")
+# Create the tables if needed (works for either storage backend)
+repo.init_schema()
 
 # Insert only 3 users
 users = [
@@ -25,13 +10,7 @@ users = [
     ("23647126543", "Krishna@123", "Krishna P", "Krishnna4@gmail.com", "9856437865", 300000)
 ]
 
-c.executemany("""
-INSERT OR REPLACE INTO users 
-(account_number, password, name, email, phone, balance)
-VALUES (?, ?, ?, ?, ?, ?)
-""", users)
-
-conn.commit()
-conn.close()
+for user in users:
+    repo.save_user(*user)
 
 print("✅ Only 3 Users Added: Muruga, Tharunika, Krishna")
@@ -0,0 +1,931 @@
+import os
+import threading
+from contextlib import contextmanager
+
+import db
+from chat_log_writer import create_writer
+from user_cache import USER_CACHE_SIZE, UserCache
+
+# Storage backends for users, admin, chat logs, transactions and FAQs.
+#
+#   sqlite    bank.db through db.py (pooled connections, single writer)
+#   postgres  a shared PostgreSQL server, so several app nodes can serve
+#             the same bank; needs psycopg2 and BANKBOT_DATABASE_URL
+#
+# app.py and milestone_two only talk to `repo`; the backend is picked by
+# BANKBOT_STORAGE_BACKEND. Both backends return rows that support
+# row["column"] and row[index], and timestamps as "YYYY-MM-DD HH:MM:SS" (UTC).
+
+STORAGE_BACKEND = os.environ.get("BANKBOT_STORAGE_BACKEND", "sqlite")   # sqlite | postgres
+DATABASE_URL = os.environ.get("BANKBOT_DATABASE_URL", "")
+PG_POOL_SIZE = int(os.environ.get("BANKBOT_PG_POOL_SIZE", 10))          # idle connections kept
+# off by default: other app servers write to the same rows
+PG_USER_CACHE_SIZE = int(os.environ.get("BANKBOT_PG_USER_CACHE_SIZE", 0))
+
+NO_LIMIT = 2 ** 62
+
+
+class BankRepository:
+    """Interface shared by the storage backends."""
+
+    backend = None
+
+    # ---- schema ----
+    def init_schema(self):
+        """Create or upgrade every table and index."""
+        raise NotImplementedError
+
+    # ---- users / admin ----
+    def verify_user_login(self, email, password):
+        raise NotImplementedError
+
+    def verify_admin_login(self, email, password):
+        raise NotImplementedError
+
+    def get_user_by_account(self, account):
+        """The users row, through the backend's read-through user cache."""
+        raise NotImplementedError
+
+    def get_balance(self, account):
+        user = self.get_user_by_account(account)
+        return user["balance"] if user else None
+
+    def update_balance(self, account, new_balance):
+        raise NotImplementedError
+
+    def save_user(self, account, password, name, email, phone, balance):
+        raise NotImplementedError
+
+    def save_admin(self, email, password, name):
+        raise NotImplementedError
+
+    # ---- transactions ----
+    def transfer(self, sender, receiver, amount, receiver_name=None, mode=None,
+                 idempotency_key=None, allow_external=False):
+        """(ok, message, transaction id or None); see db.transfer."""
+        raise NotImplementedError
+
+    def transfer_funds(self, sender, receiver, amount):
+        ok, message, _ = self.transfer(sender, receiver, amount)
+        return ok, message
+
+    def record_transaction(self, sender, receiver, receiver_name, amount, mode, status):
+        raise NotImplementedError
+
+    def get_transactions(self, account, before_id=None, limit=None):
+        raise NotImplementedError
+
+    def get_transaction_page(self, account, before_id=None, limit=db.TXN_PAGE_SIZE):
+        """(transactions, before_id for the next older page or None)."""
+        txns = self.get_transactions(account, before_id, limit + 1)
+        if len(txns) > limit:
+            return txns[:limit], txns[limit - 1]["id"]
+        return txns, None
+
+    # ---- chat logs ----
+    def save_chat(self, account, user_message, bot_response, intent=None, confidence=None):
+        raise NotImplementedError
+
+    def flush_chats(self):
+        raise NotImplementedError
+
+    def get_chat_logs(self, account=None, oldest_first=False):
+        raise NotImplementedError
+
+    def get_recent_chats(self, limit=10):
+        raise NotImplementedError
+
+    def get_chat_log_page(self, filters=None, before_id=None, limit=db.CHAT_PAGE_SIZE):
+        """(rows, cursor for the next older page or None); see db.get_chat_log_page."""
+        raise NotImplementedError
+
+    def iter_chat_logs(self, filters=None, columns=db.CHAT_LOG_COLUMNS, batch_size=db.EXPORT_BATCH_SIZE):
+        """Matching chat rows (just `columns`) oldest first, in batches; see db.iter_chat_logs."""
+        raise NotImplementedError
+
+    def get_frequent_questions(self, months=db.ANALYTICS_MONTHS):
+        """Question/answer pairs by frequency over the last `months` months (0: all)."""
+        raise NotImplementedError
+
+    def get_total_queries(self):
+        """Every chat message ever logged, archived ones included."""
+        raise NotImplementedError
+
+    def get_total_intents(self, months=db.ANALYTICS_MONTHS):
+        raise NotImplementedError
+
+    def get_chat_analytics(self, months=db.ANALYTICS_MONTHS):
+        """Per-intent counts, daily volume and confidence histogram; see db.format_analytics."""
+        raise NotImplementedError
+
+    def archive_old_chat_logs(self, keep_months=None):
+        """Move chat logs past the retention window to archive files; returns the files."""
+        raise NotImplementedError
+
+    # ---- auto-FAQ clusters (faq_clusters.py) ----
+    def get_chats_after(self, after_id, limit):
+        """Chat rows (id, user_message, bot_response, timestamp) with id > after_id, oldest first."""
+        raise NotImplementedError
+
+    def get_faq_progress(self):
+        """(last chat id clustered, model version the LSH buckets were built with)."""
+        raise NotImplementedError
+
+    def find_faq_clusters(self, keys, buckets=None):
+        """See db.lookup_faq_clusters."""
+        raise NotImplementedError
+
+    def save_faq_batch(self, batch):
+        """Save a batch atomically; False if another run already advanced past it."""
+        raise NotImplementedError
+
+    def get_faq_clusters(self, months=db.ANALYTICS_MONTHS, limit=100):
+        """Top clusters over the last `months` months: user_message (label), bot_response, freq, variants."""
+        raise NotImplementedError
+
+    # ---- chat sessions (session_store.SharedStateStore) ----
+    def claim_session(self, key, owner, now, lease):
+        """Take the session's lease for `lease` seconds; False while another owner holds it."""
+        raise NotImplementedError
+
+    def release_session(self, key, owner):
+        raise NotImplementedError
+
+    def load_session(self, key, since):
+        """The session's JSON state if saved at or after `since`, else None."""
+        raise NotImplementedError
+
+    def save_session(self, key, state, now, owner=None, purge_before=None):
+        """Save and release owner's lease; False (not saved) if the lease was lost. See db.apply_session_save."""
+        raise NotImplementedError
+
+    def delete_session(self, key):
+        raise NotImplementedError
+
+    # ---- FAQ ----
+    def get_all_faqs(self):
+        raise NotImplementedError
+
+    def add_faq(self, question, answer):
+        raise NotImplementedError
+
+    def delete_faq(self, faq_id):
+        raise NotImplementedError
+
+    def stats(self):
+        return {"backend": self.backend}
+
+
+# ---------------- SQLITE ----------------
+class SQLiteRepository(BankRepository):
+    """The single-node backend: every call goes to the db.py helpers."""
+
+    backend = "sqlite"
+
+    def __init__(self, user_cache_size=USER_CACHE_SIZE):
+        # other processes sharing bank.db are seen through db.users_version
+        self.users = UserCache(user_cache_size, version=db.users_version)
+
+    def init_schema(self):
+        db.create_db()
+        db.migrate()
+        db.archive_old_partitions()
+
+    def verify_user_login(self, email, password):
+        return db.verify_user_login(email, password)
+
+    def verify_admin_login(self, email, password):
+        return db.verify_admin_login(email, password)
+
+    def get_user_by_account(self, account):
+        return self.users.get(account, lambda: db.get_user_by_account(account))
+
+    def update_balance(self, account, new_balance):
+        db.update_balance(account, new_balance)
+        self.users.invalidate(account)
+
+    def save_user(self, account, password, name, email, phone, balance):
+        db.save_user(account, password, name, email, phone, balance)
+        self.users.invalidate(account)
+
+    def save_admin(self, email, password, name):
+        db.save_admin(email, password, name)
+
+    def transfer(self, sender, receiver, amount, receiver_name=None, mode=None,
+                 idempotency_key=None, allow_external=False):
+        try:
+            return db.transfer(sender, receiver, amount, receiver_name, mode,
+                               idempotency_key, allow_external)
+        finally:
+            self.users.invalidate(sender, receiver)
+
+    def record_transaction(self, sender, receiver, receiver_name, amount, mode, status):
+        db.record_transaction(sender, receiver, receiver_name, amount, mode, status)
+
+    def get_transactions(self, account, before_id=None, limit=None):
+        return db.get_transactions(account, before_id, limit)
+
+    def save_chat(self, account, user_message, bot_response, intent=None, confidence=None):
+        db.save_chat(account, user_message, bot_response, intent, confidence)
+
+    def flush_chats(self):
+        db.flush_chats()
+
+    def get_chat_logs(self, account=None, oldest_first=False):
+        return db.get_chat_logs(account, oldest_first)
+
+    def get_recent_chats(self, limit=10):
+        return db.get_recent_chats(limit)
+
+    def get_chat_log_page(self, filters=None, before_id=None, limit=db.CHAT_PAGE_SIZE):
+        return db.get_chat_log_page(filters, before_id, limit)
+
+    def iter_chat_logs(self, filters=None, columns=db.CHAT_LOG_COLUMNS, batch_size=db.EXPORT_BATCH_SIZE):
+        return db.iter_chat_logs(filters, columns, batch_size)
+
+    def get_frequent_questions(self, months=db.ANALYTICS_MONTHS):
+        return db.get_frequent_questions(months)
+
+    def get_total_queries(self):
+        return db.get_total_queries()
+
+    def get_total_intents(self, months=db.ANALYTICS_MONTHS):
+        return db.get_total_intents(months)
+
+    def get_chat_analytics(self, months=db.ANALYTICS_MONTHS):
+        return db.get_chat_analytics(months)
+
+    def archive_old_chat_logs(self, keep_months=None):
+        return db.archive_old_partitions(keep_months)
+
+    def get_chats_after(self, after_id, limit):
+        return db.get_chats_after(after_id, limit)
+
+    def get_faq_progress(self):
+        return db.get_faq_progress()
+
+    def find_faq_clusters(self, keys, buckets=None):
+        return db.find_faq_clusters(keys, buckets)
+
+    def save_faq_batch(self, batch):
+        return db.save_faq_batch(batch)
+
+    def get_faq_clusters(self, months=db.ANALYTICS_MONTHS, limit=100):
+        return db.get_faq_clusters(months, limit)
+
+    def claim_session(self, key, owner, now, lease):
+        return db.claim_session(key, owner, now, lease)
+
+    def release_session(self, key, owner):
+        db.release_session(key, owner)
+
+    def load_session(self, key, since):
+        return db.load_session(key, since)
+
+    def save_session(self, key, state, now, owner=None, purge_before=None):
+        return db.save_session(key, state, now, owner, purge_before)
+
+    def delete_session(self, key):
+        db.delete_session(key)
+
+    def get_all_faqs(self):
+        return db.get_all_faqs()
+
+    def add_faq(self, question, answer):
+        db.add_faq(question, answer)
+
+    def delete_faq(self, faq_id):
+        db.delete_faq(faq_id)
+
+    def stats(self):
+        return {
+            "backend": self.backend,
+            "db_pool": db.pool_stats(),
+            "db_writes": db.write_stats(),
+            "chat_log": db.chat_log_stats(),
+            "user_cache": self.users.stats(),
+            "chat_log_partitions": db.partition_stats(),
+        }
+
+
+# ---------------- POSTGRESQL ----------------
+class ClientPool:
+    """Bounded set of idle client-server connections, shared by all threads."""
+
+    def __init__(self, connect, size=PG_POOL_SIZE):
+        self.connect = connect
+        self.size = size
+        self._idle = []
+        self._lock = threading.Lock()
+        self.opened = 0
+        self.reused = 0
+
+    def acquire(self):
+        with self._lock:
+            if self._idle:
+                self.reused += 1
+                return self._idle.pop()
+            self.opened += 1
+        return self.connect()
+
+    def release(self, conn, broken=False):
+        with self._lock:
+            if not broken and len(self._idle) < self.size:
+                self._idle.append(conn)
+                return
+        conn.close()
+
+    def clear(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.close()
+
+    def stats(self):
+        with self._lock:
+            return {"idle": len(self._idle), "max_idle": self.size,
+                    "opened": self.opened, "reused": self.reused}
+
+
+PG_SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS users (
+        id BIGSERIAL PRIMARY KEY,
+        account_number TEXT UNIQUE NOT NULL,
+        password TEXT NOT NULL,
+        name TEXT NOT NULL,
+        email TEXT,
+        phone TEXT,
+        balance BIGINT DEFAULT 0
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS chat_logs (
+        id BIGSERIAL PRIMARY KEY,
+        account TEXT,
+        user_message TEXT NOT NULL,
+        bot_response TEXT NOT NULL,
+        intent TEXT,
+        confidence DOUBLE PRECISION,
+        timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS transactions (
+        id BIGSERIAL PRIMARY KEY,
+        sender_account TEXT,
+        receiver_account TEXT,
+        receiver_name TEXT,
+        amount BIGINT,
+        mode TEXT,
+        status TEXT,
+        timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        idempotency_key TEXT
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS admin (
+        id BIGSERIAL PRIMARY KEY,
+        email TEXT UNIQUE NOT NULL,
+        password TEXT NOT NULL,
+        name TEXT NOT NULL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS faq (
+        id BIGSERIAL PRIMARY KEY,
+        question TEXT NOT NULL,
+        answer TEXT NOT NULL
+    )
+    """,
+    # archived months: how many rows went to which file
+    """
+    CREATE TABLE IF NOT EXISTS chat_log_archives (
+        month TEXT PRIMARY KEY,
+        row_count BIGINT NOT NULL DEFAULT 0,
+        archived_at TIMESTAMP,
+        archive_file TEXT
+    )
+    """,
+    # analytics rollups, kept in step by insert_chats (see db.ROLLUP_UPSERTS)
+    """
+    CREATE TABLE IF NOT EXISTS chat_rollup_daily (
+        day TEXT NOT NULL,
+        intent TEXT NOT NULL,
+        messages BIGINT NOT NULL,
+        PRIMARY KEY (day, intent)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS chat_rollup_messages (
+        month TEXT NOT NULL,
+        user_message TEXT NOT NULL,
+        bot_response TEXT NOT NULL,
+        messages BIGINT NOT NULL,
+        PRIMARY KEY (month, user_message, bot_response)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS chat_rollup_confidence (
+        day TEXT NOT NULL,
+        bucket INTEGER NOT NULL,
+        messages BIGINT NOT NULL,
+        PRIMARY KEY (day, bucket)
+    )
+    """,
+    # auto-FAQ clusters (see db.py, AUTO-FAQ CLUSTERS)
+    """
+    CREATE TABLE IF NOT EXISTS faq_clusters (
+        id BIGINT PRIMARY KEY,
+        label TEXT NOT NULL,
+        bot_response TEXT,
+        variants INTEGER NOT NULL DEFAULT 0
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS faq_cluster_keys (
+        key TEXT PRIMARY KEY,
+        cluster_id BIGINT NOT NULL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS faq_cluster_counts (
+        cluster_id BIGINT NOT NULL,
+        month TEXT NOT NULL,
+        messages BIGINT NOT NULL,
+        PRIMARY KEY (cluster_id, month)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS faq_cluster_buckets (
+        bucket TEXT NOT NULL,
+        cluster_id BIGINT NOT NULL,
+        PRIMARY KEY (bucket, cluster_id)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS faq_cluster_progress (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        last_chat_id BIGINT NOT NULL,
+        model_version TEXT
+    )
+    """,
+    "INSERT INTO faq_cluster_progress (id, last_chat_id) VALUES (1, 0) ON CONFLICT (id) DO NOTHING",
+    """
+    CREATE TABLE IF NOT EXISTS chat_sessions (
+        session_key TEXT PRIMARY KEY,
+        state TEXT NOT NULL,
+        updated_at DOUBLE PRECISION NOT NULL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS chat_session_locks (
+        session_key TEXT PRIMARY KEY,
+        owner TEXT NOT NULL,
+        expires_at DOUBLE PRECISION NOT NULL
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_faq_cluster_counts_month ON faq_cluster_counts (month)",
+    # same access paths as the SQLite migrations
+    "CREATE INDEX IF NOT EXISTS idx_transactions_sender ON transactions (sender_account, id)",
+    "CREATE INDEX IF NOT EXISTS idx_transactions_receiver ON transactions (receiver_account, id)",
+    "CREATE INDEX IF NOT EXISTS idx_chat_logs_account ON chat_logs (account, id)",
+    "CREATE INDEX IF NOT EXISTS idx_chat_logs_message ON chat_logs (user_message, bot_response)",
+    "CREATE INDEX IF NOT EXISTS idx_chat_logs_intent ON chat_logs (intent, id)",
+    # analytics windows and archiving select by time
+    "CREATE INDEX IF NOT EXISTS idx_chat_logs_timestamp ON chat_logs (timestamp)",
+    "CREATE INDEX IF NOT EXISTS idx_users_email ON users (email)",
+    "CREATE UNIQUE INDEX IF NOT EXISTS idx_transactions_idempotency "
+    "ON transactions (idempotency_key) WHERE idempotency_key IS NOT NULL",
+]
+
+# timestamps leave the server in the same text form SQLite stores
+TS = "to_char(timestamp, 'YYYY-MM-DD HH24:MI:SS') AS timestamp"
+
+
+def _month_start(month):
+    return month + "-01 00:00:00"
+
+
+def _is_integrity_error(e):
+    # psycopg2 raises a UniqueViolation subclass; match any driver's IntegrityError
+    return any(cls.__name__ == "IntegrityError" for cls in type(e).__mro__)
+
+
+def _psycopg2_connect(dsn):
+    try:
+        import psycopg2
+        import psycopg2.extras
+    except ImportError:
+        raise RuntimeError("BANKBOT_STORAGE_BACKEND=postgres needs psycopg2 "
+                           "(pip install psycopg2-binary)") from None
+    if not dsn:
+        raise RuntimeError("BANKBOT_STORAGE_BACKEND=postgres needs BANKBOT_DATABASE_URL")
+
+    def connect():
+        return psycopg2.connect(dsn, cursor_factory=psycopg2.extras.DictCursor,
+                                options="-c timezone=UTC")
+    return connect
+
+
+class PostgresRepository(BankRepository):
+    """
+    Client-server backend. `connect` returns a DB-API connection using the
+    %s paramstyle whose cursors yield rows indexable by name and position;
+    by default a psycopg2 connection to dsn.
+    """
+
+    backend = "postgres"
+
+    def __init__(self, dsn=DATABASE_URL, connect=None, pool_size=PG_POOL_SIZE,
+                 user_cache_size=PG_USER_CACHE_SIZE):
+        self._pool = ClientPool(connect or _psycopg2_connect(dsn), pool_size)
+        self.users = UserCache(user_cache_size)
+        self.chat_log = create_writer(self.insert_chats)
+        self._month = None          # newest month written; a new one triggers archiving
+
+    @contextmanager
+    def _cursor(self):
+        """A cursor in its own transaction: committed on exit, rolled back on error."""
+        conn = self._pool.acquire()
+        try:
+            cur = conn.cursor()
+            yield cur
+            conn.commit()
+        except BaseException:
+            try:
+                conn.rollback()
+            except Exception:
+                self._pool.release(conn, broken=True)   # connection is gone
+            else:
+                self._pool.release(conn)
+            raise
+        else:
+            self._pool.release(conn)
+
+    def _one(self, sql, params=()):
+        with self._cursor() as cur:
+            cur.execute(sql, params)
+            return cur.fetchone()
+
+    def _all(self, sql, params=()):
+        with self._cursor() as cur:
+            cur.execute(sql, params)
+            return cur.fetchall()
+
+    def _execute(self, sql, params=()):
+        with self._cursor() as cur:
+            cur.execute(sql, params)
+
+    # ---- schema ----
+    def init_schema(self):
+        with self._cursor() as cur:
+            for sql in PG_SCHEMA:
+                cur.execute(sql)
+            # first start with rollups: build them from the existing logs,
+            # holding off concurrent inserts so no row is counted twice
+            cur.execute("LOCK TABLE chat_rollup_daily IN SHARE ROW EXCLUSIVE MODE")
+            cur.execute("SELECT 1 FROM chat_rollup_daily LIMIT 1")
+            if cur.fetchone() is None:
+                for sql in db.ROLLUP_BACKFILL:
+                    cur.execute(sql.format(table="chat_logs"))
+        self.archive_old_chat_logs()
+
+    # ---- users / admin ----
+    def verify_user_login(self, email, password):
+        return self._one("SELECT * FROM users WHERE email=%s AND password=%s", (email, password))
+
+    def verify_admin_login(self, email, password):
+        return self._one("SELECT * FROM admin WHERE email=%s AND password=%s", (email, password))
+
+    def get_user_by_account(self, account):
+        return self.users.get(account, lambda: self._one(
+            "SELECT * FROM users WHERE account_number=%s", (account,)))
+
+    def update_balance(self, account, new_balance):
+        self._execute("UPDATE users SET balance=%s WHERE account_number=%s", (new_balance, account))
+        self.users.invalidate(account)
+
+    def save_user(self, account, password, name, email, phone, balance):
+        self._execute("""
+            INSERT INTO users (account_number, password, name, email, phone, balance)
+            VALUES (%s, %s, %s, %s, %s, %s)
+            ON CONFLICT (account_number) DO UPDATE SET
+                password=excluded.password, name=excluded.name, email=excluded.email,
+                phone=excluded.phone, balance=excluded.balance
+        """, (account, password, name, email, phone, balance))
+        self.users.invalidate(account)
+
+    def save_admin(self, email, password, name):
+        self._execute("""
+            INSERT INTO admin (email, password, name) VALUES (%s, %s, %s)
+            ON CONFLICT (email) DO UPDATE SET password=excluded.password, name=excluded.name
+        """, (email, password, name))
+
+    # ---- transactions ----
+    def transfer(self, sender, receiver, amount, receiver_name=None, mode=None,
+                 idempotency_key=None, allow_external=False):
+        try:
+            return self._transfer(sender, receiver, amount, receiver_name, mode,
+                                  idempotency_key, allow_external)
+        except Exception as e:
+            # a concurrent request with the same key committed first
+            if idempotency_key and _is_integrity_error(e):
+                done = self._one("SELECT id FROM transactions WHERE idempotency_key=%s",
+                                 (idempotency_key,))
+                if done:
+                    return True, "Transfer Successful", done["id"]
+            raise
+        finally:
+            self.users.invalidate(sender, receiver)
+
+    def _transfer(self, sender, receiver, amount, receiver_name, mode, idempotency_key, allow_external):
+        with self._cursor() as cur:
+            if idempotency_key:
+                cur.execute("SELECT id FROM transactions WHERE idempotency_key=%s", (idempotency_key,))
+                done = cur.fetchone()
+                if done:
+                    return True, "Transfer Successful", done["id"]
+            if not isinstance(amount, int) or amount <= 0:
+                return False, "Invalid amount", None
+            if sender == receiver:
+                return False, "Cannot transfer to the same account", None
+
+            # lock both rows in a fixed order so opposite transfers cannot deadlock
+            cur.execute("""
+                SELECT account_number, name FROM users
+                WHERE account_number IN (%s, %s)
+                ORDER BY account_number
+                FOR UPDATE
+            """, (sender, receiver))
+            names = {row["account_number"]: row["name"] for row in cur.fetchall()}
+            if receiver not in names and not allow_external:
+                return False, "Receiver account does not exist", None
+
+            cur.execute("UPDATE users SET balance = balance - %s WHERE account_number=%s AND balance >= %s",
+                        (amount, sender, amount))
+            if cur.rowcount != 1:
+                return False, "Insufficient Balance", None
+            if receiver in names:
+                cur.execute("UPDATE users SET balance = balance + %s WHERE account_number=%s",
+                            (amount, receiver))
+            cur.execute("""
+                INSERT INTO transactions (sender_account, receiver_account, receiver_name, amount,
+                                          mode, status, idempotency_key)
+                VALUES (%s, %s, %s, %s, %s, 'Success', %s)
+                RETURNING id
+            """, (sender, receiver, receiver_name or names.get(receiver), amount, mode, idempotency_key))
+            return True, "Transfer Successful", cur.fetchone()[0]
+
+    def record_transaction(self, sender, receiver, receiver_name, amount, mode, status):
+        self._execute("""
+            INSERT INTO transactions (sender_account, receiver_account, receiver_name, amount, mode, status)
+            VALUES (%s, %s, %s, %s, %s, %s)
+        """, (sender, receiver, receiver_name, amount, mode, status))
+
+    def get_transactions(self, account, before_id=None, limit=None):
+        before = before_id if before_id is not None else NO_LIMIT
+        n = limit if limit is not None else NO_LIMIT
+        rows = self._all("""
+            SELECT t.id, to_char(t.timestamp, 'YYYY-MM-DD HH24:MI:SS') AS timestamp,
+                   t.sender_account, t.receiver_account, t.receiver_name,
+                   t.amount, t.mode, t.status, s.name AS sender_name
+            FROM (
+                SELECT id FROM (SELECT id FROM transactions
+                                WHERE sender_account=%s AND id<%s ORDER BY id DESC LIMIT %s) sent
+                UNION
+                SELECT id FROM (SELECT id FROM transactions
+                                WHERE receiver_account=%s AND id<%s ORDER BY id DESC LIMIT %s) received
+            ) page
+            JOIN transactions t ON t.id = page.id
+            LEFT JOIN users s ON s.account_number = t.sender_account
+            ORDER BY t.id DESC
+            LIMIT %s
+        """, (account, before, n, account, before, n, n))
+
+        formatted = []
+        for t in rows:
+            if t["sender_account"] == account:
+                txn_type = f"Sent to {t['receiver_name']}"
+            else:
+                txn_type = f"Received from {t['sender_name'] or 'Unknown'}"
+            formatted.append({
+                "id": t["id"],
+                "date": t["timestamp"],
+                "type": txn_type,
+                "amount": t["amount"],
+                "mode": t["mode"],
+                "status": t["status"],
+            })
+        return formatted
+
+    # ---- chat logs ----
+    def insert_chats(self, rows):
+        with self._cursor() as cur:
+            cur.executemany("""
+                INSERT INTO chat_logs (account, user_message, bot_response, intent, confidence, timestamp)
+                VALUES (%s, %s, %s, %s, %s, %s)
+            """, rows)
+            db.apply_rollups(cur.executemany, rows, "%s")
+        month = max(db.month_of(row[5]) for row in rows)
+        if self._month is None or month > self._month:
+            self._month = month
+            self.archive_old_chat_logs()
+
+    def save_chat(self, account, user_message, bot_response, intent=None, confidence=None):
+        row = (account, user_message, bot_response, intent, confidence,
+               db.utc_timestamp())
+        if self.chat_log is not None:
+            self.chat_log.put(row)
+        else:
+            self.insert_chats([row])
+
+    def flush_chats(self):
+        if self.chat_log is not None:
+            self.chat_log.flush()
+
+    def get_chat_logs(self, account=None, oldest_first=False):
+        order = "ASC" if oldest_first else "DESC"
+        if account is None:
+            return self._all(f"""
+                SELECT account, user_message, bot_response, intent, confidence, {TS}
+                FROM chat_logs
+                ORDER BY id {order}
+            """)
+        return self._all(f"""
+            SELECT user_message, bot_response, intent, confidence, {TS}
+            FROM chat_logs
+            WHERE account=%s
+            ORDER BY id {order}
+        """, (account,))
+
+    def get_recent_chats(self, limit=10):
+        return self._all(f"""
+            SELECT account, user_message, bot_response, intent, confidence, {TS}
+            FROM chat_logs
+            ORDER BY id DESC
+            LIMIT %s
+        """, (limit,))
+
+    def get_chat_log_page(self, filters=None, before_id=None, limit=db.CHAT_PAGE_SIZE):
+        conditions, params = db.chat_log_filter_sql(filters, "%s")
+        before = before_id if before_id is not None else NO_LIMIT
+        rows = self._all(f"""
+            SELECT id, account, user_message, bot_response, intent, confidence, {TS}
+            FROM chat_logs
+            WHERE {" AND ".join(conditions + ["id < %s"])}
+            ORDER BY id DESC
+            LIMIT %s
+        """, params + [before, limit + 1])
+        if len(rows) > limit:
+            return rows[:limit], rows[limit - 1]["id"]
+        return rows, None
+
+    def iter_chat_logs(self, filters=None, columns=db.CHAT_LOG_COLUMNS, batch_size=db.EXPORT_BATCH_SIZE):
+        # keyset batches rather than one open cursor: psycopg2 would buffer a
+        # whole result client-side, and no transaction stays open between batches
+        conditions, params = db.chat_log_filter_sql(filters, "%s")
+        where = " AND ".join(conditions + ["id > %s"])
+        selected = columns.replace("timestamp", TS)
+        last = 0
+        while True:
+            rows = self._all(f"""
+                SELECT id, {selected}
+                FROM chat_logs
+                WHERE {where}
+                ORDER BY id
+                LIMIT %s
+            """, params + [last, batch_size])
+            if not rows:
+                return
+            last = rows[-1][0]
+            yield [tuple(r)[1:] for r in rows]
+
+    def _rollup(self, name, months):
+        return self._all(db.ROLLUP_QUERIES[name].format("%s"), (db.window_start(months),))
+
+    def get_frequent_questions(self, months=db.ANALYTICS_MONTHS):
+        return self._rollup("frequent_questions", months)
+
+    def get_total_queries(self):
+        # daily counts outlive archiving, so this covers all history
+        return self._one("SELECT COALESCE(SUM(messages), 0) FROM chat_rollup_daily")[0]
+
+    def get_total_intents(self, months=db.ANALYTICS_MONTHS):
+        return self._rollup("total_intents", months)[0][0]
+
+    def get_chat_analytics(self, months=db.ANALYTICS_MONTHS):
+        return db.format_analytics(*(self._rollup(name, months)
+                                     for name in ("intents", "daily_volume", "confidence")))
+
+    def archive_old_chat_logs(self, keep_months=None):
+        # one shared table here, so a month is archived with a ranged DELETE
+        keep = db.CHAT_LOG_RETENTION_MONTHS if keep_months is None else keep_months
+        if keep <= 0:
+            return []
+        cutoff = _month_start(db.shift_month(db.month_of(db.utc_timestamp()), -keep))
+        months = self._all("""
+            SELECT DISTINCT substr(CAST(timestamp AS TEXT), 1, 7) AS month
+            FROM chat_logs
+            WHERE timestamp < %s
+            ORDER BY month
+        """, (cutoff,))
+        written = []
+        for (month,) in months:
+            start, end = _month_start(month), _month_start(db.shift_month(month, 1))
+            rows = self._all(f"""
+                SELECT id, account, user_message, bot_response, intent, confidence, {TS}
+                FROM chat_logs
+                WHERE timestamp >= %s AND timestamp < %s
+                ORDER BY id
+            """, (start, end))
+            path = db.write_chat_archive(month, ["id"] + db.CHAT_LOG_COLUMNS.split(", "), rows)
+            with self._cursor() as cur:
+                cur.execute("DELETE FROM chat_logs WHERE timestamp >= %s AND timestamp < %s",
+                            (start, end))
+                archived = cur.rowcount
+                cur.execute("DELETE FROM chat_rollup_messages WHERE month=%s", (month,))
+                cur.execute("""
+                    INSERT INTO chat_log_archives (month, row_count, archived_at, archive_file)
+                    VALUES (%s, %s, %s, %s)
+                    ON CONFLICT (month) DO UPDATE
+                    SET row_count = chat_log_archives.row_count + EXCLUDED.row_count,
+                        archived_at = EXCLUDED.archived_at
+                """, (month, archived, db.utc_timestamp(), path))
+            written.append(path)
+            print(f"ℹ️ Archived chat logs for {month} to {path}.")
+        return written
+
+    # ---- auto-FAQ clusters ----
+    def get_chats_after(self, after_id, limit):
+        # a row whose transaction commits after a higher id was clustered is skipped
+        return self._all(f"""
+            SELECT id, user_message, bot_response, {TS}
+            FROM chat_logs
+            WHERE id > %s
+            ORDER BY id
+            LIMIT %s
+        """, (after_id, limit))
+
+    def get_faq_progress(self):
+        row = self._one(db.FAQ_CLUSTER_QUERIES["progress"])
+        return row[0], row[1]
+
+    def find_faq_clusters(self, keys, buckets=None):
+        return db.lookup_faq_clusters(self._all, keys, buckets, "%s")
+
+    def save_faq_batch(self, batch):
+        with self._cursor() as cur:
+            return db.apply_faq_batch(cur, batch, "%s")
+
+    def get_faq_clusters(self, months=db.ANALYTICS_MONTHS, limit=100):
+        return self._all(db.FAQ_CLUSTER_QUERIES["top"].format("%s"), (db.window_start(months), limit))
+
+    # ---- chat sessions ----
+    def claim_session(self, key, owner, now, lease):
+        with self._cursor() as cur:
+            cur.execute(db.SESSION_QUERIES["claim"].format("%s"), (key, owner, now + lease, now))
+            return cur.rowcount == 1
+
+    def release_session(self, key, owner):
+        self._execute(db.SESSION_QUERIES["release"].format("%s"), (key, owner))
+
+    def load_session(self, key, since):
+        row = self._one(db.SESSION_QUERIES["load"].format("%s"), (key, since))
+        return row["state"] if row else None
+
+    def save_session(self, key, state, now, owner=None, purge_before=None):
+        with self._cursor() as cur:
+            return db.apply_session_save(cur, key, state, now, owner, purge_before, "%s")
+
+    def delete_session(self, key):
+        self._execute(db.SESSION_QUERIES["delete"].format("%s"), (key,))
+
+    # ---- FAQ ----
+    def get_all_faqs(self):
+        return self._all("SELECT * FROM faq ORDER BY id DESC")
+
+    def add_faq(self, question, answer):
+        self._execute("INSERT INTO faq (question, answer) VALUES (%s, %s)", (question, answer))
+
+    def delete_faq(self, faq_id):
+        self._execute("DELETE FROM faq WHERE id=%s", (faq_id,))
+
+    def stats(self):
+        return {
+            "backend": self.backend,
+            "pool": self._pool.stats(),
+            "chat_log": self.chat_log.stats() if self.chat_log is not None else None,
+            "user_cache": self.users.stats(),
+        }
+
+
+def create_repository(backend=STORAGE_BACKEND):
+    if backend == "sqlite":
+        return SQLiteRepository()
+    if backend == "postgres":
+        return PostgresRepository()
+    raise ValueError(f"unknown storage backend: {backend}")
+
+
+repo = create_repository()
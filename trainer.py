@@ -0,0 +1,95 @@
+import json
+import sys
+
+import pandas as pd
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.linear_model import LogisticRegression
+from sklearn.pipeline import make_pipeline
+
+import evaluation
+import model_store
+
+# Training code kept free of import-time side effects so a retrain job can
+# run it in a fresh process without loading the whole chatbot module.
+
+REQUIRED_COLUMNS = ["text", "intent", "response"]
+
+# part of the artifact fingerprint: changing these forces a retrain
+MODEL_PARAMS = {"ngram_range": (1, 2), "stop_words": "english", "max_features": 18000, "max_iter": 2500}
+
+
+# ---------------- DATASET ----------------
+def load_training_data(data_file):
+    """Return (df, has_data); a missing CSV gives an empty frame."""
+    try:
+        df = pd.read_csv(data_file, encoding="latin1")
+    except FileNotFoundError:
+        return pd.DataFrame(columns=REQUIRED_COLUMNS), False
+
+    if not all(col in df.columns for col in REQUIRED_COLUMNS):
+        raise SystemExit("CSV must contain columns: text,intent,response")
+    return df, True
+
+
+# ---------------- MODEL ----------------
+def train_model(data):
+    X = data["text"].astype(str)
+    y = data["intent"].astype(str)
+    pipeline = make_pipeline(
+        TfidfVectorizer(ngram_range=MODEL_PARAMS["ngram_range"],
+                        stop_words=MODEL_PARAMS["stop_words"],
+                        max_features=MODEL_PARAMS["max_features"]),
+        LogisticRegression(max_iter=MODEL_PARAMS["max_iter"])
+    )
+    pipeline.fit(X, y)
+    return pipeline
+
+
+def build_response_index(data):
+    """
+    Per-model-version reply lookup, so the chat hot path never touches pandas:
+      by_intent: intent -> tuple of responses (row order, duplicates kept so
+                 random choice matches the dataset distribution)
+      exact:     (intent, normalized text) -> response of the first such row
+    """
+    by_intent, exact, pool = {}, {}, {}
+    rows = data[data["intent"].notna() & data["response"].notna()]
+    for text, intent, response in zip(rows["text"].astype(str), rows["intent"].astype(str),
+                                      rows["response"].astype(str)):
+        response = pool.setdefault(response, response)   # share repeated strings
+        by_intent.setdefault(intent, []).append(response)
+        exact.setdefault((intent, text.strip().lower()), response)
+    return {"by_intent": {k: tuple(v) for k, v in by_intent.items()}, "exact": exact}
+
+
+def build_artifact(data_file, data=None):
+    """
+    Artifact for the current CSV: loaded from the model store when the
+    fingerprint matches, otherwise trained and persisted together with its
+    response index and its training-set metrics. The CSV is only parsed
+    when a fit is actually needed and no frame was passed in.
+    """
+    def fit():
+        frame = data if data is not None else load_training_data(data_file)[0]
+        pipeline = train_model(frame)
+        return {"pipeline": pipeline, "responses": build_response_index(frame),
+                "metrics": evaluation.evaluate(pipeline, data_file)}
+
+    return model_store.load_or_train(data_file, fit, MODEL_PARAMS)
+
+
+# ---------------- CLI (used by retrain jobs) ----------------
+def _emit(**fields):
+    print(json.dumps(fields), flush=True)
+
+
+def main(argv):
+    """python trainer.py <csv>  ->  JSON lines: progress updates, then the result."""
+    data_file = argv[1]
+    _emit(stage="training", progress=20)
+    artifact = build_artifact(data_file)
+    _emit(stage="trained", progress=70, version=artifact["version"], fingerprint=artifact["fingerprint"])
+
+
+if __name__ == "__main__":
+    main(sys.argv)
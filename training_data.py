@@ -0,0 +1,62 @@
+import csv
+import os
+import threading
+
+# Training CSV for the admin pages, served a page at a time: rows are
+# parsed once per version of the file (size + mtime) and kept in memory,
+# and /admin_api/training_data pages, searches and filters them there, so
+# /admin_training renders no rows at all and fetches them as the admin
+# scrolls.
+
+TRAINING_PAGE_SIZE = 100
+MAX_TRAINING_PAGE_SIZE = 500
+
+_cache = {"key": None, "rows": [], "intents": {}}
+_lock = threading.Lock()
+
+
+def _load(data_file):
+    """(rows, intent counts); rows are (row number, text, intent, response, lowercased text + response)."""
+    try:
+        stat = os.stat(data_file)
+    except OSError:
+        return [], {}
+    key = (data_file, stat.st_size, stat.st_mtime_ns)
+    with _lock:
+        if _cache["key"] != key:
+            rows, intents = [], {}
+            # latin1 like the trainer, so the rows read the way the model saw them
+            with open(data_file, newline="", encoding="latin1") as f:
+                for n, r in enumerate(csv.DictReader(f), 1):
+                    text, intent, response = (r.get(c) or "" for c in ("text", "intent", "response"))
+                    rows.append((n, text, intent, response, f"{text}\n{response}".lower()))
+                    intents[intent] = intents.get(intent, 0) + 1
+            _cache.update(key=key, rows=rows, intents=intents)
+        return _cache["rows"], _cache["intents"]
+
+
+def counts(data_file):
+    """{"total": rows, "intents": {intent: rows}}."""
+    rows, intents = _load(data_file)
+    return {"total": len(rows), "intents": dict(sorted(intents.items()))}
+
+
+def page(data_file, query="", intent="", offset=0, limit=TRAINING_PAGE_SIZE):
+    """
+    Rows matching `query` (case-insensitive, in text or response) and
+    `intent` (exact), from `offset`; next_offset is None on the last page.
+    """
+    rows, _ = _load(data_file)
+    needle = query.strip().lower()
+    matches = [r for r in rows
+               if (not intent or r[2] == intent) and (not needle or needle in r[4])] \
+        if needle or intent else rows
+    selected = matches[offset:offset + limit]
+    return {
+        "rows": [{"row": n, "text": text, "intent": i, "response": response}
+                 for n, text, i, response, _ in selected],
+        "total": len(rows),
+        "matched": len(matches),
+        "offset": offset,
+        "next_offset": offset + limit if offset + limit < len(matches) else None,
+    }
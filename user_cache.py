@@ -0,0 +1,117 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+# Read-through cache of user rows keyed by account number, in front of
+# get_user_by_account (and so get_balance, the dashboard and the transfer
+# flow). Every write to a user row in this process -- update_balance,
+# save_user, transfer -- invalidates the accounts it touched once the write
+# has committed, so a read that starts after a write returns never sees
+# the old balance.
+#
+# A lookup that missed and raced with an invalidation is not stored: each
+# invalidation bumps a generation number, and a row loaded under an older
+# generation may predate the write.
+#
+# Writes made by other processes are caught by `version`, a callable that
+# returns a token that changes whenever any process writes to users
+# (db.users_version for SQLite). It is checked before every lookup and a
+# change empties the cache. Without one, only the TTL bounds how long other
+# processes' writes go unseen, so deployments with several writers and no
+# version (app servers sharing one PostgreSQL database) keep the cache off.
+
+USER_CACHE_SIZE = int(os.environ.get("BANKBOT_USER_CACHE_SIZE", 1024))    # 0 disables
+USER_CACHE_TTL = float(os.environ.get("BANKBOT_USER_CACHE_TTL", 30))       # seconds
+
+
+class UserCache:
+
+    def __init__(self, max_entries=USER_CACHE_SIZE, ttl=USER_CACHE_TTL, version=None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.version = version
+        self._seen = None               # last version() result
+        self._data = OrderedDict()      # account -> (expires_at, row)
+        self._lock = threading.Lock()
+        self._generation = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._invalidations = 0
+        self._version_clears = 0
+        self._load_seconds = 0.0
+
+    @property
+    def enabled(self):
+        return self.max_entries > 0
+
+    def get(self, account, load):
+        """The cached row for account, else load() (stored unless it is None)."""
+        if not self.enabled:
+            return load()
+        current = self.version() if self.version is not None else None
+        now = time.monotonic()
+        with self._lock:
+            if current != self._seen:
+                # users changed since the last lookup, maybe in another process
+                self._seen = current
+                self._generation += 1
+                self._invalidations += len(self._data)
+                self._version_clears += 1
+                self._data.clear()
+            entry = self._data.get(account)
+            if entry and entry[0] > now:
+                self._data.move_to_end(account)
+                self._hits += 1
+                return entry[1]
+            if entry:
+                del self._data[account]
+            self._misses += 1
+            generation = self._generation
+
+        start = time.perf_counter()
+        row = load()
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            self._load_seconds += elapsed
+            if row is not None and generation == self._generation:
+                self._data[account] = (time.monotonic() + self.ttl, row)
+                self._data.move_to_end(account)
+                while len(self._data) > self.max_entries:
+                    self._data.popitem(last=False)
+                    self._evictions += 1
+        return row
+
+    def invalidate(self, *accounts):
+        """Forget these accounts; call after the write that changed them commits."""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._generation += 1
+            for account in accounts:
+                if self._data.pop(account, None) is not None:
+                    self._invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._invalidations += len(self._data)
+            self._data.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "enabled": self.enabled,
+                "size": len(self._data),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_ratio": round(self._hits / lookups, 4) if lookups else 0.0,
+                "evictions": self._evictions,
+                "invalidations": self._invalidations,
+                "version_clears": self._version_clears,
+                "avg_load_ms": round(self._load_seconds / self._misses * 1000, 3) if self._misses else 0.0,
+            }